@@ -13,37 +13,69 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton,
     QFileDialog, QComboBox, QProgressBar, QMessageBox, QTextEdit,
     QListWidget, QLineEdit, QHBoxLayout, QAction, QToolBar, QStatusBar,
-    QCheckBox, QFrame, QSplitter, QSizePolicy
+    QCheckBox, QFrame, QSplitter, QSizePolicy, QSpinBox, QDialog, QTableWidget, QTableWidgetItem
 )
 from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer, QSettings, QSize, QFile, QTextStream
 # Local imports
 
 from modules.converter_thread import ConverterThread
-from modules.utils import which_ffmpeg, AUDIO_EXTS, VIDEO_EXTS
+from modules.command_builder import CommandBuilder, ConversionSettings
+from modules.diskspace import format_size
+from modules.planner import Planner
+from modules.cluster import ClusterQueue
+from modules.capabilities import load_async
+from modules.presets import PresetLibrary
+from modules.preview import PREVIEW_SECONDS, PreviewCache, play_cmd
+from modules.quality import QUALITY_TARGET
+from modules.silence import MIN_SILENCE, NOISE_DB, split_options
+from modules.utils import which_ffmpeg, which_ffplay, format_duration, parse_time, AUDIO_EXTS, VIDEO_EXTS
+from modules.job_queue import Job, JobQueue, POLICIES, POLICY_DEADLINE, POLICY_FIFO, SOURCE_MANUAL, SOURCE_WATCH
+from modules.engine import SPLEETER_AVAILABLE
+from modules.video import SPEED_TIERS, VIDEO_MODES
+from modules.waveform import PeakGenerator
+from modules.waveform_view import WaveformView, thumbnail
 from modules.watcher import FolderWatchHandler, WATCHDOG_AVAILABLE
 import resources_rc
 
-SPLEETER_AVAILABLE = True
-try:
-    from spleeter.separator import Separator
-except Exception:
-    SPLEETER_AVAILABLE = False
-
 class ConverterApp(QMainWindow):
+    # Emitted from the background capability probe with a Capabilities or None
+    capabilities_ready = pyqtSignal(object)
+    # Emitted from the peak generator thread with (path, PeakFile or None)
+    peaks_ready = pyqtSignal(str, object)
+    # Emitted from a preview render thread with (request, excerpt path or None, error or None)
+    preview_ready = pyqtSignal(object, object, object)
+    # Emitted from the cluster status poll with (ClusterQueue, status text)
+    cluster_status_ready = pyqtSignal(object, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle('FFX Pro – Smart Audio & Video Converter by PatronHub')
         self.setGeometry(200, 200, 1000, 700)
 
         self.input_files = []
+        self.jobs = {}
+        self.job_queue = None
         self.output_folder = None
         self.converter_thread = None
         self.watch_observer = None
         self.watch_queue = queue.Queue()
+        self.cluster = None
+        # Listing the shared folder can block on a slow network share, so it is polled off the GUI thread
+        self.cluster_status = ''
+        self.cluster_polling = False
+        self.cluster_status_ready.connect(self.show_cluster_status)
+        self.preview_player = None
 
         base_dir = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
         packaged_ffmpeg = os.path.join(base_dir, 'ffmpeg')
         self.ffmpeg_path = which_ffmpeg(packaged_path=base_dir) or ''
+        # Validated against ffmpeg's capabilities once the background probe finishes
+        self.preset_library = PresetLibrary.default()
+        self.capabilities_ready.connect(self.apply_capabilities)
+        # Waveform peaks are decoded once per file in the background and cached on disk
+        self.peaks = {}
+        self.peak_generator = PeakGenerator(self.ffmpeg_path, self.peaks_ready.emit)
+        self.peaks_ready.connect(self.show_peaks)
 
         # QSettings for persistence
         self.settings = QSettings('PatronHub', 'FFXPro')
@@ -52,6 +84,34 @@ class ConverterApp(QMainWindow):
         self.init_ui()
         self.apply_theme(self.current_theme)
         self.load_settings()
+        for path, name, error in self.preset_library.errors:
+            self.log_box.append(f'Preset skipped: {path}' + (f' [{name}]' if name else '') + f': {error}')
+        self.probe_capabilities()
+
+    def probe_capabilities(self):
+        if self.ffmpeg_path:
+            load_async(self.ffmpeg_path, self.capabilities_ready.emit)
+
+    def apply_capabilities(self, caps):
+        if caps is None:
+            self.log_box.append(f'Could not query ffmpeg at {self.ffmpeg_path}; capability checks are off.')
+            return
+        self.log_box.append(f'{caps.version} ({len(caps.encoders)} encoders, {len(caps.filters)} filters'
+                            + (f", hwaccels: {', '.join(caps.hwaccels)})" if caps.hwaccels else ')'))
+        known_errors = len(self.preset_library.errors)
+        self.preset_library.validate_with(caps)
+        for path, name, error in self.preset_library.errors[known_errors:]:
+            self.log_box.append(f'Preset skipped: {path}' + (f' [{name}]' if name else '') + f': {error}')
+        # Drop presets this ffmpeg can't run from the picker
+        current = self.delivery_combo.currentText()
+        self.delivery_combo.blockSignals(True)
+        self.delivery_combo.clear()
+        self.delivery_combo.addItem('None (use settings above)')
+        self.delivery_combo.addItems(self.preset_library.names())
+        self.delivery_combo.blockSignals(False)
+        if current in self.preset_library.names():
+            self.delivery_combo.setCurrentText(current)
+        self.change_delivery_preset(self.delivery_combo.currentIndex())
 
     def init_ui(self):
         central = QWidget()
@@ -64,10 +124,16 @@ class ConverterApp(QMainWindow):
         file_layout = QVBoxLayout()
         self.file_list = QListWidget()
         self.file_list.setAcceptDrops(True)
+        self.file_list.setSelectionMode(QListWidget.ExtendedSelection)
         self.file_list.dragEnterEvent = self.dragEnterEvent
         self.file_list.dropEvent = self.dropEvent
+        self.file_list.setIconSize(QSize(96, 24))
+        self.file_list.currentItemChanged.connect(self.preview_waveform)
         file_layout.addWidget(QLabel('Input Files:'))
         file_layout.addWidget(self.file_list)
+        self.waveform_view = WaveformView()
+        self.waveform_view.setToolTip('Scroll to zoom, drag to move')
+        file_layout.addWidget(self.waveform_view)
 
         btns = QHBoxLayout()
         select_button = QPushButton('Select Files')
@@ -78,6 +144,26 @@ class ConverterApp(QMainWindow):
         clear_button.clicked.connect(self.clear_files)
         btns.addWidget(clear_button)
 
+        bump_button = QPushButton('Bump Selected')
+        bump_button.setToolTip('Run the selected files next, even while a batch is running')
+        bump_button.clicked.connect(self.bump_selected)
+        btns.addWidget(bump_button)
+
+        cancel_button = QPushButton('Cancel Selected')
+        cancel_button.setToolTip('Cancel the selected files (stops them at once if already running)')
+        cancel_button.clicked.connect(self.cancel_selected)
+        btns.addWidget(cancel_button)
+
+        merge_button = QPushButton('Merge Selected')
+        merge_button.setToolTip('Join the selected files, in list order, into one output (lossless when they match)')
+        merge_button.clicked.connect(self.merge_selected)
+        btns.addWidget(merge_button)
+
+        trim_button = QPushButton('Trim Selected...')
+        trim_button.setToolTip('Convert only part of the selected files (stream copy when the format allows)')
+        trim_button.clicked.connect(self.trim_selected)
+        btns.addWidget(trim_button)
+
         file_layout.addLayout(btns)
         file_frame.setLayout(file_layout)
         file_frame.setMinimumWidth(480)
@@ -87,12 +173,14 @@ class ConverterApp(QMainWindow):
         settings_layout = QVBoxLayout()
 
         self.format_combo = QComboBox()
-        self.format_combo.addItems(['mp4', 'mp3', 'avi', 'wav', 'mkv', 'flac', 'm4a'])
+        self.format_combo.addItems(['mp4', 'mp3', 'avi', 'wav', 'mkv', 'flac', 'm4a', 'hls', 'dash'])
         settings_layout.addWidget(QLabel('Output Format:'))
         settings_layout.addWidget(self.format_combo)
 
         self.quality_combo = QComboBox()
-        self.quality_combo.addItems(['High', 'Medium', 'Low'])
+        self.quality_combo.addItems(['High', 'Medium', 'Low', QUALITY_TARGET])
+        self.quality_combo.setItemData(3, 'Try an excerpt at several bitrates and keep the smallest that sounds/looks '
+                                          'close enough to the source', Qt.ToolTipRole)
         settings_layout.addWidget(QLabel('Quality:'))
         settings_layout.addWidget(self.quality_combo)
 
@@ -101,6 +189,59 @@ class ConverterApp(QMainWindow):
         self.enhance_combo.addItems(['None', 'Normalize', 'Bass Boost', 'Treble Boost', 'Vocal Clarity', 'Rock EQ', 'EDM EQ', 'Chill EQ', 'Classical EQ', 'Auto (Genre)'])
         settings_layout.addWidget(QLabel('Enhancement Preset:'))
         settings_layout.addWidget(self.enhance_combo)
+        preview_button = QPushButton('Preview Preset...')
+        preview_button.setToolTip(f'Render {PREVIEW_SECONDS} s of the selected file with and without the preset and compare')
+        preview_button.clicked.connect(self.preview_preset)
+        settings_layout.addWidget(preview_button)
+
+        # Video containers only: copy vs. encode profile, and the encoder speed tier
+        self.video_codec_combo = QComboBox()
+        self.video_codec_combo.addItems(VIDEO_MODES)
+        self.video_codec_combo.setToolTip('Auto copies the video stream when the container accepts its codec')
+        settings_layout.addWidget(QLabel('Video Codec:'))
+        settings_layout.addWidget(self.video_codec_combo)
+
+        speed_row = QHBoxLayout()
+        self.video_speed_combo = QComboBox()
+        self.video_speed_combo.addItems(SPEED_TIERS + ['Meet deadline'])
+        self.video_speed_combo.setCurrentText('balanced')
+        self.video_speed_combo.currentTextChanged.connect(
+            lambda text: self.finish_within_spin.setEnabled(text == 'Meet deadline'))
+        speed_row.addWidget(self.video_speed_combo)
+        self.finish_within_spin = QSpinBox()
+        self.finish_within_spin.setRange(1, 24 * 60)
+        self.finish_within_spin.setValue(60)
+        self.finish_within_spin.setSuffix(' min')
+        self.finish_within_spin.setEnabled(False)
+        speed_row.addWidget(self.finish_within_spin)
+        settings_layout.addWidget(QLabel('Video Speed:'))
+        settings_layout.addLayout(speed_row)
+
+        # Delivery presets from preset files override the three settings above
+        self.delivery_combo = QComboBox()
+        self.delivery_combo.addItem('None (use settings above)')
+        self.delivery_combo.addItems(self.preset_library.names())
+        self.delivery_combo.currentIndexChanged.connect(self.change_delivery_preset)
+        settings_layout.addWidget(QLabel('Delivery Preset:'))
+        settings_layout.addWidget(self.delivery_combo)
+
+        # Queue scheduling policy
+        self.policy_combo = QComboBox()
+        # Deadlines are only set through the daemon API; here the policy would just act as Shortest First
+        self.policy_combo.addItems([p for p in POLICIES if p != POLICY_DEADLINE])
+        self.policy_combo.currentTextChanged.connect(self.change_policy)
+        settings_layout.addWidget(QLabel('Queue Policy:'))
+        settings_layout.addWidget(self.policy_combo)
+
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        settings_layout.addWidget(QLabel('Parallel Jobs:'))
+        settings_layout.addWidget(self.workers_spin)
+
+        self.background_chk = QCheckBox('Background mode (low priority, adaptive parallel jobs)')
+        self.background_chk.setToolTip('ffmpeg and Spleeter run at low CPU/I/O priority; up to Parallel Jobs run at once, '
+                                       'fewer while the system is loaded, short of memory or in use')
+        settings_layout.addWidget(self.background_chk)
 
         self.custom_name_input = QLineEdit()
         self.custom_name_input.setPlaceholderText('Optional: Custom output name (base)')
@@ -132,6 +273,11 @@ class ConverterApp(QMainWindow):
             self.sep_stems_chk.setToolTip('Spleeter not installed. Install spleeter and tensorflow to enable.')
         settings_layout.addWidget(self.sep_stems_chk)
 
+        self.split_chk = QCheckBox('Split on silence into tracks')
+        self.split_chk.setToolTip(f'Cut long captures at gaps of {MIN_SILENCE:g}+ s below {NOISE_DB:g} dB '
+                                  '(trimmed files are not split)')
+        settings_layout.addWidget(self.split_chk)
+
         # Watch folder
         watch_btn = QPushButton('Set & Watch Folder')
         watch_btn.clicked.connect(self.select_watch_folder)
@@ -157,6 +303,9 @@ class ConverterApp(QMainWindow):
         self.progress_bar.setValue(0)
         layout.addWidget(self.progress_bar)
 
+        self.batch_label = QLabel('')
+        layout.addWidget(self.batch_label)
+
         self.log_box = QTextEdit()
         self.log_box.setReadOnly(True)
         self.log_box.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -173,6 +322,10 @@ class ConverterApp(QMainWindow):
         stop_button.clicked.connect(self.stop_conversion)
         controls.addWidget(stop_button)
 
+        plan_button = QPushButton('Dry Run / Plan...')
+        plan_button.clicked.connect(self.show_plan)
+        controls.addWidget(plan_button)
+
         controls.addStretch()
         layout.addLayout(controls)
 
@@ -193,6 +346,10 @@ class ConverterApp(QMainWindow):
         export_logs_action.triggered.connect(self.save_logs)
         file_menu.addAction(export_logs_action)
 
+        cluster_action = QAction('Submit to Cluster Queue...', self)
+        cluster_action.triggered.connect(self.submit_to_cluster)
+        file_menu.addAction(cluster_action)
+
         exit_action = QAction('Exit', self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -299,7 +456,30 @@ class ConverterApp(QMainWindow):
 
     def update_time(self):
         now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.status.showMessage(f'Ready | {now}')
+        msg = f'Ready | {now}'
+        if self.cluster:
+            if not self.cluster_polling:
+                self.cluster_polling = True
+                threading.Thread(target=self._poll_cluster, args=(self.cluster,), name='ffx-cluster-status',
+                                 daemon=True).start()
+            if self.cluster_status:
+                msg += f' | Cluster: {self.cluster_status}'
+        self.status.showMessage(msg)
+
+    def _poll_cluster(self, cluster):
+        try:
+            st = cluster.status()
+            text = (f"{st['queued']} queued, {st['running']} running ({st['progress']:.0f}%),"
+                    f" {st['done']} done, {st['failed']} failed, {len(st['workers'])} workers")
+        except OSError:
+            text = 'unreachable'
+        self.cluster_status_ready.emit(cluster, text)
+
+    def show_cluster_status(self, cluster, text):
+        self.cluster_polling = False
+        # A poll of the previous queue folder still reports back after the user picked another one
+        if cluster is self.cluster:
+            self.cluster_status = text
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -311,10 +491,61 @@ class ConverterApp(QMainWindow):
             if os.path.isfile(file_path):
                 self.add_input_file(file_path)
 
-    def add_input_file(self, path):
+    def add_input_file(self, path, source=SOURCE_MANUAL):
         if path not in self.input_files:
+            self.jobs[path] = Job(path, len(self.input_files), source=source)
             self.input_files.append(path)
             self.file_list.addItem(path)
+            self.file_list.item(self.file_list.count() - 1).setData(Qt.UserRole, path)
+            self.peak_generator.request(path)
+            # Feed the running batch so new arrivals don't wait for the next one
+            if self.job_queue is not None and self.converter_thread and self.converter_thread.isRunning():
+                self.jobs[path].settings = self.converter_thread.settings
+                self.jobs[path].split = self._split_for(self.jobs[path])
+                self.job_queue.add(self.jobs[path])
+
+    def show_peaks(self, path, peaks):
+        self.peaks[path] = peaks
+        if peaks is None or path not in self.input_files:
+            return
+        item = self.file_list.item(self.input_files.index(path))
+        item.setIcon(QIcon(thumbnail(peaks)))
+        if self.file_list.currentItem() is item:
+            self.waveform_view.set_peaks(peaks)
+
+    def preview_waveform(self, item, previous=None):
+        self.waveform_view.set_peaks(self.peaks.get(item.data(Qt.UserRole)) if item else None)
+
+    def bump_selected(self):
+        if self.job_queue is None:
+            return
+        # Bump in reverse so the top-most selection ends up first
+        for item in reversed(self.file_list.selectedItems()):
+            job = self.jobs.get(item.data(Qt.UserRole))
+            if job:
+                self.job_queue.bump(job)
+                self.log_box.append(f'Bumped: {job.input_file}')
+
+    def cancel_selected(self):
+        if not (self.converter_thread and self.converter_thread.isRunning()):
+            return
+        for item in self.file_list.selectedItems():
+            job = self.jobs.get(item.data(Qt.UserRole))
+            if job and self.converter_thread.cancel_job(job.id):
+                self.log_box.append(f'Cancelling: {job.input_file}')
+
+    def change_delivery_preset(self, index):
+        custom = index == 0
+        for combo in (self.format_combo, self.quality_combo, self.enhance_combo, self.video_codec_combo, self.video_speed_combo):
+            combo.setEnabled(custom)
+        if not custom:
+            preset = self.preset_library.get(self.delivery_combo.currentText())
+            self.delivery_combo.setToolTip(preset.description if preset else '')
+
+    def change_policy(self, policy):
+        if self.job_queue is not None:
+            self.job_queue.set_policy(policy)
+        self.settings.setValue('queue_policy', policy)
 
     def select_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, 'Select Input Files')
@@ -324,7 +555,10 @@ class ConverterApp(QMainWindow):
 
     def clear_files(self):
         self.input_files = []
+        self.jobs = {}
+        self.peaks = {}
         self.file_list.clear()
+        self.waveform_view.set_peaks(None)
         self.log_box.clear()
 
     def select_output_folder(self):
@@ -340,6 +574,8 @@ class ConverterApp(QMainWindow):
             self.ffmpeg_path = path
             self.ffmpeg_label.setText(f'ffmpeg: {self.ffmpeg_path}')
             self.settings.setValue('ffmpeg_path', self.ffmpeg_path)
+            self.peak_generator.ffmpeg_path = self.ffmpeg_path
+            self.probe_capabilities()
 
     def select_watch_folder(self):
         if not WATCHDOG_AVAILABLE:
@@ -364,7 +600,7 @@ class ConverterApp(QMainWindow):
             while True:
                 path = self.watch_queue.get_nowait()
                 if os.path.isfile(path):
-                    self.add_input_file(path)
+                    self.add_input_file(path, source=SOURCE_WATCH)
                     self.log_box.append(f'Auto-added: {path}')
         except Exception:
             pass
@@ -390,36 +626,291 @@ class ConverterApp(QMainWindow):
             QMessageBox.warning(self, 'Error', 'ffmpeg not set. Please set ffmpeg path or add ffmpeg to PATH.')
             return
 
-        output_format = self.format_combo.currentText()
-        quality = self.quality_combo.currentText()
-        custom_name = self.custom_name_input.text().strip()
-        enhancement_mode = self.enhance_combo.currentText()
-        keep_meta = self.keep_meta_chk.isChecked()
-        separate_stems = self.sep_stems_chk.isChecked()
-
         # Save settings
-        self.settings.setValue('last_format', output_format)
-        self.settings.setValue('last_quality', quality)
-        self.settings.setValue('last_enhance', enhancement_mode)
+        self.settings.setValue('last_format', self.format_combo.currentText())
+        self.settings.setValue('last_quality', self.quality_combo.currentText())
+        self.settings.setValue('last_enhance', self.enhance_combo.currentText())
         self.settings.setValue('ffmpeg_path', self.ffmpeg_path)
         self.settings.setValue('output_folder', self.output_folder)
+        self.settings.setValue('parallel_jobs', self.workers_spin.value())
 
         self.progress_bar.setValue(0)
         self.log_box.append('Starting conversion...')
 
-        self.converter_thread = ConverterThread(
-            self.ffmpeg_path, self.input_files, self.output_folder, output_format, custom_name, quality, enhancement_mode, keep_meta, separate_stems
-        )
-        self.converter_thread.progress.connect(self.update_progress)
+        self.job_queue = JobQueue(self.policy_combo.currentText())
+        for path in self.input_files:
+            job = self.jobs[path]
+            job.reset()
+            job.boost = 0
+            job.split = self._split_for(job)
+            self.job_queue.add(job)
+        self._start_thread()
+
+    def merge_selected(self):
+        rows = sorted(self.file_list.row(item) for item in self.file_list.selectedItems())
+        if len(rows) < 2:
+            QMessageBox.warning(self, 'Error', 'Select at least two files to merge (they are joined in list order).')
+            return
+        if not self.output_folder or not self.ffmpeg_path:
+            QMessageBox.warning(self, 'Error', 'Set the output folder and ffmpeg path first.')
+            return
+        if self.converter_thread and self.converter_thread.isRunning():
+            QMessageBox.warning(self, 'Error', 'Wait for the running batch to finish.')
+            return
+        paths = [self.input_files[row] for row in rows]
+        self.progress_bar.setValue(0)
+        self.log_box.append(f'Merging {len(paths)} files into one output...')
+        self.job_queue = JobQueue(self.policy_combo.currentText())
+        self.job_queue.add(Job(paths[0], 0, inputs=paths))
+        self._start_thread()
+
+    def trim_selected(self):
+        items = self.file_list.selectedItems()
+        if not items:
+            QMessageBox.warning(self, 'Error', 'Select the files to trim.')
+            return
+        first = self.jobs[items[0].data(Qt.UserRole)]
+        dialog = QDialog(self)
+        dialog.setWindowTitle('Trim')
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel('Times as seconds or [h:]m:s; leave blank for the start/end of the file.'))
+        inputs = {}
+        for label, value in (('Start:', first.start), ('End:', first.end)):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(label))
+            inputs[label] = QLineEdit('' if value is None else f'{value:g}')
+            row.addWidget(inputs[label])
+            layout.addLayout(row)
+        accurate_chk = QCheckBox('Exact cut (re-encode video)')
+        accurate_chk.setToolTip('Stream copies start at the keyframe before Start; this cuts on the exact frame')
+        accurate_chk.setChecked(first.accurate_cut)
+        layout.addWidget(accurate_chk)
+        ok_button = QPushButton('Apply')
+        ok_button.clicked.connect(dialog.accept)
+        layout.addWidget(ok_button)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        try:
+            start, end = (parse_time(inputs[k].text()) if inputs[k].text().strip() else None for k in ('Start:', 'End:'))
+        except ValueError as e:
+            QMessageBox.warning(self, 'Error', str(e))
+            return
+        if end is not None and end <= (start or 0.0):
+            QMessageBox.warning(self, 'Error', 'End must be after Start.')
+            return
+        for item in items:
+            job = self.jobs[item.data(Qt.UserRole)]
+            job.start, job.end, job.accurate_cut = start, end, accurate_chk.isChecked()
+            job.duration = None  # re-probed for the new span
+            trimmed = start is not None or end is not None
+            item.setToolTip(f"Trim {format_duration(start or 0)} - {format_duration(end) if end is not None else 'end'}"
+                            if trimmed else '')
+            self.log_box.append(f'Trim set: {job.input_file}' if trimmed else f'Trim cleared: {job.input_file}')
+
+    def _start_thread(self):
+        settings = self._current_settings()
+        finish_within = self.finish_within_spin.value() * 60 if self.video_speed_combo.currentText() == 'Meet deadline' else None
+        self.converter_thread = ConverterThread(self.ffmpeg_path, self.job_queue, settings, workers=self.workers_spin.value(),
+                                                finish_within=finish_within, background=self.background_chk.isChecked())
+        self.converter_thread.updated.connect(self.engine_updated)
         self.converter_thread.finished.connect(self.conversion_finished)
-        self.converter_thread.log_signal.connect(self.update_logs)
         self.converter_thread.start()
 
+    def _split_for(self, job):
+        return split_options() if self.split_chk.isChecked() and job.start is None and job.end is None else None
+
+    def _current_settings(self):
+        return ConversionSettings(
+            self.output_folder, self.format_combo.currentText(), self.custom_name_input.text().strip(),
+            self.quality_combo.currentText(), self.enhance_combo.currentText(),
+            self.keep_meta_chk.isChecked(), self.sep_stems_chk.isChecked(),
+            delivery_preset=self.delivery_combo.currentText() if self.delivery_combo.currentIndex() > 0 else '',
+            video_codec=self.video_codec_combo.currentText(),
+            video_speed=self.video_speed_combo.currentText() if self.video_speed_combo.currentText() in SPEED_TIERS else 'balanced'
+        )
+
+    def show_plan(self):
+        if not self.input_files:
+            QMessageBox.warning(self, 'Error', 'No input files selected.')
+            return
+        if not self.output_folder or not self.ffmpeg_path:
+            QMessageBox.warning(self, 'Error', 'Set the output folder and ffmpeg path first.')
+            return
+        # Plan copies of the jobs so a running batch keeps its own settings
+        settings = self._current_settings()
+        plan_queue = JobQueue(self.policy_combo.currentText())
+        for path in self.input_files:
+            job = self.jobs[path]
+            plan_queue.add(Job(path, job.index, settings=settings, source=job.source, priority=job.priority,
+                               duration=job.duration, start=job.start, end=job.end, accurate_cut=job.accurate_cut,
+                               split=self._split_for(job)))
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            planner = Planner(CommandBuilder(self.ffmpeg_path))
+            if self.video_speed_combo.currentText() == 'Meet deadline':
+                planner.pick_speed(plan_queue.pending(), self.workers_spin.value(), self.finish_within_spin.value() * 60)
+            entries, summary = planner.plan(plan_queue.pending(), self.workers_spin.value())
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle('Conversion Plan')
+        dialog.resize(1000, 500)
+        layout = QVBoxLayout(dialog)
+        columns = ['Input', 'Decision', 'Reason', 'Est. Size', 'Est. Time', 'Command']
+        table = QTableWidget(len(entries), len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, e in enumerate(entries):
+            est_time = format_duration(e.seconds) if e.seconds else '-'
+            if e.seconds and not e.calibrated:
+                est_time += ' (guess)'
+            values = [os.path.basename(e.job.input_file), e.decision, e.reason,
+                      format_size(e.size) if e.size else '-', est_time, ' '.join(e.cmd) if e.cmd else '']
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        layout.addWidget(QLabel(
+            f"{summary['jobs']} job(s): {summary['re-encode']} re-encode, {summary['copy']} copy, "
+            f"{summary['skipped']} skipped. Output ~{format_size(summary['estimated_size'])}, "
+            f"~{format_duration(summary['estimated_wall_seconds'])} on {summary['workers']} worker(s), "
+            f"video speed '{settings.video_speed}'"
+            + (f" ({summary['uncalibrated']} estimate(s) not yet calibrated)" if summary['uncalibrated'] else '')
+        ))
+        close_button = QPushButton('Close')
+        close_button.clicked.connect(dialog.accept)
+        layout.addWidget(close_button)
+        dialog.exec_()
+
+    def preview_preset(self):
+        item = self.file_list.currentItem() or self.file_list.item(0)
+        if item is None:
+            QMessageBox.warning(self, 'Error', 'Add a file to preview.')
+            return
+        if not self.ffmpeg_path:
+            QMessageBox.warning(self, 'Error', 'Set the ffmpeg path first.')
+            return
+        path = item.data(Qt.UserRole)
+        settings = self._current_settings()
+        preset = settings.delivery_preset or settings.enhancement_mode
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f'Preview: {preset}')
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(os.path.basename(path)))
+        row = QHBoxLayout()
+        row.addWidget(QLabel('Start at (s):'))
+        offset_spin = QSpinBox()
+        offset_spin.setRange(0, 24 * 3600)
+        duration = self.jobs[path].duration if path in self.jobs else None
+        offset_spin.setValue(int(duration * 0.3) if duration else 0)
+        row.addWidget(offset_spin)
+        layout.addLayout(row)
+        status = QLabel('A plays the original excerpt, B the same excerpt through the preset.')
+        layout.addWidget(status)
+        # Only the latest click plays; renders still running for an earlier one are ignored
+        latest = [None]
+
+        def render(request, which, offset):
+            # Off the GUI thread: the filter chain may decode for 'Auto (Genre)' and a render can take a while
+            try:
+                af = CommandBuilder(self.ffmpeg_path).audio_filter(Job(path, 0, settings=settings))
+                excerpt = PreviewCache(self.ffmpeg_path).render_pair(path, offset, PREVIEW_SECONDS, af)[which]
+            except (OSError, ValueError, subprocess.SubprocessError) as e:
+                self.preview_ready.emit(request, None, str(e))
+            else:
+                self.preview_ready.emit(request, excerpt, None)
+
+        def play(which):
+            request = latest[0] = (which,)
+            status.setText(f"Rendering {'B (preset)' if which else 'A (original)'}...")
+            threading.Thread(target=render, args=(request, which, offset_spin.value()), name='ffx-preview',
+                             daemon=True).start()
+
+        def rendered(request, excerpt, error):
+            if request is not latest[0]:
+                return
+            if error:
+                status.setText(f'Preview failed: {error}')
+                return
+            self.stop_preview()
+            ffplay = which_ffplay(self.ffmpeg_path)
+            if not ffplay:
+                status.setText(f'ffplay not found; the excerpt is at {excerpt}')
+                return
+            self.preview_player = subprocess.Popen(play_cmd(ffplay, excerpt))
+            status.setText(f"Playing {'B (preset)' if request[0] else 'A (original)'}")
+
+        self.preview_ready.connect(rendered)
+
+        buttons = QHBoxLayout()
+        for label, which in (('A: Original', 0), ('B: With Preset', 1)):
+            button = QPushButton(label)
+            button.clicked.connect(lambda checked, which=which: play(which))
+            buttons.addWidget(button)
+        stop_button = QPushButton('Stop')
+        stop_button.clicked.connect(self.stop_preview)
+        buttons.addWidget(stop_button)
+        layout.addLayout(buttons)
+        dialog.finished.connect(lambda result: self.stop_preview())
+        dialog.exec_()
+        self.preview_ready.disconnect(rendered)
+
+    def stop_preview(self):
+        if self.preview_player is not None and self.preview_player.poll() is None:
+            self.preview_player.terminate()
+        self.preview_player = None
+
+    def submit_to_cluster(self):
+        if not self.input_files:
+            QMessageBox.warning(self, 'Error', 'No input files selected.')
+            return
+        if not self.output_folder:
+            QMessageBox.warning(self, 'Error', 'No output folder selected.')
+            return
+        root = QFileDialog.getExistingDirectory(self, 'Select Shared Cluster Queue Folder', self.settings.value('cluster_root', ''))
+        if not root:
+            return
+        try:
+            self.cluster = ClusterQueue(root)
+            self.cluster_status = ''
+            settings = self._current_settings()
+            for path in self.input_files:
+                job = self.jobs[path]
+                self.cluster.submit(path, settings, priority=job.priority, index=job.index, start=job.start, end=job.end,
+                                    accurate_cut=job.accurate_cut, split=self._split_for(job))
+        except OSError as e:
+            QMessageBox.warning(self, 'Error', f'Could not submit to cluster queue: {e}')
+            return
+        self.settings.setValue('cluster_root', root)
+        self.log_box.append(f'Submitted {len(self.input_files)} file(s) to cluster queue {root}')
+
     def stop_conversion(self):
         if self.converter_thread and self.converter_thread.isRunning():
             self.converter_thread.stop()
             self.log_box.append('Stop requested...')
 
+    def engine_updated(self, update):
+        # One batched append instead of one per ffmpeg line
+        if update['logs']:
+            self.update_logs('\n'.join(update['logs']))
+        if update['jobs']:
+            by_id = {job.id: path for path, job in self.jobs.items()}
+            for job_id, (state, progress) in update['jobs'].items():
+                path = by_id.get(job_id)
+                if path in self.input_files:
+                    item = self.file_list.item(self.input_files.index(path))
+                    item.setText(f'{path}  [{state} {progress}%]')
+        snapshot = update['progress']
+        if snapshot:
+            self.update_progress(int(snapshot['batch_progress']))
+            self.batch_label.setText(
+                f"Batch: {snapshot['done']}/{snapshot['total']} files | "
+                f"{snapshot['batch_progress']:.1f}% | {snapshot['speed']:.1f}x realtime | "
+                f"ETA {format_duration(snapshot['eta'])}"
+            )
+
     def update_progress(self, value):
         self.progress_bar.setValue(value)
 
@@ -431,6 +922,12 @@ class ConverterApp(QMainWindow):
         self.progress_bar.setValue(100 if success else 0)
 
     def closeEvent(self, event):
+        # Don't leave ffmpeg children running after the window is gone
+        if self.converter_thread and self.converter_thread.isRunning():
+            self.converter_thread.stop()
+            self.converter_thread.wait(10000)
+        self.peak_generator.stop()
+        self.stop_preview()
         # stop observer
         try:
             if self.watch_observer:
@@ -448,6 +945,13 @@ class ConverterApp(QMainWindow):
         self.settings.setValue('last_format', self.format_combo.currentText())
         self.settings.setValue('last_quality', self.quality_combo.currentText())
         self.settings.setValue('last_enhance', self.enhance_combo.currentText())
+        self.settings.setValue('last_delivery', self.delivery_combo.currentText())
+        self.settings.setValue('queue_policy', self.policy_combo.currentText())
+        self.settings.setValue('parallel_jobs', self.workers_spin.value())
+        self.settings.setValue('video_codec', self.video_codec_combo.currentText())
+        self.settings.setValue('video_speed', self.video_speed_combo.currentText())
+        self.settings.setValue('finish_within', self.finish_within_spin.value())
+        self.settings.setValue('background_mode', self.background_chk.isChecked())
 
     def load_settings(self):
         ff = self.settings.value('ffmpeg_path', '')
@@ -456,10 +960,17 @@ class ConverterApp(QMainWindow):
         q = self.settings.value('last_quality', '')
         enh = self.settings.value('last_enhance', '')
         watch = self.settings.value('watch_folder', '')
+        cluster_root = self.settings.value('cluster_root', '')
+        policy = self.settings.value('queue_policy', POLICY_FIFO)
+        delivery = self.settings.value('last_delivery', '')
+        workers = self.settings.value('parallel_jobs', 1, type=int)
+        video_codec = self.settings.value('video_codec', 'Auto')
+        video_speed = self.settings.value('video_speed', 'balanced')
 
         if ff:
             self.ffmpeg_path = ff
             self.ffmpeg_label.setText(f'ffmpeg: {self.ffmpeg_path}')
+            self.peak_generator.ffmpeg_path = ff
         if out:
             self.output_folder = out
             self.output_label.setText(f'Output Folder: {out}')
@@ -469,6 +980,19 @@ class ConverterApp(QMainWindow):
             self.quality_combo.setCurrentText(q)
         if enh:
             self.enhance_combo.setCurrentText(enh)
+        if delivery in self.preset_library.names():
+            self.delivery_combo.setCurrentText(delivery)
+        if policy in POLICIES:
+            self.policy_combo.setCurrentText(policy)
+        self.workers_spin.setValue(workers)
+        if video_codec in VIDEO_MODES:
+            self.video_codec_combo.setCurrentText(video_codec)
+        if video_speed in SPEED_TIERS + ['Meet deadline']:
+            self.video_speed_combo.setCurrentText(video_speed)
+        self.finish_within_spin.setValue(self.settings.value('finish_within', 60, type=int))
+        self.background_chk.setChecked(self.settings.value('background_mode', False, type=bool))
+        if cluster_root and os.path.isdir(cluster_root):
+            self.cluster = ClusterQueue(cluster_root)
         if watch and WATCHDOG_AVAILABLE:
             # try to auto-start watching
             try:
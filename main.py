@@ -1,10 +1,18 @@
 # main.py
+import multiprocessing
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QIcon
-from ffx_pro import ConverterApp
+
 
 def main():
+    # Any arguments select the headless command line; no arguments start the GUI
+    if len(sys.argv) > 1:
+        from modules.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QIcon
+    from ffx_pro import ConverterApp
+
     app = QApplication(sys.argv)
     window = ConverterApp()
 
@@ -15,4 +23,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Frozen (PyInstaller) builds: spawned analysis workers must run the worker, not the app again
+    multiprocessing.freeze_support()
     main()
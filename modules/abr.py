@@ -0,0 +1,88 @@
+# modules/abr.py
+import os
+
+# Output formats that write an adaptive-bitrate ladder: a directory of segments and manifests
+ABR_FORMATS = ('hls', 'dash')
+MANIFEST = {'hls': 'master.m3u8', 'dash': 'manifest.mpd'}
+SEGMENT_SECONDS = 4
+
+# (height, video bitrate cap, audio bitrate) per rendition, largest first
+VIDEO_LADDER = (
+    (1080, '5000k', '192k'),
+    (720, '2800k', '128k'),
+    (480, '1200k', '96k'),
+    (360, '700k', '64k'),
+)
+# Renditions of an audio-only ladder
+AUDIO_LADDER = ('192k', '128k', '64k')
+
+
+def is_abr(output_format):
+    return (output_format or '').lower() in ABR_FORMATS
+
+
+def manifest_path(output_dir, output_format):
+    return os.path.join(output_dir, MANIFEST[output_format.lower()])
+
+
+def video_rungs(height, ladder=VIDEO_LADDER):
+    """The rungs no taller than the source; one at the source height when it is below them all.
+
+    Upscaling only adds bytes, so a 720p source gets 720/480/360. An
+    unknown height keeps the whole ladder.
+    """
+    if not height:
+        return list(ladder)
+    rungs = [rung for rung in ladder if rung[0] <= height]
+    return rungs or [(height,) + tuple(ladder[-1][1:])]
+
+
+def _bufsize(rate):
+    # Two seconds of the cap: smooth enough for segment-sized bursts
+    return f'{int(rate[:-1]) * 2}{rate[-1]}'
+
+
+def ladder_args(output_format, output_dir, af, rungs, audio, video_args, audio_encoder,
+                segment=SEGMENT_SECONDS):
+    """Output args after '-i' for one process writing every rendition.
+
+    The source is decoded once: its audio goes through the enhancement
+    chain af once and is then split, the video is split and scaled per rung.
+    rungs are (height, cap, audio bitrate) for a video ladder, or empty with
+    audio listing the bitrates of an audio-only ladder.
+    """
+    fmt = output_format.lower()
+    count = len(rungs) or len(audio)
+    graph = []
+    if audio:
+        labels = ''.join(f'[a{i}]' for i in range(count))
+        graph.append(f"[0:a:0]{af + ',' if af else ''}asplit={count}{labels}")
+    if rungs:
+        graph.append(f"[0:v:0]split={count}{''.join(f'[v{i}]' for i in range(count))}")
+        graph += [f'[v{i}]scale=-2:{height}[v{i}o]' for i, (height, _, _) in enumerate(rungs)]
+
+    args = ['-filter_complex', ';'.join(graph)]
+    for i in range(count):
+        args += (['-map', f'[v{i}o]'] if rungs else []) + (['-map', f'[a{i}]'] if audio else [])
+    if rungs:
+        # Capped CRF: each rendition keeps the profile's quality but never passes its rung's cap
+        args += list(video_args)
+        for i, (_, cap, _) in enumerate(rungs):
+            args += [f'-maxrate:v:{i}', cap, f'-bufsize:v:{i}', _bufsize(cap)]
+        # Keyframes on segment boundaries so every rendition switches at the same points
+        args += ['-force_key_frames', f'expr:gte(t,n_forced*{segment})']
+    if audio:
+        args += ['-c:a', audio_encoder]
+        for i, bitrate in enumerate(audio):
+            args += [f'-b:a:{i}', bitrate]
+
+    if fmt == 'hls':
+        streams = ' '.join(','.join(([f'v:{i}'] if rungs else []) + ([f'a:{i}'] if audio else []))
+                           for i in range(count))
+        return args + ['-f', 'hls', '-hls_time', str(segment), '-hls_playlist_type', 'vod',
+                       '-hls_segment_filename', os.path.join(output_dir, 'stream_%v', 'seg_%05d.ts'),
+                       '-master_pl_name', MANIFEST['hls'], '-var_stream_map', streams,
+                       os.path.join(output_dir, 'stream_%v', 'index.m3u8')]
+    adaptation = ' '.join((['id=0,streams=v'] if rungs else []) + ([f'id={1 if rungs else 0},streams=a'] if audio else []))
+    return args + ['-f', 'dash', '-seg_duration', str(segment), '-use_template', '1', '-use_timeline', '1',
+                   '-adaptation_sets', adaptation, manifest_path(output_dir, fmt)]
@@ -0,0 +1,129 @@
+# modules/analysis.py
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures.process import BrokenProcessPool
+
+NUMPY_AVAILABLE = True
+try:
+    import numpy as np
+    from multiprocessing import shared_memory
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Analysis workers yield to ffmpeg and the GUI
+WORKER_NICE = 5
+
+_buffers = weakref.WeakSet()
+
+
+class SharedBuffer:
+    """A NumPy array in shared memory; pool workers read it without a copy.
+
+    Fill `array` in this process, then hand the buffer to
+    AnalysisPool.run_shared(). close() frees the block; buffers still open
+    at exit are freed then.
+    """
+
+    def __init__(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        self.handle = (self._shm.name, tuple(shape), dtype.str)
+        _buffers.add(self)
+
+    def close(self):
+        if self._shm is None:
+            return
+        # Views must go before the mapping can be closed
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # someone still holds a view; the mapping goes with the process
+        self._shm.unlink()
+        self._shm = None
+
+
+def _call_shared(fn, handle, args):
+    # Runs in the worker: map the block, call fn on it, unmap (fn must not keep views)
+    name, shape, dtype = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        result = fn(array, *args)
+        del array
+        return result
+    finally:
+        shm.close()
+
+
+def _lower_priority():
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(WORKER_NICE)
+        except OSError:
+            pass
+
+
+class AnalysisPool:
+    """Worker processes for CPU-bound Python analysis (features, peaks, loudness math).
+
+    Keeps that work off the GIL shared by the GUI and the supervisor loop.
+    Sample buffers travel as SharedBuffer handles instead of being pickled.
+    Workers are spawned (not forked, the parent has Qt and asyncio threads)
+    on first use. If the pool can't start or a worker dies, the call runs in
+    the calling thread instead.
+    """
+
+    _default = None
+
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_lower_priority
+                )
+            return self._executor
+
+    def run(self, fn, *args):
+        """fn(*args) in a worker process; blocks the calling thread (not the GIL) until done."""
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        except (BrokenProcessPool, OSError):
+            with self._lock:
+                self._executor = None
+            return fn(*args)
+
+    def run_shared(self, fn, buffer, *args):
+        """fn(buffer's array, *args) in a worker, with the array mapped from shared memory."""
+        return self.run(_call_shared, fn, buffer.handle, args)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+@atexit.register
+def _cleanup():
+    if AnalysisPool._default is not None:
+        AnalysisPool._default.shutdown()
+    for buffer in list(_buffers):
+        buffer.close()
@@ -0,0 +1,155 @@
+# modules/background.py
+import ctypes
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+# Niceness of ffmpeg/Spleeter children in background mode; I/O goes to the lowest best-effort level
+NICE = 10
+IONICE = ['-c', '2', '-n', '7']
+
+# Seconds between load samples
+SAMPLE_INTERVAL = 5.0
+# 1-minute load average per CPU above which the pool shrinks; below LOAD_LOW it may grow
+LOAD_HIGH = 0.9
+LOAD_LOW = 0.6
+# Shrink when less than this fraction of memory is available, or tasks stall on memory this % of the time
+MEMORY_LOW = 0.15
+MEMORY_STALL = 10.0
+# Keyboard/mouse input within this many seconds means someone is at the machine
+ACTIVE_SECONDS = 120
+
+_PSI_SOME = re.compile(r'^some avg10=(\d+(?:\.\d+)?)', re.M)
+_HID_IDLE = re.compile(r'"HIDIdleTime"\s*=\s*(\d+)')
+_prefix = None
+
+
+def priority_prefix():
+    """Command prefix that starts a child at background CPU and I/O priority ([] on Windows).
+
+    nice and ionice exec the command, so the child keeps its pid and
+    process group; every thread it starts inherits the priority.
+    """
+    global _prefix
+    if _prefix is None:
+        _prefix = []
+        if os.name != 'nt':
+            if sys.platform.startswith('linux') and shutil.which('ionice'):
+                _prefix += ['ionice'] + IONICE
+            if shutil.which('nice'):
+                _prefix += ['nice', '-n', str(NICE)]
+    return list(_prefix)
+
+
+def load_per_cpu():
+    """1-minute load average divided by the CPU count, or None where there is none (Windows)."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def memory_available():
+    """Fraction of physical memory available, or None if unknown."""
+    if os.name == 'nt':
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong)] + [
+                (name, ctypes.c_ulonglong) for name in ('ullTotalPhys', 'ullAvailPhys', 'ullTotalPageFile',
+                                                        'ullAvailPageFile', 'ullTotalVirtual', 'ullAvailVirtual',
+                                                        'ullAvailExtendedVirtual')]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullAvailPhys / status.ullTotalPhys
+    try:
+        with open('/proc/meminfo') as f:
+            info = dict(line.split(':', 1) for line in f)
+        return int(info['MemAvailable'].split()[0]) / int(info['MemTotal'].split()[0])
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+def memory_stall():
+    """Percent of the last 10 s some task waited on memory (Linux PSI), or None."""
+    try:
+        with open('/proc/pressure/memory') as f:
+            m = _PSI_SOME.search(f.read())
+    except OSError:
+        return None
+    return float(m.group(1)) if m else None
+
+
+def user_idle_seconds():
+    """Seconds since the last keyboard/mouse input, or None if it can't be told.
+
+    Windows asks GetLastInputInfo, macOS reads HIDIdleTime from ioreg, and
+    X11 sessions use xprintidle when it is installed.
+    """
+    try:
+        if os.name == 'nt':
+            class LASTINPUTINFO(ctypes.Structure):
+                _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+            info = LASTINPUTINFO()
+            info.cbSize = ctypes.sizeof(info)
+            if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+                return None
+            return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+        if sys.platform == 'darwin':
+            out = subprocess.run(['ioreg', '-c', 'IOHIDSystem', '-d', '4'], stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, universal_newlines=True, timeout=5).stdout
+            m = _HID_IDLE.search(out)
+            return int(m.group(1)) / 1e9 if m else None
+        if os.environ.get('DISPLAY') and shutil.which('xprintidle'):
+            out = subprocess.run(['xprintidle'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                 universal_newlines=True, timeout=5).stdout
+            return int(out.strip()) / 1000.0
+    except (OSError, ValueError, AttributeError, subprocess.SubprocessError):
+        pass
+    return None
+
+
+class LoadGovernor:
+    """Worker count for background mode, re-evaluated every `interval` seconds.
+
+    Starts at one worker and moves a step at a time between 1 and
+    max_workers: down while the load average per CPU is above load_high or
+    memory runs short, up once load is below load_low and memory is fine.
+    While someone is using the machine it drops straight back to one.
+    Signals this platform can't provide are left out of the decision.
+    """
+
+    def __init__(self, max_workers, interval=SAMPLE_INTERVAL, load_high=LOAD_HIGH, load_low=LOAD_LOW,
+                 memory_low=MEMORY_LOW, memory_stall=MEMORY_STALL, active_seconds=ACTIVE_SECONDS):
+        self.max_workers = max(1, int(max_workers))
+        self.interval = interval
+        self.load_high = load_high
+        self.load_low = load_low
+        self.memory_low = memory_low
+        self.memory_stall = memory_stall
+        self.active_seconds = active_seconds
+        self.limit = 1
+        self.reason = 'starting'
+
+    def sample(self):
+        return {'load': load_per_cpu(), 'memory': memory_available(), 'stall': memory_stall(),
+                'idle': user_idle_seconds()}
+
+    def update(self, sample=None):
+        """Take a sample (or use the one given) and return (limit, reason)."""
+        s = sample if sample is not None else self.sample()
+        load, memory, stall, idle = s.get('load'), s.get('memory'), s.get('stall'), s.get('idle')
+        if idle is not None and idle < self.active_seconds:
+            self.limit, self.reason = 1, 'user active'
+        elif memory is not None and memory < self.memory_low:
+            self.limit, self.reason = max(1, self.limit - 1), f'{memory:.0%} memory available'
+        elif stall is not None and stall > self.memory_stall:
+            self.limit, self.reason = max(1, self.limit - 1), f'memory pressure {stall:.0f}%'
+        elif load is not None and load > self.load_high:
+            self.limit, self.reason = max(1, self.limit - 1), f'load {load:.2f} per CPU'
+        elif load is None or load < self.load_low:
+            self.limit = min(self.max_workers, self.limit + 1)
+            self.reason = 'idle system' if load is None else f'load {load:.2f} per CPU'
+        return self.limit, self.reason
@@ -0,0 +1,128 @@
+# modules/capabilities.py
+import json
+import os
+import subprocess
+import threading
+
+CAPABILITY_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.ffxpro', 'capabilities.json')
+
+# Encoders to try, in order, when the preferred one isn't compiled in
+ENCODER_FALLBACKS = {
+    'libmp3lame': ['libmp3lame', 'libshine', 'mp3_mf'],
+    'aac': ['aac', 'libfdk_aac', 'aac_mf', 'aac_at'],
+    'libopus': ['libopus', 'libvorbis'],
+}
+
+_memory = {}
+_lock = threading.Lock()
+
+
+class Capabilities:
+    """What one ffmpeg binary can do: version line, encoders, filters and hwaccels."""
+
+    def __init__(self, version='', encoders=(), filters=(), hwaccels=()):
+        self.version = version
+        self.encoders = set(encoders)
+        self.filters = set(filters)
+        self.hwaccels = list(hwaccels)
+
+    def to_dict(self):
+        return {'version': self.version, 'encoders': sorted(self.encoders), 'filters': sorted(self.filters),
+                'hwaccels': self.hwaccels}
+
+    def pick_encoder(self, preferred):
+        """preferred if available, else its first available fallback, else None."""
+        for name in ENCODER_FALLBACKS.get(preferred, [preferred]):
+            if name in self.encoders:
+                return name
+        return None
+
+    def missing(self, encoders=(), filters=()):
+        """Human-readable list of what this build lacks, e.g. ['encoder libmp3lame']."""
+        return ([f'encoder {e}' for e in encoders if e not in self.encoders]
+                + [f'filter {f}' for f in filters if f not in self.filters])
+
+
+def _run(ffmpeg_path, flag):
+    return subprocess.run([ffmpeg_path, '-hide_banner', flag], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          universal_newlines=True, timeout=30).stdout
+
+
+def _names(out):
+    # `-encoders` / `-filters` entry lines: flags, name, description
+    names = set()
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] != '=':
+            names.add(parts[1])
+    return names
+
+
+def probe_capabilities(ffmpeg_path):
+    """Run ffmpeg -version/-encoders/-filters/-hwaccels. Raises OSError/SubprocessError."""
+    version = _run(ffmpeg_path, '-version').split('\n', 1)[0].strip()
+    hwaccels = _run(ffmpeg_path, '-hwaccels').splitlines()
+    return Capabilities(
+        version, _names(_run(ffmpeg_path, '-encoders')), _names(_run(ffmpeg_path, '-filters')),
+        [h.strip() for h in hwaccels[1:] if h.strip()] if hwaccels and ':' in hwaccels[0] else []
+    )
+
+
+def _cache_key(ffmpeg_path):
+    # A rebuilt or replaced binary has a new mtime/size, which invalidates its entry
+    path = os.path.realpath(ffmpeg_path)
+    st = os.stat(path)
+    return f'{path}|{st.st_mtime}|{st.st_size}'
+
+
+def get_capabilities(ffmpeg_path, cache_path=CAPABILITY_CACHE_PATH, refresh=False):
+    """Capabilities of ffmpeg_path from memory, the disk cache or a fresh probe.
+
+    Returns None if the binary can't be run or lists no encoders, in which
+    case callers should not restrict anything. refresh=True skips both caches.
+    """
+    if not ffmpeg_path:
+        return None
+    try:
+        key = _cache_key(ffmpeg_path)
+    except OSError:
+        key = ffmpeg_path
+    with _lock:
+        if key in _memory and not refresh:
+            return _memory[key]
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        if key in cache and not refresh:
+            caps = _memory[key] = Capabilities(**cache[key])
+            return caps
+        try:
+            caps = probe_capabilities(ffmpeg_path)
+        except (OSError, subprocess.SubprocessError):
+            caps = None
+        if caps is not None and not caps.encoders:
+            caps = None
+        _memory[key] = caps
+        if caps is not None:
+            cache[key] = caps.to_dict()
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(cache, f)
+                os.replace(cache_path + '.tmp', cache_path)
+            except OSError:
+                pass
+        return caps
+
+
+def load_async(ffmpeg_path, callback=None):
+    """Probe in a background thread; callback(caps) runs on that thread when done."""
+    def run():
+        caps = get_capabilities(ffmpeg_path)
+        if callback:
+            callback(caps)
+    thread = threading.Thread(target=run, name='ffx-capabilities', daemon=True)
+    thread.start()
+    return thread
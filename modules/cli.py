@@ -0,0 +1,497 @@
+# modules/cli.py
+import argparse
+import json
+import os
+import subprocess
+import sys
+from modules.command_builder import ConversionSettings
+from modules.job_queue import POLICIES, POLICY_FIFO, POLICY_PRIORITY
+from modules.quality import AUDIO_TARGET, QUALITY_TARGET, VIDEO_TARGET
+from modules.silence import MIN_SILENCE, MIN_TRACK, NOISE_DB, split_options
+from modules.utils import which_ffmpeg, format_duration, parse_time
+from modules.video import SPEED_TIERS, VIDEO_MODES
+
+
+def _add_conversion_args(parser):
+    parser.add_argument('--ffmpeg', help='ffmpeg executable (default: auto-detect)')
+    parser.add_argument('--output-folder', '-o', help='Output folder')
+    parser.add_argument('--format', '-f', default='mp3',
+                        help='Output format (default: mp3); hls or dash writes an adaptive-bitrate ladder directory')
+    parser.add_argument('--quality', '-q', default='High', choices=['High', 'Medium', 'Low', QUALITY_TARGET],
+                        help=f'{QUALITY_TARGET}: test an excerpt at several bitrates/CRFs and keep the smallest that passes')
+    parser.add_argument('--target-snr', type=float, metavar='DB',
+                        help=f'Audio score a {QUALITY_TARGET} encode must reach (default: {AUDIO_TARGET:g} dB spectral SNR)')
+    parser.add_argument('--target-ssim', type=float, metavar='SSIM',
+                        help=f'Video score a {QUALITY_TARGET} encode must reach (default: {VIDEO_TARGET:g})')
+    parser.add_argument('--preset', default='None', help='Enhancement preset, e.g. "Rock EQ"')
+    parser.add_argument('--delivery', default='', help='Delivery preset from a preset file (overrides format/quality/preset)')
+    parser.add_argument('--video-codec', default='Auto', choices=VIDEO_MODES,
+                        help='Video containers: copy when compatible (Auto), always copy, or encode with a profile')
+    parser.add_argument('--video-speed', default='balanced', choices=SPEED_TIERS, help='Encoder speed tier')
+    parser.add_argument('--custom-name', default='', help='Custom output base name')
+    parser.add_argument('--no-metadata', action='store_true', help='Do not copy source metadata')
+    parser.add_argument('--separate-stems', action='store_true', help='Run Spleeter after conversion')
+    parser.add_argument('--stem-workers', type=int, default=1,
+                        help='Parallel Spleeter runs; they overlap the next encodes (default: 1)')
+    parser.add_argument('--stem-memory', type=int, default=4096,
+                        help='Memory ceiling for stem separation (MB); long tracks are split into chunks to fit')
+    parser.add_argument('--workers', '-j', type=int, default=1, help='Parallel conversions')
+    parser.add_argument('--background', action='store_true',
+                        help='Low CPU/I/O priority; run up to --workers at once, fewer while the machine is busy or in use')
+    parser.add_argument('--timeout', type=float, help='Kill a job that runs longer than this (seconds)')
+    parser.add_argument('--stall-timeout', type=float, help='Kill a job that prints nothing for this long (seconds)')
+    parser.add_argument('--min-free', type=int, default=512, help='Pause new jobs below this much free output space (MB)')
+
+
+def _engine_from_args(args, ffmpeg_path, **kwargs):
+    from modules.diskspace import DiskGuard
+    from modules.engine import ConversionEngine
+    return ConversionEngine(ffmpeg_path, workers=args.workers, job_timeout=args.timeout,
+                            stall_timeout=args.stall_timeout, disk_guard=DiskGuard(args.min_free * 1024 * 1024),
+                            stem_workers=args.stem_workers, stem_memory_limit=args.stem_memory * 1024 * 1024,
+                            background=args.background, **kwargs)
+
+
+def _settings_from_args(args):
+    return ConversionSettings(
+        args.output_folder, args.format, args.custom_name, args.quality, args.preset,
+        keep_metadata=not args.no_metadata, separate_stems=args.separate_stems, delivery_preset=args.delivery,
+        video_codec=args.video_codec, video_speed=args.video_speed, target_snr=args.target_snr,
+        target_ssim=args.target_ssim
+    )
+
+
+def _trim_from_args(args):
+    end = args.end
+    if end is None and args.duration is not None:
+        end = (args.start or 0.0) + args.duration
+    return {'start': args.start, 'end': end, 'accurate_cut': args.accurate_cut}
+
+
+def _queue_from_args(args, settings):
+    from modules.job_queue import Job, JobQueue
+    queue = JobQueue(args.policy)
+    trim = _trim_from_args(args)
+    if args.merge:
+        # One job joining every input, in the order given
+        queue.add(Job(args.inputs[0], 0, settings=settings, inputs=args.inputs, **trim))
+    else:
+        split = split_options(args.split_noise, args.split_gap, args.min_track) if args.split else None
+        for idx, path in enumerate(args.inputs):
+            queue.add(Job(path, idx, settings=settings, split=split, **trim))
+    return queue
+
+
+def _add_trim_args(parser):
+    parser.add_argument('--start', type=parse_time, metavar='TIME', help='Convert from this point (seconds or HH:MM:SS)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--end', type=parse_time, metavar='TIME', help='Stop at this point of the input')
+    group.add_argument('--duration', type=parse_time, metavar='TIME', help='Convert this much from --start')
+    parser.add_argument('--accurate-cut', action='store_true',
+                        help='Re-encode video so the clip starts exactly at --start, not at the keyframe before it')
+
+
+def _add_split_args(parser):
+    parser.add_argument('--split', action='store_true',
+                        help='Split each input at silences into tracks that convert in parallel')
+    parser.add_argument('--split-noise', type=float, default=NOISE_DB, metavar='DB',
+                        help=f'Quieter than this counts as silence (default: {NOISE_DB:g} dB)')
+    parser.add_argument('--split-gap', type=float, default=MIN_SILENCE, metavar='SECONDS',
+                        help=f'Shortest silence that separates tracks (default: {MIN_SILENCE:g})')
+    parser.add_argument('--min-track', type=float, default=MIN_TRACK, metavar='SECONDS',
+                        help=f'Shorter pieces are joined to the next track (default: {MIN_TRACK:g})')
+
+
+def _ffmpeg_from_args(args):
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return args.ffmpeg or which_ffmpeg(packaged_path=base_dir)
+
+
+def cmd_convert(args):
+    from modules.diskspace import preflight, format_size
+    from modules.engine import EngineListener
+    from modules.job_queue import STATE_DONE
+
+    class _Printer(EngineListener):
+        def job_finished(self, job):
+            target = job.output_file or (job.message if job.split is not None else '-')
+            print(f'\r{job.state:9} {job.input_file} -> {target}', flush=True)
+            if job.state != STATE_DONE:
+                failed.append(job)
+
+        def progress(self, snapshot):
+            if sys.stdout.isatty():
+                print(f"\r[{snapshot['done']}/{snapshot['total']}] {snapshot['batch_progress']:5.1f}% "
+                      f"{snapshot['speed']:.1f}x ETA {format_duration(snapshot['eta'])}  ", end='', flush=True)
+
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if not ffmpeg_path:
+        print('ffmpeg not found. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    if not args.output_folder:
+        print('--output-folder is required.')
+        return 1
+    if args.delivery:
+        from modules.presets import PresetLibrary
+        if PresetLibrary.default(ffmpeg_path).get(args.delivery) is None:
+            print(f'Unknown or unsupported delivery preset: {args.delivery} (see "presets list")')
+            return 1
+    failed = []
+    settings = _settings_from_args(args)
+    queue = _queue_from_args(args, settings)
+    engine = _engine_from_args(args, ffmpeg_path, queue=queue, listener=_Printer())
+    try:
+        # Fail fast on encoders/filters this ffmpeg lacks instead of failing every job
+        engine.builder.build(queue.pending()[0])
+    except ValueError as e:
+        print(f'Cannot convert: {e}')
+        return 1
+    if args.finish_within:
+        from modules.planner import Planner
+        tier, summary = Planner(engine.builder).pick_speed(queue.pending(), args.workers, args.finish_within * 60)
+        print(f"Video speed '{tier}': estimated {format_duration(summary['estimated_wall_seconds'])} "
+              f"for a {args.finish_within:g} min target.")
+    short = preflight(engine.builder, queue.pending_unordered(), engine.disk_guard.min_free)
+    for folder, needed, free in short:
+        print(f'Estimated output {format_size(needed)} does not fit on {folder} ({format_size(free)} free, '
+              f'{args.min_free} MB reserve).')
+    if short and not args.ignore_space:
+        print('Aborting; free some space or pass --ignore-space to convert what fits.')
+        return 1
+    engine.start(drain=True)
+    try:
+        engine.wait()
+    except KeyboardInterrupt:
+        engine.shutdown()
+        return 130
+    engine.supervisor.stop()
+    return 1 if failed else 0
+
+
+def cmd_plan(args):
+    from modules.command_builder import CommandBuilder
+    from modules.planner import Planner
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if not ffmpeg_path:
+        print('ffmpeg not found. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    if not args.output_folder:
+        print('--output-folder is required.')
+        return 1
+    settings = _settings_from_args(args)
+    queue = _queue_from_args(args, settings)
+    planner = Planner(CommandBuilder(ffmpeg_path))
+    if args.finish_within:
+        planner.pick_speed(queue.pending(), args.workers, args.finish_within * 60)
+    entries, summary = planner.plan(queue.pending(), args.workers)
+    summary['video_speed'] = settings.video_speed
+    print(json.dumps({'summary': summary, 'jobs': [e.to_dict() for e in entries]}, indent=2))
+    return 0
+
+
+def cmd_daemon(args):
+    from modules.daemon import ConversionDaemon
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if not ffmpeg_path:
+        print('ffmpeg not found. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    daemon = ConversionDaemon(
+        ffmpeg_path, _settings_from_args(args), workers=args.workers, policy=args.policy,
+        host=args.host, port=args.port, socket_path=args.socket,
+        job_timeout=args.timeout, stall_timeout=args.stall_timeout, min_free=args.min_free * 1024 * 1024,
+        stem_workers=args.stem_workers, stem_memory_limit=args.stem_memory * 1024 * 1024, background=args.background
+    )
+    daemon.serve_forever()
+    return 0
+
+
+def cmd_cluster_submit(args):
+    from modules.cluster import ClusterQueue
+    if not args.output_folder:
+        print('--output-folder is required (it must be reachable from every worker).')
+        return 1
+    cluster = ClusterQueue(args.root)
+    settings = _settings_from_args(args)
+    trim = _trim_from_args(args)
+    for idx, path in enumerate(args.inputs):
+        job_id = cluster.submit(os.path.abspath(path), settings, priority=args.priority, index=idx, **trim)
+        print(f'{job_id}  {path}')
+    return 0
+
+
+def cmd_cluster_worker(args):
+    from modules.cluster import ClusterQueue, ClusterWorker
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if not ffmpeg_path:
+        print('ffmpeg not found. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    ClusterWorker(ClusterQueue(args.root), ffmpeg_path, workers=args.workers, job_timeout=args.timeout,
+                  stall_timeout=args.stall_timeout, min_free=args.min_free * 1024 * 1024,
+                  stem_workers=args.stem_workers, stem_memory_limit=args.stem_memory * 1024 * 1024,
+                  background=args.background).run()
+    return 0
+
+
+def cmd_cluster_status(args):
+    from modules.cluster import ClusterQueue
+    status = ClusterQueue(args.root).status()
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print(f"queued {status['queued']}  running {status['running']}  done {status['done']}  "
+              f"failed {status['failed']}  workers {len(status['workers'])}  progress {status['progress']:.0f}%")
+    return 0
+
+
+def cmd_history_report(args):
+    from modules.history import HistoryStore, host_name
+    host = None if args.all_hosts else host_name()
+    rows = HistoryStore.default().report(host, by=args.by)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    if not rows:
+        print('No recorded runs yet.')
+    for row in rows:
+        where = 'on this host' if row['host'] == host_name() else f"on {row['host']}"
+        what = {'preset': row.get('preset'), 'codec': f"from {row.get('codec')}",
+                'concurrency': f"with {row.get('concurrency')} parallel job(s)"}[args.by]
+        print(f"{row['format'].upper()} {what} averages {row['realtime']:.0f}x realtime {where} "
+              f"({row['runs']} run(s), {format_duration(row['media_seconds'])} of media)")
+    return 0
+
+
+def cmd_history_compact(args):
+    from modules.history import HistoryStore
+    folded = HistoryStore.default().compact(args.keep_days)
+    print(f'Folded {folded} run(s) older than {args.keep_days} day(s) into totals.')
+    return 0
+
+
+def cmd_loadtest(args):
+    from modules.diskspace import format_size
+    from modules.loadtest import run_load_test
+    profile = None
+    if args.profile:
+        with open(args.profile, encoding='utf-8') as f:
+            profile = json.load(f)
+
+    def show(snapshot):
+        if sys.stdout.isatty() and not args.json:
+            print(f"\r[{snapshot['done']}/{snapshot['total']}] {snapshot['batch_progress']:5.1f}%  ", end='', flush=True)
+
+    result = run_load_test(args.jobs, args.workers, profile, args.fail_rate, args.cancel_every, args.tracemalloc,
+                           args.keep, show)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"\r{result['jobs']} jobs on {result['workers']} workers in {result['wall_seconds']:.1f} s "
+          f"({result['jobs_per_second']:.0f} jobs/s, submit {result['submit_seconds']:.2f} s): "
+          + ', '.join(f'{n} {state}' for state, n in sorted(result['states'].items())))
+    for failure in result['failures']:
+        print(f'  {failure}')
+    print(f"Slots busy {result['slot_utilisation']:.0%}, idle {result['idle_ms_per_job']:.1f} ms per job, "
+          f"mean job {result['mean_job_seconds'] * 1000:.0f} ms")
+    print(f"Orchestrator CPU {result['orchestrator_cpu_seconds']:.1f} s ({result['cpu_ms_per_job']:.2f} ms per job), "
+          f"loop lag mean {result['loop_lag_ms']['mean'] or 0:.1f} ms, max {result['loop_lag_ms']['max'] or 0:.1f} ms")
+    print(f"Callbacks {sum(result['callbacks'].values())} ({result['callbacks_per_second']:.0f}/s): "
+          + ', '.join(f'{name} {n}' for name, n in sorted(result['callbacks'].items())))
+    memory = [f"peak RSS {format_size(result['peak_rss_bytes'])}" if result['peak_rss_bytes'] else None,
+              f"traced peak {format_size(result['traced_peak_bytes'])}" if result['traced_peak_bytes'] else None,
+              f"{result['retained_jobs']} jobs retained"]
+    print('Memory: ' + ', '.join(m for m in memory if m))
+    if result['work_dir']:
+        print(f"Kept {result['work_dir']}")
+    return 0
+
+
+def cmd_fake_ffmpeg(args):
+    from modules.fakeff import write_launcher
+    print(write_launcher(args.directory, args.profile))
+    return 0
+
+
+def cmd_capabilities(args):
+    from modules.capabilities import ENCODER_FALLBACKS, get_capabilities
+    ffmpeg_path = _ffmpeg_from_args(args)
+    caps = get_capabilities(ffmpeg_path, refresh=args.refresh) if ffmpeg_path else None
+    if caps is None:
+        print('ffmpeg not found or not runnable. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    if args.json:
+        print(json.dumps(dict(caps.to_dict(), path=ffmpeg_path), indent=2))
+        return 0
+    print(f'{ffmpeg_path}: {caps.version}')
+    print(f'{len(caps.encoders)} encoders, {len(caps.filters)} filters, hwaccels: {", ".join(caps.hwaccels) or "none"}')
+    for preferred in list(ENCODER_FALLBACKS) + ['libx264', 'libx265', 'libvpx-vp9']:
+        picked = caps.pick_encoder(preferred)
+        note = 'missing' if picked is None else 'ok' if picked == preferred else f'using {picked}'
+        print(f'  {preferred:12} {note}')
+    return 0
+
+
+def cmd_preview(args):
+    from modules.command_builder import CommandBuilder
+    from modules.job_queue import Job
+    from modules.preview import PreviewCache, play_cmd
+    from modules.utils import which_ffplay
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if not ffmpeg_path:
+        print('ffmpeg not found. Use --ffmpeg or add ffmpeg to PATH.')
+        return 1
+    settings = ConversionSettings(None, 'wav', enhancement_mode=args.preset, delivery_preset=args.delivery)
+    try:
+        af = CommandBuilder(ffmpeg_path).audio_filter(Job(args.input, 0, settings=settings))
+        original, processed = PreviewCache(ffmpeg_path).render_pair(args.input, args.offset, args.seconds, af)
+    except (OSError, ValueError) as e:
+        print(f'Preview failed: {e}')
+        return 1
+    print(f'A (original):  {original}')
+    print(f'B (processed): {processed}')
+    print(f'Filter: {af or "none"}')
+    if args.play:
+        ffplay = which_ffplay(ffmpeg_path)
+        if not ffplay:
+            print('ffplay not found; play the files above with any player.')
+            return 1
+        for label, path in (('A', original), ('B', processed)):
+            print(f'Playing {label}...')
+            subprocess.run(play_cmd(ffplay, path))
+    return 0
+
+
+def cmd_presets(args):
+    from modules.presets import PresetLibrary
+    library = PresetLibrary(args.dirs) if args.dirs else PresetLibrary()
+    ffmpeg_path = _ffmpeg_from_args(args)
+    if ffmpeg_path:
+        library.validate(ffmpeg_path)
+    if args.json:
+        print(json.dumps({
+            'presets': [library.get(name).to_dict() for name in library.names()],
+            'errors': [{'file': f, 'preset': n, 'error': e} for f, n, e in library.errors],
+        }, indent=2))
+    else:
+        for name in library.names():
+            preset = library.get(name)
+            print(f'{name:32} {preset.format:5} {" ".join(preset.template)}')
+        for path, name, error in library.errors:
+            print(f'INVALID {path}' + (f' [{name}]' if name else '') + f': {error}')
+    return 1 if library.errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ffx_pro', description='FFX Pro command line (run without arguments for the GUI)')
+    sub = parser.add_subparsers(dest='command')
+
+    p = sub.add_parser('convert', help='Convert files without the GUI')
+    p.add_argument('inputs', nargs='+')
+    _add_conversion_args(p)
+    p.add_argument('--policy', default=POLICY_FIFO, choices=POLICIES)
+    p.add_argument('--ignore-space', action='store_true', help='Start even if the batch is estimated not to fit')
+    p.add_argument('--finish-within', type=float, metavar='MINUTES',
+                   help='Pick the slowest video speed tier whose estimate meets this target')
+    p.add_argument('--merge', action='store_true', help='Join all inputs, in order, into one output')
+    _add_trim_args(p)
+    _add_split_args(p)
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser('plan', help='Dry run: print the commands, decisions and estimates as JSON')
+    p.add_argument('inputs', nargs='+')
+    _add_conversion_args(p)
+    p.add_argument('--policy', default=POLICY_FIFO, choices=POLICIES)
+    p.add_argument('--finish-within', type=float, metavar='MINUTES',
+                   help='Pick the slowest video speed tier whose estimate meets this target')
+    p.add_argument('--merge', action='store_true', help='Join all inputs, in order, into one output')
+    _add_trim_args(p)
+    _add_split_args(p)
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser('preview', help='Render a short excerpt with and without an enhancement for A/B listening')
+    p.add_argument('input')
+    p.add_argument('--ffmpeg', help='ffmpeg executable (default: auto-detect)')
+    p.add_argument('--preset', default='None', help='Enhancement preset, e.g. "Rock EQ"')
+    p.add_argument('--delivery', default='', help='Preview a delivery preset\'s filters instead')
+    p.add_argument('--offset', type=float, default=0.0, help='Excerpt start (seconds)')
+    p.add_argument('--seconds', type=float, default=20.0, help='Excerpt length (seconds)')
+    p.add_argument('--play', action='store_true', help='Play A then B with ffplay')
+    p.set_defaults(func=cmd_preview)
+
+    p = sub.add_parser('capabilities', help='Show (and cache) what the ffmpeg build supports')
+    p.add_argument('--ffmpeg', help='ffmpeg executable (default: auto-detect)')
+    p.add_argument('--refresh', action='store_true', help='Probe again instead of using the cache')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_capabilities)
+
+    p = sub.add_parser('presets', help='List and validate delivery preset files')
+    p.add_argument('dirs', nargs='*', help='Preset folders (default: bundled and ~/.ffxpro/presets)')
+    p.add_argument('--ffmpeg', help='Validate against this ffmpeg (default: auto-detect)')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_presets)
+
+    p = sub.add_parser('daemon', help='Run the headless conversion service')
+    _add_conversion_args(p)
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    p.add_argument('--policy', default=POLICY_PRIORITY, choices=POLICIES)
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser('cluster', help='Shared-directory job queue for several machines')
+    csub = p.add_subparsers(dest='action')
+    c = csub.add_parser('submit', help='Queue files for the cluster')
+    c.add_argument('root', help='Shared queue directory')
+    c.add_argument('inputs', nargs='+')
+    _add_conversion_args(c)
+    c.add_argument('--priority', type=int)
+    _add_trim_args(c)
+    c.set_defaults(func=cmd_cluster_submit)
+    c = csub.add_parser('worker', help='Run jobs from the shared queue on this machine')
+    c.add_argument('root', help='Shared queue directory')
+    _add_conversion_args(c)
+    c.set_defaults(func=cmd_cluster_worker)
+    c = csub.add_parser('status', help='Show cluster-wide progress')
+    c.add_argument('root', help='Shared queue directory')
+    c.add_argument('--json', action='store_true')
+    c.set_defaults(func=cmd_cluster_status)
+
+    p = sub.add_parser('history', help='Throughput history of finished conversions')
+    hsub = p.add_subparsers(dest='action')
+    h = hsub.add_parser('report', help='Average realtime factors, e.g. per format and preset')
+    h.add_argument('--by', default='preset', choices=['preset', 'codec', 'concurrency'])
+    h.add_argument('--all-hosts', action='store_true', help='Include runs recorded on other machines')
+    h.add_argument('--json', action='store_true')
+    h.set_defaults(func=cmd_history_report)
+    h = hsub.add_parser('compact', help='Fold old runs into per-bucket totals')
+    h.add_argument('--keep-days', type=float, default=30, help='Keep individual runs this recent (default: 30)')
+    h.set_defaults(func=cmd_history_compact)
+
+    p = sub.add_parser('loadtest', help='Drive the engine with synthetic jobs against a stand-in ffmpeg')
+    p.add_argument('--jobs', type=int, default=10000)
+    p.add_argument('--workers', '-j', type=int, default=16)
+    p.add_argument('--profile', help='JSON profile for the stand-in ffmpeg (duration, speed, interval, rules, ...)')
+    p.add_argument('--fail-rate', type=float, default=0.0, help='Share of jobs that fail half-way (e.g. 0.1)')
+    p.add_argument('--cancel-every', type=int, default=0, metavar='N', help='Cancel every N-th job as it starts')
+    p.add_argument('--tracemalloc', action='store_true', help='Also trace Python allocations (slower)')
+    p.add_argument('--keep', action='store_true', help='Keep the temporary input/output folder')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_loadtest)
+
+    p = sub.add_parser('fake-ffmpeg', help='Write a stand-in ffmpeg launcher for trying the app without encoding')
+    p.add_argument('directory')
+    p.add_argument('--profile', help='JSON profile the stand-in follows')
+    p.set_defaults(func=cmd_fake_ffmpeg)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 1
+    if getattr(args, 'split', False) and (args.merge or args.start is not None or args.end is not None
+                                          or args.duration is not None):
+        parser.error('--split works on whole inputs; it cannot be combined with --merge or a trim')
+    return args.func(args)
@@ -0,0 +1,269 @@
+# modules/cluster.py
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from modules.command_builder import ConversionSettings
+from modules.diskspace import DiskGuard, MIN_FREE_BYTES
+from modules.engine import ConversionEngine, EngineListener
+from modules.job_queue import Job, JobQueue, SOURCE_API, SOURCE_PRIORITY, STATE_DONE, STATE_CANCELLED
+from modules.stems import DEFAULT_MEMORY_LIMIT
+
+LEASE_TIMEOUT = 60
+HEARTBEAT_INTERVAL = 5
+MAX_ATTEMPTS = 3
+
+QUEUE_DIR = 'queue'
+LEASE_DIR = 'leases'
+DONE_DIR = 'done'
+FAILED_DIR = 'failed'
+WORKER_DIR = 'workers'
+
+
+def _write_json(path, data):
+    # Write next to the target and rename so readers never see a partial file
+    tmp = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ClusterQueue:
+    """Job queue shared by many machines through a common directory.
+
+    A job is one JSON file. Claiming it is an atomic rename from queue/ to
+    leases/, so exactly one worker wins. Workers keep the lease alive by
+    touching it; leases not touched within LEASE_TIMEOUT are moved back to
+    queue/ (up to MAX_ATTEMPTS) by whichever node notices first. File names
+    sort by priority then submission time, so a plain directory listing is
+    already in run order.
+    """
+
+    def __init__(self, root, lease_timeout=LEASE_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.root = root
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        for d in (QUEUE_DIR, LEASE_DIR, DONE_DIR, FAILED_DIR, WORKER_DIR):
+            os.makedirs(self._dir(d), exist_ok=True)
+
+    def _dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _path(self, folder, name):
+        return os.path.join(self.root, folder, name)
+
+    # --- Coordinator side ---
+    def submit(self, input_file, settings, priority=None, index=0, start=None, end=None, accurate_cut=False,
+               split=None, inputs=None):
+        """Queue one file; start/end, split and inputs (a merge) mean the same as for a local Job."""
+        priority = SOURCE_PRIORITY[SOURCE_API] if priority is None else int(priority)
+        job_id = uuid.uuid4().hex[:12]
+        # Higher priority sorts first; clamp so the fixed-width prefix stays sortable
+        name = f'{9999 - max(0, min(priority, 9999)):04d}_{time.time_ns()}_{job_id}.json'
+        _write_json(self._path(QUEUE_DIR, name), {
+            'id': job_id, 'input': input_file, 'settings': settings.to_dict(),
+            'priority': priority, 'index': index, 'start': start, 'end': end, 'accurate_cut': accurate_cut,
+            'split': split, 'inputs': inputs, 'attempts': 0, 'submitted': time.time(),
+        })
+        return job_id
+
+    def status(self):
+        """Cluster-wide counts plus per-job progress reported by live workers."""
+        counts = {d: len([n for n in os.listdir(self._dir(d)) if n.endswith('.json')])
+                  for d in (QUEUE_DIR, LEASE_DIR, DONE_DIR, FAILED_DIR)}
+        now = time.time()
+        workers, running = [], {}
+        for name in os.listdir(self._dir(WORKER_DIR)):
+            info = _read_json(self._path(WORKER_DIR, name))
+            if not info or now - info.get('heartbeat', 0) > self.lease_timeout:
+                continue
+            workers.append(info)
+            running.update(info.get('jobs', {}))
+        progress = sum(running.values()) / len(running) if running else 0
+        return {
+            'queued': counts[QUEUE_DIR], 'running': counts[LEASE_DIR],
+            'done': counts[DONE_DIR], 'failed': counts[FAILED_DIR],
+            'workers': workers, 'jobs': running, 'progress': progress,
+        }
+
+    def reap_expired(self):
+        """Re-queue jobs whose worker stopped heartbeating. Returns how many."""
+        reaped = 0
+        now = time.time()
+        for name in os.listdir(self._dir(LEASE_DIR)):
+            if not name.endswith('.json'):
+                continue
+            lease = self._path(LEASE_DIR, name)
+            try:
+                if now - os.path.getmtime(lease) < self.lease_timeout:
+                    continue
+                # Take the lease over atomically so two reapers don't both re-queue it
+                reaping = f'{lease}.reaping-{uuid.uuid4().hex[:8]}'
+                os.rename(lease, reaping)
+            except OSError:
+                continue
+            spec = _read_json(reaping) or {}
+            spec['attempts'] = spec.get('attempts', 0) + 1
+            spec.pop('worker', None)
+            target = FAILED_DIR if spec['attempts'] >= self.max_attempts else QUEUE_DIR
+            if target == FAILED_DIR:
+                spec['message'] = 'Lease expired too many times'
+            _write_json(self._path(target, name), spec)
+            os.remove(reaping)
+            reaped += 1
+        return reaped
+
+    # --- Worker side ---
+    def claim(self, worker_id, names):
+        """Try to lease the first available job among names (queue listing)."""
+        while names:
+            name = names.pop(0)
+            lease = self._path(LEASE_DIR, name)
+            try:
+                os.rename(self._path(QUEUE_DIR, name), lease)
+                # The rename keeps the queued file's mtime; a reaper must not take this for an expired lease
+                os.utime(lease)
+            except OSError:
+                continue  # another worker (or a reaper) got it first
+            spec = _read_json(lease)
+            if spec is None:
+                continue
+            spec['worker'] = worker_id
+            spec['claimed'] = time.time()
+            _write_json(lease, spec)
+            return name, spec
+        return None, None
+
+    def list_queue(self):
+        return sorted(n for n in os.listdir(self._dir(QUEUE_DIR)) if n.endswith('.json'))
+
+    def heartbeat(self, name):
+        """Refresh a lease; False means it expired and was taken away."""
+        try:
+            os.utime(self._path(LEASE_DIR, name))
+            return True
+        except OSError:
+            return False
+
+    def complete(self, name, spec, ok, message):
+        spec['message'] = message
+        spec['finished'] = time.time()
+        _write_json(self._path(DONE_DIR if ok else FAILED_DIR, name), spec)
+        try:
+            os.remove(self._path(LEASE_DIR, name))
+        except OSError:
+            pass
+
+    def release(self, name, spec):
+        """Give a leased job back to the queue untouched (e.g. worker shutdown)."""
+        spec.pop('worker', None)
+        _write_json(self._path(QUEUE_DIR, name), spec)
+        try:
+            os.remove(self._path(LEASE_DIR, name))
+        except OSError:
+            pass
+
+    def write_worker_status(self, worker_id, info):
+        _write_json(self._path(WORKER_DIR, f'{worker_id}.json'), info)
+
+    def remove_worker_status(self, worker_id):
+        try:
+            os.remove(self._path(WORKER_DIR, f'{worker_id}.json'))
+        except OSError:
+            pass
+
+
+class ClusterWorker(EngineListener):
+    """Pulls jobs from a ClusterQueue into a local ConversionEngine."""
+
+    def __init__(self, cluster, ffmpeg_path, workers=1, job_timeout=None, stall_timeout=None, min_free=MIN_FREE_BYTES,
+                 stem_workers=1, stem_memory_limit=DEFAULT_MEMORY_LIMIT, background=False):
+        self.cluster = cluster
+        self.worker_id = f'{socket.gethostname()}-{os.getpid()}'
+        self.engine = ConversionEngine(ffmpeg_path, workers=workers, queue=JobQueue(), listener=self,
+                                       job_timeout=job_timeout, stall_timeout=stall_timeout, disk_guard=DiskGuard(min_free),
+                                       stem_workers=stem_workers, stem_memory_limit=stem_memory_limit, background=background)
+        self._held = {}  # job id -> (file name, spec, Job)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def job_finished(self, job):
+        with self._lock:
+            name, spec, _ = self._held.pop(job.id, (None, None, None))
+        if name is None:
+            return
+        if job.state == STATE_CANCELLED and not self._stop.is_set():
+            return  # lease was lost; whoever re-queued it owns the job now
+        if job.state == STATE_CANCELLED:
+            self.cluster.release(name, spec)
+        else:
+            self.cluster.complete(name, spec, job.state == STATE_DONE, job.message)
+        print(f'[{self.worker_id}] {job.state}: {job.input_file}', flush=True)
+
+    def _fill(self):
+        names = []
+        while True:
+            with self._lock:
+                # Background mode: don't lease what the governor won't run; other workers may have room
+                if len(self._held) >= self.engine.slots():
+                    return
+            if not names:
+                names = self.cluster.list_queue()
+                if not names:
+                    return
+            name, spec = self.cluster.claim(self.worker_id, names)
+            if name is None:
+                return
+            settings = ConversionSettings(**spec['settings'])
+            job = Job(spec['input'], spec.get('index', 0), settings=settings, source=SOURCE_API, priority=spec.get('priority'),
+                      start=spec.get('start'), end=spec.get('end'), accurate_cut=spec.get('accurate_cut', False),
+                      split=spec.get('split'), inputs=spec.get('inputs'))
+            job.id = spec['id']
+            with self._lock:
+                self._held[job.id] = (name, spec, job)
+            self.engine.submit(job)
+
+    def _heartbeat(self):
+        with self._lock:
+            held = list(self._held.values())
+        for name, spec, job in held:
+            if not self.cluster.heartbeat(name):
+                print(f'[{self.worker_id}] lease lost, cancelling {job.input_file}', flush=True)
+                self.engine.cancel(job.id)
+        self.cluster.write_worker_status(self.worker_id, {
+            'worker': self.worker_id, 'host': socket.gethostname(), 'heartbeat': time.time(),
+            'slots': self.engine.slots(),
+            'jobs': {job.id: job.progress for _, _, job in held},
+        })
+
+    def run(self, poll_interval=2):
+        self.engine.start()
+        print(f'Cluster worker {self.worker_id} on {self.cluster.root}', flush=True)
+        last_beat = 0
+        try:
+            while not self._stop.is_set():
+                self.cluster.reap_expired()
+                self._fill()
+                if time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+                    self._heartbeat()
+                    last_beat = time.monotonic()
+                self._stop.wait(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        self.engine.shutdown()
+        self.cluster.remove_worker_status(self.worker_id)
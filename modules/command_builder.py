@@ -0,0 +1,385 @@
+# modules/command_builder.py
+import os
+from modules.abr import AUDIO_LADDER, is_abr, ladder_args, video_rungs
+from modules.capabilities import get_capabilities
+from modules.genre import NUMPY_AVAILABLE, detect_genre
+from modules.merge import concat_list_path, copy_mismatch
+from modules.presets import PresetError, PresetLibrary
+from modules.quality import QUALITY_TARGET, apply_tuning
+from modules.utils import AUDIO_EXTS, probe_media
+from modules.video import DEFAULT_PROFILE, VIDEO_PROFILES, source_video_codec, video_args
+
+
+class ConversionSettings:
+    """Output options shared by the jobs of a batch (or set per daemon job)."""
+
+    def __init__(self, output_folder, output_format, custom_name='', quality='High', enhancement_mode='None', keep_metadata=True, separate_stems=False, metadata=None, delivery_preset='', video_codec='Auto', video_speed='balanced', target_snr=None, target_ssim=None):
+        self.output_folder = output_folder
+        self.output_format = output_format
+        self.custom_name = custom_name
+        self.quality = quality
+        self.enhancement_mode = enhancement_mode
+        self.keep_metadata = keep_metadata
+        self.separate_stems = separate_stems
+        # Extra tags written with -metadata key=value
+        self.metadata = dict(metadata or {})
+        # Name of a DeliveryPreset; when set it replaces format/quality/enhancement
+        self.delivery_preset = delivery_preset
+        # Video containers: 'Auto' (copy if the container takes the source codec), 'Copy' or a profile
+        self.video_codec = video_codec
+        self.video_speed = video_speed
+        # Quality 'Target': audio spectral SNR (dB) and video SSIM to reach; None for the defaults
+        self.target_snr = target_snr
+        self.target_ssim = target_ssim
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class CommandBuilder:
+    """Turns a Job plus its ConversionSettings into an ffmpeg command line.
+
+    Only the input, metadata and output path differ between files of a
+    batch; the output arguments are built once per distinct combination and
+    reused from a template cache.
+    """
+
+    def __init__(self, ffmpeg_path, presets=None, capabilities=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.presets = presets
+        self._capabilities = capabilities
+        self._templates = {}
+
+    @property
+    def capabilities(self):
+        """This ffmpeg's Capabilities (disk-cached probe), or None if unknown."""
+        if self._capabilities is None:
+            self._capabilities = get_capabilities(self.ffmpeg_path)
+        return self._capabilities
+
+    def _encoder(self, name):
+        # Fall back to another encoder for the same codec, or fail before anything is spawned
+        caps = self.capabilities
+        if caps is None:
+            return name
+        picked = caps.pick_encoder(name)
+        if picked is None:
+            raise ValueError(f'this ffmpeg has no {name} encoder ({caps.version or self.ffmpeg_path})')
+        return picked
+
+    def _check_filters(self, af, what):
+        caps = self.capabilities
+        if caps is None or not caps.filters or not af:
+            return
+        missing = caps.missing(filters=[f.split('=', 1)[0] for f in af.split(',')])
+        if missing:
+            raise ValueError(f"this ffmpeg lacks {', '.join(sorted(set(missing)))} needed for {what}")
+
+    def genre_hint(self, job):
+        """Genre for 'Auto (Genre)' jobs, else None.
+
+        Classified from the audio when NumPy is installed (cached per file);
+        keywords in the path are the fallback.
+        """
+        if not job.settings.enhancement_mode.lower().startswith('auto'):
+            return None
+        genre = detect_genre(self.ffmpeg_path, job.input_file) if NUMPY_AVAILABLE else None
+        return genre or self._genre_from_path(job.input_file)
+
+    def _genre_from_path(self, path):
+        p = path.lower()
+        if 'rock' in p:
+            return 'rock'
+        if 'edm' in p or 'electronic' in p:
+            return 'edm'
+        if 'chill' in p or 'lofi' in p or 'lo-fi' in p:
+            return 'chill'
+        if 'classical' in p or 'orchestra' in p:
+            return 'classical'
+        if 'jazz' in p:
+            return 'jazz'
+        return None
+
+    def _af_for_profile(self, profile, genre_hint=None):
+        # Build FFmpeg -af string based on profile (and optional genre_hint)
+        parts = []
+        p = profile.lower() if profile else ''
+        # 'Auto (Genre)' applies the EQ of the detected genre
+        auto = p.startswith('auto')
+        if 'normalize' in p:
+            parts.append('loudnorm')
+        if 'bass' in p:
+            parts.append('equalizer=f=100:width_type=h:width=200:g=4')
+        if 'treble' in p:
+            parts.append('equalizer=f=8000:width_type=h:width=2000:g=3')
+        if 'vocal' in p or 'clarity' in p:
+            parts.append('acompressor=threshold=-21dB:ratio=3:attack=200:release=1000')
+        if 'rock' in p or (genre_hint == 'rock' and auto):
+            parts.extend([
+                'loudnorm',
+                'equalizer=f=100:width_type=h:width=200:g=4',
+                'equalizer=f=1000:width_type=h:width=300:g=3',
+                'equalizer=f=8000:width_type=h:width=2000:g=2',
+                'acompressor=threshold=-18dB:ratio=3:attack=50:release=250'
+            ])
+        if 'edm' in p or (genre_hint == 'edm' and auto):
+            parts.extend([
+                'loudnorm',
+                'equalizer=f=60:width_type=h:width=120:g=5',
+                'equalizer=f=1000:width_type=h:width=300:g=2',
+                'equalizer=f=10000:width_type=h:width=2000:g=3',
+                'acompressor=threshold=-18dB:ratio=4:attack=20:release=200'
+            ])
+        if 'chill' in p or (genre_hint == 'chill' and auto):
+            parts.extend(['loudnorm', 'equalizer=f=1000:width_type=h:width=400:g=3', 'afftdn'])
+        if 'classical' in p or (genre_hint == 'classical' and auto):
+            parts.extend(['loudnorm', 'equalizer=f=200:width_type=h:width=300:g=2', 'afftdn'])
+        # If user selected 'auto' we use the genre hint if none of the above matched
+        if auto and genre_hint and not parts:
+            return self._af_for_profile(genre_hint, genre_hint=None)
+        # Join with commas
+        return ','.join(parts) if parts else None
+
+    def audio_filter(self, job):
+        """The -af chain job's output gets, or None; what previews render."""
+        s = job.settings
+        preset = self.delivery_preset(s)
+        if preset:
+            return ','.join(preset.filters) or None
+        af = self._af_for_profile(s.enhancement_mode, genre_hint=self.genre_hint(job))
+        self._check_filters(af, f"'{s.enhancement_mode}'")
+        return af
+
+    def _audio_bitrate_args(self, output_ext, quality):
+        # Map quality label to bitrate / codec args; 'Target' starts from High until its search has run
+        q = 'High' if quality == QUALITY_TARGET else quality
+        if output_ext == 'flac':
+            return ['-c:a', self._encoder('flac')]  # flac ignores -b:a
+        if output_ext in ('wav',):
+            return ['-c:a', self._encoder('pcm_s16le')]
+        if output_ext in ('mp3',):
+            bitrate = '320k' if q == 'High' else '192k' if q == 'Medium' else '128k'
+            return ['-c:a', self._encoder('libmp3lame'), '-b:a', bitrate]
+        if output_ext == 'webm':
+            return ['-c:a', self._encoder('libopus'), '-b:a', '160k' if q == 'High' else '128k' if q == 'Medium' else '96k']
+        if output_ext in ('aac','m4a','mp4',):
+            bitrate = '320k' if q == 'High' else '192k' if q == 'Medium' else '128k'
+            return ['-c:a', self._encoder('aac'), '-b:a', bitrate]
+        # Default
+        bitrate = '320k' if q == 'High' else '192k' if q == 'Medium' else '128k'
+        return ['-c:a', self._encoder('libmp3lame'), '-b:a', bitrate]
+
+    def _video_args(self, output_format, mode, speed, source_codec=None):
+        args = video_args(output_format, mode, speed, source_codec)
+        if args[1] != 'copy' and self.capabilities and args[1] not in self.capabilities.encoders:
+            raise ValueError(f'this ffmpeg has no {args[1]} encoder for {mode} video')
+        return args
+
+    def delivery_preset(self, settings):
+        if not settings.delivery_preset:
+            return None
+        preset = (self.presets or PresetLibrary.default()).get(settings.delivery_preset)
+        if preset is None:
+            raise PresetError(f'Unknown or unsupported delivery preset: {settings.delivery_preset}')
+        caps = self.capabilities
+        missing = caps.missing([preset.codec], preset.filter_names() if caps.filters else []) if caps else []
+        if missing:
+            raise PresetError(f"Delivery preset '{preset.name}' needs {', '.join(missing)}, which this ffmpeg lacks")
+        return preset
+
+    def output_format(self, settings):
+        preset = self.delivery_preset(settings)
+        return preset.format if preset else settings.output_format
+
+    def is_ladder(self, settings):
+        """True when settings write an HLS/DASH ladder: a directory rather than one file."""
+        return not settings.delivery_preset and is_abr(settings.output_format)
+
+    def output_file(self, job):
+        s = job.settings
+        base_name = os.path.splitext(os.path.basename(job.input_file))[0]
+        suffix = 'merged' if job.inputs else 'clip' if job.start is not None or job.end is not None else 'converted'
+        output_name = f"{s.custom_name}_{job.track or job.index+1}" if s.custom_name else f"{base_name}_{suffix}"
+        if self.is_ladder(s):
+            return os.path.join(s.output_folder, f"{output_name}_{s.output_format.lower()}")
+        return os.path.join(s.output_folder, f"{output_name}.{self.output_format(s)}")
+
+    def _output_args(self, s, genre_hint, source_codec=None):
+        key = (s.output_format.lower(), s.quality, s.enhancement_mode, genre_hint, s.video_codec, s.video_speed,
+               source_codec)
+        args = self._templates.get(key)
+        if args is not None:
+            return args
+
+        # Build audio filter
+        af = self._af_for_profile(s.enhancement_mode, genre_hint=genre_hint)
+        self._check_filters(af, f"'{s.enhancement_mode}'")
+
+        # For audio-only outputs
+        out_ext_lower = s.output_format.lower()
+        if '.' + out_ext_lower in AUDIO_EXTS:
+            # Audio output: drop video stream
+            args = ['-vn']
+            args += self._audio_bitrate_args(out_ext_lower, s.quality)
+            if af:
+                args += ['-af', af]
+        else:
+            # Video container output: copy the video stream unless it doesn't fit or a profile is chosen
+            args = self._video_args(out_ext_lower, s.video_codec, s.video_speed, source_codec)
+            # audio codec for container
+            args += self._audio_bitrate_args(out_ext_lower, s.quality)
+            if af:
+                args += ['-af', af]
+
+        args = self._templates[key] = tuple(args)
+        return args
+
+    def _metadata_args(self, s):
+        args = ['-map_metadata', '0'] if s.keep_metadata else []
+        for key, value in s.metadata.items():
+            args += ['-metadata', f'{key}={value}']
+        return args
+
+    def _build_merge(self, job, preset):
+        """Join job.inputs in order: concat demuxer + stream copy when they match, else one concat graph."""
+        s = job.settings
+        output_file = self.output_file(job)
+        fmt = self.output_format(s).lower()
+        infos = [probe_media(self.ffmpeg_path, p) for p in job.inputs]
+        if preset:
+            out_args = list(preset.template)
+        else:
+            out_args = list(self._output_args(s, self.genre_hint(job), source_video_codec(infos[0])))
+        af = None
+        if '-af' in out_args:
+            i = out_args.index('-af')
+            af = out_args[i + 1]
+            del out_args[i:i + 2]
+
+        cmd = [self.ffmpeg_path, '-y']
+        if not preset and not af and copy_mismatch(job.inputs, infos, fmt) is None:
+            # The list file is written by the engine right before the run
+            cmd += ['-f', 'concat', '-safe', '0', '-i', concat_list_path(output_file)]
+            return cmd + self._metadata_args(s) + ['-c', 'copy', output_file], output_file
+
+        for path in job.inputs:
+            cmd += ['-i', path]
+        # Cover art is a video stream too; without a real one the merge falls back to joining the audio
+        first = next((st for st in infos[0].get('streams', []) if st.get('codec_type') == 'video'
+                      and not st.get('disposition', {}).get('attached_pic')), None)
+        has_video = (first is not None and '-vn' not in out_args
+                     and all(source_video_codec(info) for info in infos))
+        has_audio = all(any(st.get('codec_type') == 'audio' for st in info.get('streams', [])) for info in infos)
+        if not (has_video or has_audio):
+            raise ValueError('the inputs share no audio or video stream to merge')
+
+        graph, segments = [], ''
+        if has_video:
+            # Every segment is scaled/padded to the first one's frame size and rate
+            w, h, fps = first.get('width'), first.get('height'), first.get('r_frame_rate', '25')
+            fit = f'scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,' if w and h else ''
+            for i in range(len(job.inputs)):
+                graph.append(f'[{i}:v:0]{fit}setsar=1,fps={fps},format=yuv420p[v{i}]')
+        for i in range(len(job.inputs)):
+            segments += (f'[v{i}]' if has_video else '') + (f'[{i}:a:0]' if has_audio else '')
+        outputs = ('[vout]' if has_video else '') + (('[acat]' if af else '[aout]') if has_audio else '')
+        graph.append(f'{segments}concat=n={len(job.inputs)}:v={int(has_video)}:a={int(has_audio)}{outputs}')
+        if af and has_audio:
+            graph.append(f'[acat]{af}[aout]')
+        cmd += ['-filter_complex', ';'.join(graph)]
+        cmd += ['-map', '[vout]'] if has_video else []
+        cmd += ['-map', '[aout]'] if has_audio else []
+        cmd += self._metadata_args(s)
+
+        if has_video:
+            # Filtered video can't be stream-copied
+            self._encode_copied_video(out_args, s, fmt)
+        return cmd + out_args + [output_file], output_file
+
+    def _encode_copied_video(self, out_args, s, fmt):
+        # Swap '-c:v copy' in out_args for the chosen profile (or the container's default)
+        if '-c:v' in out_args and out_args[out_args.index('-c:v') + 1] == 'copy':
+            i = out_args.index('-c:v')
+            profile = s.video_codec if s.video_codec in VIDEO_PROFILES else DEFAULT_PROFILE.get(fmt, 'H.264')
+            out_args[i:i + 2] = self._video_args(fmt, profile, s.video_speed)
+
+    def _trim_args(self, job):
+        # Input options: ffmpeg seeks straight to start and stops reading at end,
+        # instead of decoding everything around the clip
+        if job.start is not None and job.end is not None and job.end <= job.start:
+            raise ValueError(f'trim end ({job.end:g}s) must be after start ({job.start:g}s)')
+        args = ['-ss', f'{job.start:.3f}'] if job.start else []
+        if job.end is not None:
+            args += ['-t', f'{job.end - (job.start or 0.0):.3f}']
+        return args
+
+    def _can_copy_clip(self, job, preset):
+        # A clip into its own container without filters needs no re-encode, unless the cut must be exact
+        s = job.settings
+        return (not preset and not job.accurate_cut and s.video_codec in ('Auto', 'Copy')
+                and not self._af_for_profile(s.enhancement_mode, self.genre_hint(job))
+                and os.path.splitext(job.input_file)[1].lower() == '.' + s.output_format.lower())
+
+    def _build_ladder(self, job, cmd, output_dir):
+        """Every rendition from one decode: the filter chain runs once, then the streams are split per rung."""
+        s = job.settings
+        info = probe_media(self.ffmpeg_path, job.input_file)
+        streams = info.get('streams', [])
+        # Without a probe, assume the source has audio
+        has_audio = not streams or any(st.get('codec_type') == 'audio' for st in streams)
+        rungs = []
+        if source_video_codec(info):
+            video = next(st for st in streams if st.get('codec_type') == 'video'
+                         and not st.get('disposition', {}).get('attached_pic'))
+            rungs = video_rungs(video.get('height'))
+        if not (rungs or has_audio):
+            raise ValueError('no audio or video stream for a ladder')
+        audio = [bitrate for _, _, bitrate in rungs] if rungs else list(AUDIO_LADDER)
+        cmd += ladder_args(s.output_format, output_dir, self.audio_filter(job) if has_audio else None, rungs,
+                           audio if has_audio else [], self._video_args('mp4', 'H.264', s.video_speed) if rungs else [],
+                           self._encoder('aac'))
+        return cmd, output_dir
+
+    def build(self, job):
+        """Return (cmd, output_file) for job."""
+        s = job.settings
+        preset = self.delivery_preset(s)
+        trim = self._trim_args(job)
+        if job.inputs:
+            if trim:
+                raise ValueError('merge jobs cannot be trimmed')
+            if self.is_ladder(s):
+                raise ValueError(f'merge jobs cannot write a {s.output_format.upper()} ladder')
+            return self._build_merge(job, preset)
+        output_file = self.output_file(job)
+
+        # Build base command
+        cmd = [self.ffmpeg_path, '-y'] + trim + ['-i', job.input_file]
+
+        # Map metadata
+        cmd += self._metadata_args(s)
+
+        if self.is_ladder(s):
+            return self._build_ladder(job, cmd, output_file)
+        if trim and self._can_copy_clip(job, preset):
+            # Copied streams start at the keyframe before start; timestamps are shifted back to zero
+            return cmd + ['-c', 'copy', '-avoid_negative_ts', 'make_zero', output_file], output_file
+        if preset:
+            cmd += preset.template
+        else:
+            # Only matters for 'Auto (Genre)'; the engine has usually classified the file already
+            genre_hint = self.genre_hint(job)
+            source_codec = None
+            if s.video_codec == 'Auto' and '.' + s.output_format.lower() not in AUDIO_EXTS:
+                # Cached by the engine's probes, so this rarely spawns ffprobe
+                source_codec = source_video_codec(probe_media(self.ffmpeg_path, job.input_file))
+            out_args = list(self._output_args(s, genre_hint, source_codec))
+            if trim and job.accurate_cut:
+                # Frame-exact cuts need the video decoded and encoded again
+                self._encode_copied_video(out_args, s, s.output_format.lower())
+            if s.quality == QUALITY_TARGET:
+                out_args = apply_tuning(out_args, job.tuning)
+            cmd += out_args
+
+        cmd += [output_file]
+        return cmd, output_file
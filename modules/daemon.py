@@ -0,0 +1,250 @@
+# modules/daemon.py
+import itertools
+import json
+import os
+import socketserver
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules.command_builder import ConversionSettings
+from modules.diskspace import DiskGuard, MIN_FREE_BYTES
+from modules.engine import ConversionEngine, EngineListener
+from modules.job_queue import Job, JobQueue, POLICY_PRIORITY, SOURCE_API
+from modules.silence import split_options
+from modules.stems import DEFAULT_MEMORY_LIMIT
+from modules.utils import parse_time
+from modules.video import SPEED_TIERS, VIDEO_MODES
+
+DEFAULT_PORT = 8765
+
+
+class _DaemonListener(EngineListener):
+    def job_log(self, job, line):
+        # ffmpeg chatter stays out of the service log; engine notices don't
+        if line.startswith(('Paused:', 'Disk space', 'Background mode')):
+            print(f'[{job.id}] {line}' if job else line, flush=True)
+
+    def job_started(self, job):
+        print(f'[{job.id}] started: {job.input_file}', flush=True)
+
+    def job_finished(self, job):
+        print(f'[{job.id}] {job.state}: {job.message}', flush=True)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    """JSON API:
+
+        POST   /jobs              submit one job (object) or many (list)
+        GET    /jobs              list known jobs
+        GET    /jobs/<id>         job status and progress
+        DELETE /jobs/<id>         cancel a queued or running job
+        POST   /jobs/<id>/cancel  same as DELETE
+        POST   /jobs/<id>/bump    run the job next
+        GET    /health            engine status and batch progress/ETA
+    """
+
+    server_version = 'FFXPro'
+    daemon = None  # set by ConversionDaemon
+
+    def address_string(self):
+        # Unix socket peers have no address tuple
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _path_parts(self):
+        return [p for p in self.path.split('?', 1)[0].split('/') if p]
+
+    def do_GET(self):
+        parts = self._path_parts()
+        engine = self.daemon.engine
+        if parts == ['health']:
+            self._send(200, {'status': 'ok', 'workers': engine.workers, 'queued': len(engine.queue),
+                             'batch': engine.progress_snapshot()})
+        elif parts == ['jobs']:
+            self._send(200, [job.to_dict() for job in engine.list_jobs()])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = engine.get(parts[1])
+            if job is None:
+                self._send(404, {'error': 'unknown job'})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts = self._path_parts()
+        if parts == ['jobs']:
+            try:
+                payload = self._read_json()
+                many = isinstance(payload, list)
+                jobs = self.daemon.submit_all(payload if many else [payload])
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            result = [job.to_dict() for job in jobs]
+            self._send(201, result if many else result[0])
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            self._cancel(parts[1])
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'bump':
+            job = self.daemon.engine.get(parts[1])
+            if job is None:
+                self._send(404, {'error': 'unknown job'})
+                return
+            self.daemon.engine.queue.bump(job)
+            self._send(200, job.to_dict())
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            self._cancel(parts[1])
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _cancel(self, job_id):
+        engine = self.daemon.engine
+        if engine.get(job_id) is None:
+            self._send(404, {'error': 'unknown job'})
+        elif engine.cancel(job_id):
+            self._send(200, engine.get(job_id).to_dict())
+        else:
+            self._send(409, {'error': 'job already finished'})
+
+
+class ConversionDaemon:
+    """Headless conversion service: one warm engine behind a local JSON API.
+
+    Listens on 127.0.0.1:<port>, or on a Unix socket when socket_path is
+    given. Job specs may override any of the defaults passed in here.
+    """
+
+    def __init__(self, ffmpeg_path, defaults, workers=1, policy=POLICY_PRIORITY, host='127.0.0.1', port=DEFAULT_PORT, socket_path=None,
+                 job_timeout=None, stall_timeout=None, min_free=MIN_FREE_BYTES, stem_workers=1, stem_memory_limit=DEFAULT_MEMORY_LIMIT,
+                 background=False):
+        self.defaults = defaults
+        self.engine = ConversionEngine(ffmpeg_path, workers=workers, queue=JobQueue(policy), listener=_DaemonListener(),
+                                       job_timeout=job_timeout, stall_timeout=stall_timeout, disk_guard=DiskGuard(min_free),
+                                       stem_workers=stem_workers, stem_memory_limit=stem_memory_limit, background=background)
+        self._index = itertools.count()
+
+        handler = type('ApiHandler', (_ApiHandler,), {'daemon': self})
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.server = _UnixHTTPServer(socket_path, handler)
+            os.chmod(socket_path, 0o600)
+            self.address = socket_path
+        else:
+            self.server = ThreadingHTTPServer((host, port), handler)
+            self.server.daemon_threads = True
+            self.address = f'http://{host}:{self.server.server_address[1]}'
+        self.socket_path = socket_path
+
+    def submit(self, spec):
+        """Create and queue a Job from an API job spec dict."""
+        return self.engine.submit(self.make_job(spec))
+
+    def submit_all(self, specs):
+        """Queue a Job per spec, or none of them if any spec is invalid."""
+        jobs = [self.make_job(spec) for spec in specs]
+        return [self.engine.submit(job) for job in jobs]
+
+    def make_job(self, spec):
+        """A Job from an API job spec dict; raises ValueError/TypeError for a bad spec."""
+        if not isinstance(spec, dict):
+            raise TypeError('job spec must be an object')
+        # 'inputs' (a list) makes a merge job joining the files in order
+        inputs = spec.get('inputs')
+        if inputs is not None and (not isinstance(inputs, list) or len(inputs) < 2):
+            raise ValueError("'inputs' must list at least two files to merge")
+        for input_file in inputs or [spec.get('input')]:
+            if not input_file or not os.path.isfile(input_file):
+                raise ValueError(f'input file not found: {input_file}')
+        input_file = inputs[0] if inputs else spec['input']
+
+        d = self.defaults
+        metadata = spec.get('metadata', d.keep_metadata)
+        settings = ConversionSettings(
+            spec.get('output_folder', d.output_folder),
+            spec.get('format', d.output_format),
+            spec.get('custom_name', d.custom_name),
+            spec.get('quality', d.quality),
+            spec.get('preset', d.enhancement_mode),
+            # 'metadata' is either a keep-source-tags flag or a dict of tags to write
+            keep_metadata=metadata if isinstance(metadata, bool) else d.keep_metadata,
+            separate_stems=spec.get('separate_stems', d.separate_stems),
+            metadata=metadata if isinstance(metadata, dict) else d.metadata,
+            delivery_preset=spec.get('delivery', d.delivery_preset),
+            video_codec=spec.get('video_codec', d.video_codec),
+            video_speed=spec.get('video_speed', d.video_speed),
+            target_snr=spec.get('target_snr', d.target_snr),
+            target_ssim=spec.get('target_ssim', d.target_ssim),
+        )
+        if settings.video_codec not in VIDEO_MODES or settings.video_speed not in SPEED_TIERS:
+            raise ValueError(f'video_codec must be one of {", ".join(VIDEO_MODES)}, '
+                             f'video_speed one of {", ".join(SPEED_TIERS)}')
+        if not settings.output_folder:
+            raise ValueError('no output_folder given and no daemon default')
+        # Reject unknown delivery presets at submission rather than as a failed job
+        self.engine.builder.delivery_preset(settings)
+        # Trim: 'start' plus 'end' or 'duration', as seconds or 'HH:MM:SS'
+        start = parse_time(spec['start']) if spec.get('start') is not None else None
+        end = parse_time(spec['end']) if spec.get('end') is not None else None
+        if end is None and spec.get('duration') is not None:
+            end = (start or 0.0) + parse_time(spec['duration'])
+        if end is not None and end <= (start or 0.0):
+            raise ValueError("trim 'end' must be after 'start'")
+        # Split: true for the defaults, or an object with noise_db / min_silence / min_track
+        split = spec.get('split')
+        if split:
+            if inputs or start is not None or end is not None:
+                raise ValueError("'split' works on a whole single input; drop 'inputs' and the trim")
+            split = split_options(**(split if isinstance(split, dict) else {}))
+        else:
+            split = None
+        priority = spec.get('priority')
+        if priority is not None and (isinstance(priority, bool) or not isinstance(priority, (int, float))):
+            raise ValueError("'priority' must be a number")
+        # Deadline: a Unix time, or a time from now as seconds or 'HH:MM:SS' text
+        deadline = spec.get('deadline')
+        if isinstance(deadline, str):
+            deadline = time.time() + parse_time(deadline)
+        elif deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))):
+            raise ValueError("'deadline' must be a Unix time or a time from now")
+        return Job(input_file, next(self._index), settings=settings, source=SOURCE_API, priority=priority,
+                   deadline=deadline, inputs=inputs, start=start, end=end, accurate_cut=bool(spec.get('accurate_cut')),
+                   split=split)
+
+    def serve_forever(self):
+        self.engine.start()
+        print(f'FFX Pro daemon listening on {self.address}', flush=True)
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.server.server_close()
+        self.engine.shutdown()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
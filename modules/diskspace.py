@@ -0,0 +1,177 @@
+# modules/diskspace.py
+import os
+import re
+import shutil
+from modules.utils import probe_job_duration, probe_media
+
+# Keep at least this much free on the output volume (bytes)
+MIN_FREE_BYTES = 512 * 1024 * 1024
+
+# Rough container/muxing overhead on top of the raw stream bitrates
+CONTAINER_OVERHEAD = 1.02
+# Typical FLAC size relative to 16-bit PCM
+FLAC_RATIO = 0.6
+
+
+def _parse_bitrate(value):
+    # '320k' -> 320000
+    value = str(value).strip().lower()
+    if value.endswith('k'):
+        return float(value[:-1]) * 1000
+    if value.endswith('m'):
+        return float(value[:-1]) * 1000000
+    return float(value)
+
+
+def _stream(info, codec_type):
+    for s in info.get('streams', []):
+        if s.get('codec_type') == codec_type:
+            return s
+    return {}
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _arg(cmd, flag):
+    return cmd[cmd.index(flag) + 1] if flag in cmd else None
+
+
+def audio_bitrate(cmd, info):
+    """Output audio bits per second for a built command.
+
+    Uses the -b:a the builder chose (from _audio_bitrate_args or a delivery
+    preset); lossless codecs are sized from the output sample rate/channels.
+    """
+    bitrate = _arg(cmd, '-b:a')
+    if bitrate:
+        return _parse_bitrate(bitrate)
+    audio = _stream(info, 'audio')
+    rate = _int(_arg(cmd, '-ar'), 0) or _int(audio.get('sample_rate'), 44100)
+    channels = _int(_arg(cmd, '-ac'), 0) or _int(audio.get('channels'), 2)
+    codec = _arg(cmd, '-c:a') or ''
+    bits = re.search(r'(\d+)', codec) if codec.startswith('pcm_') else None
+    pcm = rate * channels * (int(bits.group(1)) if bits else 16)
+    if codec == 'flac':
+        return pcm * FLAC_RATIO
+    if codec.startswith('pcm_'):
+        return pcm
+    # VBR or codec default: assume a typical lossy rate
+    return 192000
+
+
+def ladder_bitrate(cmd):
+    """Summed per-rendition caps (-maxrate:v:N, -b:a:N) of an HLS/DASH ladder command; 0 for anything else."""
+    return sum(_parse_bitrate(cmd[i + 1]) for i, arg in enumerate(cmd[:-1])
+               if arg.startswith('-maxrate:v:') or arg.startswith('-b:a:'))
+
+
+def video_bitrate(info):
+    """Source video bits per second, which is what '-c:v copy' writes."""
+    video = _stream(info, 'video')
+    if not video:
+        return 0
+    if video.get('bit_rate'):
+        return _int(video['bit_rate'], 0)
+    # Fall back to the container rate minus the audio streams
+    total = _int(info.get('format', {}).get('bit_rate'), 0)
+    audio = sum(_int(s.get('bit_rate'), 0) for s in info.get('streams', []) if s.get('codec_type') == 'audio')
+    return max(0, total - audio)
+
+
+def estimate_output_size(builder, job, info=None):
+    """Estimated size in bytes of job's output, or None if the duration is unknown."""
+    if info is None:
+        info = probe_media(builder.ffmpeg_path, job.input_file)
+    duration = job.duration
+    if duration is None:
+        duration = probe_job_duration(builder.ffmpeg_path, job)
+        if duration is None:
+            return None
+    try:
+        cmd, _ = builder.build(job)
+    except ValueError:
+        return None
+    bps = ladder_bitrate(cmd)
+    if bps:
+        return int(duration * bps / 8 * CONTAINER_OVERHEAD)
+    bps = audio_bitrate(cmd, info)
+    if '-vn' not in cmd:
+        bps += video_bitrate(info)
+    return int(duration * bps / 8 * CONTAINER_OVERHEAD)
+
+
+def free_space(folder):
+    try:
+        return shutil.disk_usage(folder).free
+    except OSError:
+        return None
+
+
+def format_size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024:
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+    return f'{n:.1f} TB'
+
+
+def preflight(builder, jobs, min_free=MIN_FREE_BYTES):
+    """Check a whole batch against free space, per output folder.
+
+    Returns a list of (folder, estimated_bytes, free_bytes) for folders that
+    would drop below min_free; empty means the batch fits.
+    """
+    needed = {}
+    for job in jobs:
+        if job.estimated_size is None:
+            job.estimated_size = estimate_output_size(builder, job)
+        folder = job.settings.output_folder
+        needed[folder] = needed.get(folder, 0) + (job.estimated_size or 0)
+    short = []
+    for folder, total in needed.items():
+        free = free_space(folder)
+        if free is not None and free - total < min_free:
+            short.append((folder, total, free))
+    return short
+
+
+class DiskGuard:
+    """Runtime admission control for the output volume.
+
+    A job is admitted only if, after reserving what the running jobs still
+    have left to write, its own estimate fits above min_free.
+    """
+
+    def __init__(self, min_free=MIN_FREE_BYTES):
+        self.min_free = min_free
+
+    def _remaining(self, job):
+        try:
+            written = os.path.getsize(job.output_file) if job.output_file else 0
+        except OSError:
+            written = 0
+        return max(0, (job.estimated_size or 0) - written)
+
+    def admit(self, job, running):
+        """Return (ok, free_bytes); free_bytes is None when it can't be measured."""
+        folder = job.settings.output_folder
+        free = free_space(folder)
+        if free is None:
+            return True, None
+        try:
+            device = os.stat(folder).st_dev
+        except OSError:
+            return True, free
+        reserved = 0
+        for other in running:
+            try:
+                if os.stat(other.settings.output_folder).st_dev == device:
+                    reserved += self._remaining(other)
+            except OSError:
+                pass
+        return free - reserved - (job.estimated_size or 0) >= self.min_free, free
@@ -0,0 +1,724 @@
+# modules/engine.py
+import asyncio
+import collections
+import concurrent.futures
+import importlib.util
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from modules.analysis import AnalysisPool
+from modules.background import LoadGovernor
+from modules.capabilities import get_capabilities
+from modules.command_builder import CommandBuilder
+from modules.diskspace import DiskGuard, estimate_output_size, format_size
+from modules.genre import NUMPY_AVAILABLE, detect_genres
+from modules.job_queue import (
+    JobQueue, POLICY_SJF, POLICY_DEADLINE,
+    STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_FAILED, STATE_CANCELLED, FINAL_STATES
+)
+from modules.history import HistoryStore
+from modules.planner import cost_key
+from modules.progress import ProgressTracker
+from modules.supervisor import KILL_GRACE, ProcessSupervisor
+from modules.merge import concat_list_path, write_concat_list
+from modules.quality import (
+    AUDIO_TARGET, CANDIDATE_EXT, QUALITY_TARGET, VIDEO_TARGET, audio_candidate_cmd, excerpt_span, parse_ssim, pick,
+    reference_cmd, score_audio, search_space, ssim_cmd, video_args, video_candidate_cmd,
+)
+from modules.silence import cached_silences, parse_silences, silencedetect_cmd, store_silences, track_jobs, track_spans
+from modules.stems import DEFAULT_MEMORY_LIMIT, OVERLAP_SECONDS, STEMS, chunk_plan, crossfade_cmd, extract_cmd, spleeter_cmd
+from modules.utils import probe_job_duration, probe_media, parse_timestamp
+
+# Spleeter runs as a child process; only check that it is installed
+SPLEETER_AVAILABLE = importlib.util.find_spec('spleeter') is not None
+
+TIME_PATTERN = re.compile(r'time=(\d+):(\d+):(\d+\.\d+)')
+DURATION_PATTERN = re.compile(r'Duration:\s*(\d+):(\d+):(\d+\.\d+)')
+SPEED_PATTERN = re.compile(r'speed=\s*(\d+(?:\.\d+)?)x')
+
+
+class EngineListener:
+    """Engine callbacks; all no-ops, override the ones you need.
+
+    Callbacks run on the supervisor's event loop thread and must not block.
+    """
+
+    def job_started(self, job):
+        pass
+
+    def progress(self, snapshot):
+        """Batch progress (see ProgressTracker.snapshot), at most every progress_interval."""
+        pass
+
+    def job_log(self, job, line):
+        pass
+
+    def job_finished(self, job):
+        pass
+
+
+class ConversionEngine:
+    """Runs jobs from a JobQueue, up to `workers` ffmpeg processes at a time.
+
+    All children are supervised from a single asyncio loop (see
+    ProcessSupervisor), so Python overhead stays flat as concurrency grows.
+    The GUI drives one engine per batch (drain mode: the engine stops once
+    the queue is empty); the daemon keeps a single engine alive and submits
+    to it for its whole lifetime.
+
+    Stem separation is a second pipeline stage with its own limit
+    (`stem_workers`): a converted job moves to a bounded hand-off queue and
+    frees its encode slot, so the next file encodes while the previous one
+    is separated. When the hand-off queue is full, encoders wait.
+    Long tracks are separated in overlapping chunks, several at a time,
+    within `stem_memory_limit` bytes for the whole stage.
+
+    In background mode every child runs at low CPU/I/O priority and a
+    LoadGovernor resizes the pool between 1 and `workers` from the load
+    average, memory pressure and user activity.
+    """
+
+    def __init__(self, ffmpeg_path, workers=1, queue=None, listener=None, keep_finished=1000,
+                 job_timeout=None, stall_timeout=None, supervisor=None, progress_interval=0.2, kill_grace=KILL_GRACE,
+                 disk_guard=None, history=None, stem_workers=1, stem_queue_size=2,
+                 stem_memory_limit=DEFAULT_MEMORY_LIMIT, background=False):
+        self.ffmpeg_path = ffmpeg_path
+        self.builder = CommandBuilder(ffmpeg_path)
+        self.queue = queue if queue is not None else JobQueue()
+        self.listener = listener or EngineListener()
+        self.workers = max(1, int(workers))
+        self.keep_finished = keep_finished
+        self.job_timeout = job_timeout
+        self.stall_timeout = stall_timeout
+        self.supervisor = supervisor or ProcessSupervisor()
+        self.progress_interval = progress_interval
+        self.kill_grace = kill_grace
+        self.disk_guard = disk_guard if disk_guard is not None else DiskGuard()
+        self.history = history or HistoryStore.default()
+        self.stem_workers = max(1, int(stem_workers))
+        self.stem_queue_size = stem_queue_size
+        self.stem_memory_limit = stem_memory_limit
+        self.background = background
+        self.governor = LoadGovernor(self.workers) if background else None
+        self._waiting_for_space = None
+        self.tracker = ProgressTracker()
+        self.jobs = collections.OrderedDict()
+        self._finished = collections.deque()
+        self._running = {}
+        # Jobs handed to the stem stage (queued or separating), by id
+        self._stemming = {}
+        self._stem_queue = None
+        self._procs = {}  # job id -> child processes (several while stem chunks run)
+        self._cancelled = set()
+        # Quality-target candidate encodes of all jobs share `workers` process slots
+        self._tune_slots = None
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self._prober = None
+        self._wakeup = None
+        self._shutdown = False
+        # A queue handed in pre-filled (the GUI's batches) never goes through submit()
+        for job in self.queue.pending():
+            self.jobs[job.id] = job
+
+    # --- Public API (thread-safe) ---
+    def submit(self, job):
+        with self._lock:
+            self.jobs[job.id] = job
+        job.state = STATE_QUEUED
+        self.queue.add(job)
+        self.wake()
+        return job
+
+    def wake(self):
+        """Make the dispatcher look at the queue now instead of at its next poll."""
+        if self._wakeup is not None:
+            self.supervisor.call_soon(self._wakeup.set)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            # Added straight to the queue while the batch runs
+            job = next((j for j in self.queue.pending_unordered() if j.id == job_id), None)
+        return job
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def slots(self):
+        """How many jobs may encode right now: `workers`, or the governor's limit in background mode."""
+        return self.governor.limit if self.governor else self.workers
+
+    def running_count(self):
+        with self._lock:
+            return len(self._running)
+
+    def running_jobs(self):
+        """Jobs in either pipeline stage: encoding or stem separation."""
+        with self._lock:
+            return ([self.jobs[job_id] for job_id in self._running if job_id in self.jobs]
+                    + list(self._stemming.values()))
+
+    def progress_snapshot(self):
+        """Current batch progress, computed on demand (e.g. for the daemon API)."""
+        return self.tracker.snapshot(self.running_jobs(), self.queue.pending_unordered(), force=True)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False if it already ended."""
+        job = self.get(job_id)
+        if job is None or job.state in FINAL_STATES:
+            return False
+        if self.queue.remove(job):
+            job.state = STATE_CANCELLED
+            job.message = 'Cancelled'
+            if self._wakeup is not None:
+                self.supervisor.call_soon(self._job_done, job)
+            else:
+                self._job_done(job)
+            return True
+        with self._lock:
+            self._cancelled.add(job.id)
+            procs = list(self._procs.get(job.id, ()))
+        # Signal right away; don't wait for ffmpeg's next output line
+        for proc in procs:
+            self.supervisor.call_soon(self._terminate, proc)
+        return True
+
+    def cancel_all(self):
+        for job in self.queue.pending():
+            self.cancel(job.id)
+        with self._lock:
+            running = list(self._running) + list(self._stemming)
+        for job_id in running:
+            self.cancel(job_id)
+
+    def start(self, drain=False):
+        self.supervisor.start()
+        self._dispatcher = self.supervisor.submit(self._dispatch(drain))
+
+    def wait(self, timeout=None):
+        """Block until the dispatcher exits; False if timeout expired first."""
+        if self._dispatcher is None:
+            return True
+        try:
+            self._dispatcher.result(timeout)
+        except concurrent.futures.TimeoutError:
+            return False
+        return True
+
+    def shutdown(self, wait=True):
+        self._shutdown = True
+        self.cancel_all()
+        self.wake()
+        if wait:
+            self.wait()
+            self.supervisor.stop()
+
+    # --- Loop side ---
+    def _probe_pending(self):
+        for job in self.queue.pending_unordered():
+            if job.duration is None and not self._shutdown:
+                job.duration = probe_job_duration(self.ffmpeg_path, job)
+                if job.duration is not None:
+                    self.queue.update(job)
+        # Classify 'Auto (Genre)' files in batches ahead of their turn, so builds only hit the cache
+        auto = [job.input_file for job in self.queue.pending_unordered() if self._needs_genre(job)]
+        if auto and NUMPY_AVAILABLE and not self._shutdown:
+            detect_genres(self.ffmpeg_path, auto)
+
+    def _needs_genre(self, job):
+        s = job.settings
+        return s.enhancement_mode.lower().startswith('auto') and not s.delivery_preset
+
+    async def _report_progress(self):
+        # Progress goes out on a fixed cadence, never per ffmpeg line
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            pending = self.queue.pending_unordered()
+            # Probe in the background so batch weights and the ETA firm up over time
+            if (self._prober is None or self._prober.done()) and any(j.duration is None for j in pending):
+                self._prober = self.supervisor.run_blocking(self._probe_pending)
+            snapshot = self.tracker.snapshot(self.running_jobs(), pending)
+            if snapshot is not None:
+                self.listener.progress(snapshot)
+
+    async def _govern(self):
+        # Background mode: a smaller limit only stops new starts; running jobs finish
+        while True:
+            before = self.governor.limit
+            limit, reason = await self.supervisor.run_blocking(self.governor.update)
+            if limit != before:
+                self.listener.job_log(None, f'Background mode: {limit} worker(s) ({reason})')
+                self.wake()
+            await asyncio.sleep(self.governor.interval)
+
+    async def _dispatch(self, drain):
+        self._wakeup = asyncio.Event()
+        self._tune_slots = asyncio.Semaphore(self.workers)
+        # Usually a disk-cache hit; a new ffmpeg binary is probed once, off the loop
+        await self.supervisor.run_blocking(get_capabilities, self.ffmpeg_path)
+        reporter = asyncio.ensure_future(self._report_progress())
+        governor = asyncio.ensure_future(self._govern()) if self.governor else None
+        self._stem_queue = asyncio.Queue(maxsize=max(1, self.stem_queue_size))
+        stem_stage = [asyncio.ensure_future(self._stem_worker()) for _ in range(self.stem_workers)]
+        idle = False
+        try:
+            while not self._shutdown:
+                # Duration-based policies need probed lengths before they can order jobs
+                if (len(self._running) < self.slots() and len(self.queue)
+                        and self.queue.policy in (POLICY_SJF, POLICY_DEADLINE)):
+                    await self.supervisor.run_blocking(self._probe_pending)
+                while len(self._running) < self.slots() and not self._shutdown:
+                    job = self.queue.pop_next()
+                    if job is None:
+                        break
+                    admission = await self._admit(job, drain)
+                    if admission == 'wait':
+                        self.queue.add(job)
+                        break
+                    if admission == 'skip':
+                        continue
+                    if idle:
+                        # First job after the engine sat idle opens a new batch
+                        self.tracker.reset()
+                        idle = False
+                    with self._lock:
+                        self.jobs.setdefault(job.id, job)
+                        self._running[job.id] = asyncio.ensure_future(self._run_job(job))
+                if not self._running and not self._stemming and not len(self.queue):
+                    if drain:
+                        break
+                    idle = True
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), 0.25)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            if self._running:
+                await asyncio.gather(*list(self._running.values()), return_exceptions=True)
+            await self._stem_queue.join()
+        finally:
+            reporter.cancel()
+            if governor:
+                governor.cancel()
+            for worker in stem_stage:
+                worker.cancel()
+            snapshot = self.progress_snapshot()
+            self.listener.progress(snapshot)
+            self._wakeup = None
+
+    async def _admit(self, job, drain):
+        """Disk-space admission: 'start', 'wait' (re-queue and pause) or 'skip' (failed)."""
+        if not self.disk_guard or job.split is not None:
+            return 'start'
+        if job.estimated_size is None:
+            job.estimated_size = await self.supervisor.run_blocking(estimate_output_size, self.builder, job)
+        ok, free = self.disk_guard.admit(job, self.running_jobs())
+        if ok:
+            if self._waiting_for_space:
+                self.listener.job_log(job, 'Disk space available again, resuming.')
+            self._waiting_for_space = None
+            return 'start'
+        if self._running or not drain:
+            # Running jobs may still finish and free up room, or someone may clean up
+            if self._waiting_for_space != job.id:
+                self.listener.job_log(job, f'Paused: {format_size(free)} free on {job.settings.output_folder}, '
+                                           f'{job.input_file} needs ~{format_size(job.estimated_size or 0)} '
+                                           f'(+{format_size(self.disk_guard.min_free)} reserve)')
+                self._waiting_for_space = job.id
+            return 'wait'
+        # Nothing running and nothing will change in a one-off batch: don't hang, fail it
+        with self._lock:
+            self.jobs.setdefault(job.id, job)
+        job.state = STATE_FAILED
+        job.message = (f'❌ Not enough disk space for {job.input_file}: needs ~{format_size(job.estimated_size or 0)}, '
+                       f'{format_size(free)} free')
+        self._job_done(job)
+        return 'skip'
+
+    def _terminate(self, proc):
+        if proc.returncode is None:
+            self.supervisor.submit(self.supervisor.terminate(proc, self.kill_grace))
+
+    def _job_done(self, job):
+        with self._lock:
+            self._cancelled.discard(job.id)
+            self._running.pop(job.id, None)
+            self._stemming.pop(job.id, None)
+            self._finished.append(job.id)
+            self.tracker.job_finished(job)
+            # Bound memory for long-lived engines: forget the oldest finished jobs
+            while len(self._finished) > self.keep_finished:
+                self.jobs.pop(self._finished.popleft(), None)
+        self.listener.job_finished(job)
+        self.wake()
+
+    def _on_line(self, job, line):
+        self.listener.job_log(job, line)
+
+        # Parse duration (a trimmed job's is the span, which the probe already worked out)
+        if 'Duration' in line and not job.duration and job.start is None and job.end is None:
+            m = DURATION_PATTERN.search(line)
+            if m:
+                job.duration = parse_timestamp(*m.groups())
+
+        # Parse current time
+        if 'time=' in line and job.duration:
+            m = TIME_PATTERN.search(line)
+            if m:
+                job.position = min(job.duration, parse_timestamp(*m.groups()))
+                job.progress = int((job.position / job.duration) * 100)
+
+        # ffmpeg's speed= is the average over the run so far; the last one is the job's realtime factor
+        if 'speed=' in line:
+            m = SPEED_PATTERN.search(line)
+            if m:
+                job.speed = float(m.group(1))
+
+    def _on_start(self, job, proc):
+        with self._lock:
+            self._procs.setdefault(job.id, set()).add(proc)
+            cancelled = job.id in self._cancelled
+        if cancelled:
+            self._terminate(proc)
+
+    def _remove_partial(self, path, existed_before):
+        # Only delete what this run wrote; an older finished file with the same name stays
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path) and os.path.getmtime(path) != existed_before:
+                os.remove(path)
+        except OSError as e:
+            return f'could not remove partial output {path}: {e}'
+        return None
+
+    async def _split_job(self, job):
+        # Analysis pass only; the tracks become jobs of their own and encode in parallel through the worker slots
+        job.state = STATE_RUNNING
+        job.progress = 0
+        job.position = 0.0
+        job.speed = None
+        self.tracker.job_started(job)
+        self.listener.job_started(job)
+        lines = []
+
+        def on_line(line):
+            if 'silence_' in line:
+                lines.append(line)
+            self._on_line(job, line)
+
+        try:
+            if job.duration is None:
+                job.duration = await self.supervisor.run_blocking(probe_job_duration, self.ffmpeg_path, job)
+            silences = await self.supervisor.run_blocking(cached_silences, job.input_file, job.split)
+            if silences is None:
+                cmd = silencedetect_cmd(self.ffmpeg_path, job.input_file, job.split['noise_db'], job.split['min_silence'])
+                self.listener.job_log(job, 'Running: ' + ' '.join(cmd))
+                returncode = await self.supervisor.run_process(
+                    cmd, on_line=on_line, on_start=lambda proc: self._on_start(job, proc),
+                    timeout=self.job_timeout, stall_timeout=self.stall_timeout, low_priority=self.background
+                )
+                if returncode == 0 and job.id not in self._cancelled:
+                    silences = parse_silences(lines, job.duration)
+                    await self.supervisor.run_blocking(store_silences, job.input_file, job.split, silences)
+        except Exception as e:
+            job.state = STATE_FAILED
+            job.message = f"❌ Silence detection failed for {job.input_file}: {e}"
+        else:
+            if job.id in self._cancelled:
+                job.state = STATE_CANCELLED
+                job.message = 'Cancelled'
+            elif silences is None:
+                job.state = STATE_FAILED
+                job.message = f"❌ Silence detection failed for {job.input_file}"
+            else:
+                tracks = track_jobs(job, track_spans(silences, job.duration, job.split['min_track']))
+                for track in tracks:
+                    self.submit(track)
+                job.state = STATE_DONE
+                job.progress = 100
+                job.position = job.duration or 0.0
+                job.message = f'Split into {len(tracks)} track(s)'
+                self.listener.job_log(job, f'{job.input_file}: {len(tracks)} track(s) queued')
+        finally:
+            with self._lock:
+                self._procs.pop(job.id, None)
+
+    async def _run_job(self, job):
+        # Whatever goes wrong, the job ends and frees its slot; otherwise a drain batch never finishes
+        handed_over = False
+        try:
+            if job.split is not None:
+                await self._split_job(job)
+            else:
+                handed_over = await self._convert(job)
+        except Exception as e:
+            job.state = STATE_FAILED
+            job.message = f"❌ Conversion failed for {job.input_file}: {e}"
+        finally:
+            if not handed_over:
+                self._job_done(job)
+
+    async def _convert(self, job):
+        # True when the job moved on to the stem stage, which finishes it
+        output_mtime = None
+        concat_list = None
+        try:
+            # Copy-vs-transcode and merge decisions need the probed streams; keep those probes off the loop
+            duration = await self.supervisor.run_blocking(probe_job_duration, self.ffmpeg_path, job)
+            if job.duration is None:
+                job.duration = duration
+            if (job.tuning is None and job.settings.quality == QUALITY_TARGET and not job.settings.delivery_preset
+                    and not job.inputs):
+                await self._tune_quality(job)
+            # Off the loop: building may probe the input or classify it for 'Auto (Genre)'
+            cmd, output_file = await self.supervisor.run_blocking(self.builder.build, job)
+            job.output_file = output_file
+            if job.inputs and concat_list_path(output_file) in cmd:
+                concat_list = concat_list_path(output_file)
+                await self.supervisor.run_blocking(write_concat_list, concat_list, job.inputs)
+            job.state = STATE_RUNNING
+            job.progress = 0
+            job.position = 0.0
+            job.speed = None
+            concurrency = len(self._running)
+            if os.path.exists(output_file):
+                output_mtime = os.path.getmtime(output_file)
+            if self.builder.is_ladder(job.settings):
+                # The DASH muxer writes into the directory but doesn't create it
+                os.makedirs(output_file, exist_ok=True)
+            self.tracker.job_started(job)
+            self.listener.job_started(job)
+
+            # Log command (sanitized)
+            self.listener.job_log(job, 'Running: ' + ' '.join([sh for sh in cmd]))
+
+            started = self.supervisor.loop.time()
+            returncode = await self.supervisor.run_process(
+                cmd, on_line=lambda line: self._on_line(job, line), on_start=lambda proc: self._on_start(job, proc),
+                timeout=self.job_timeout, stall_timeout=self.stall_timeout, low_priority=self.background
+            )
+        except Exception as e:
+            job.state = STATE_FAILED
+            job.message = f"❌ Conversion failed for {job.input_file}: {e}"
+        else:
+            if job.id in self._cancelled:
+                job.state = STATE_CANCELLED
+                job.message = 'Cancelled'
+            elif returncode != 0:
+                job.state = STATE_FAILED
+                job.message = f"❌ Conversion failed for {job.input_file}"
+            else:
+                job.state = STATE_DONE
+                job.progress = 100
+                job.position = job.duration or 0.0
+                job.message = 'Done'
+                await self.supervisor.run_blocking(self._record_run, job, cmd, concurrency,
+                                                  self.supervisor.loop.time() - started)
+        finally:
+            with self._lock:
+                self._procs.pop(job.id, None)
+            if concat_list:
+                try:
+                    os.remove(concat_list)
+                except OSError:
+                    pass
+        if job.state in (STATE_FAILED, STATE_CANCELLED) and job.output_file:
+            problem = self._remove_partial(job.output_file, output_mtime)
+            if problem:
+                self.listener.job_log(job, problem)
+        if (job.state == STATE_DONE and job.settings.separate_stems and SPLEETER_AVAILABLE
+                and not self.builder.is_ladder(job.settings)):
+            # Hand over to the stem stage; while its queue is full this encode slot stays taken
+            job.state = STATE_RUNNING
+            job.message = 'Waiting for stem separation'
+            with self._lock:
+                self._stemming[job.id] = job
+            await self._stem_queue.put(job)
+            with self._lock:
+                self._running.pop(job.id, None)
+            self.wake()
+            return True
+        return False
+
+    async def _tune_quality(self, job):
+        # Encode one excerpt at every rung of the ladder, `workers` at a time, and keep the smallest setting that passes
+        cmd, output_file = await self.supervisor.run_blocking(self.builder.build, job)
+        space = search_space(cmd)
+        job.tuning = {}
+        if not space:
+            return
+        s = job.settings
+        offset, length = excerpt_span(job.duration, job.start, job.end)
+        work_dir = os.path.join(s.output_folder, f'.{os.path.splitext(os.path.basename(output_file))[0]}.tune')
+        os.makedirs(work_dir, exist_ok=True)
+        self.listener.job_log(job, f'Quality target: trying {sum(len(ladder) for _, ladder in space.values())} '
+                                   f'encodes of a {length:.0f} s excerpt')
+        failed = float('-inf')
+
+        async def measure_ssim(candidate):
+            lines = []
+            returncode = await self.supervisor.run_process(
+                ssim_cmd(self.ffmpeg_path, candidate, job.input_file, offset, length),
+                on_line=lines.append, on_start=lambda proc: self._on_start(job, proc), low_priority=self.background
+            )
+            score = parse_ssim(lines) if returncode == 0 else None
+            return failed if score is None else score
+
+        async def encode_and_score(build_cmd, score, value, candidate):
+            async with self._tune_slots:
+                try:
+                    if (job.id in self._cancelled or await self._run_child(job, build_cmd(value, candidate)) != 0
+                            or job.id in self._cancelled):
+                        return failed
+                    return await score(candidate)
+                except Exception as e:
+                    # e.g. a broken scoring pool or a NumPy error: drop just this candidate
+                    self.listener.job_log(job, f'Could not score {os.path.basename(candidate)}: {e}')
+                    return failed
+
+        try:
+            searches = []
+            if '-b:a' in space:
+                audio_encoder, ladder = space['-b:a']
+                reference = os.path.join(work_dir, 'reference.wav')
+                af = await self.supervisor.run_blocking(self.builder.audio_filter, job)
+                async with self._tune_slots:
+                    returncode = await self._run_child(job, reference_cmd(self.ffmpeg_path, job.input_file, offset,
+                                                                          length, af, reference))
+                if returncode == 0:
+                    pool = AnalysisPool.default()
+                    searches.append(('-b:a', ladder, s.target_snr or AUDIO_TARGET, [encode_and_score(
+                        lambda b, out: audio_candidate_cmd(self.ffmpeg_path, reference, audio_encoder, b, out),
+                        lambda out: self.supervisor.run_blocking(pool.run, score_audio, self.ffmpeg_path, reference, out),
+                        b, os.path.join(work_dir, f'a{b}.{CANDIDATE_EXT[audio_encoder]}')) for b in ladder]))
+            if '-crf' in space:
+                video_encoder, ladder = space['-crf']
+                args = video_args(cmd)
+                searches.append(('-crf', ladder, s.target_ssim or VIDEO_TARGET, [encode_and_score(
+                    lambda crf, out: video_candidate_cmd(self.ffmpeg_path, job.input_file, offset, length, args, crf, out),
+                    measure_ssim, crf, os.path.join(work_dir, f'v{crf}.{CANDIDATE_EXT[video_encoder]}')) for crf in ladder]))
+            # Candidates of both searches share the slots
+            results = await asyncio.gather(*(c for _, _, _, coros in searches for c in coros))
+            for flag, ladder, target, _ in searches:
+                scores, results = results[:len(ladder)], results[len(ladder):]
+                if all(sc == failed for sc in scores):
+                    # e.g. a CRF search on a file without video: keep the regular setting
+                    self.listener.job_log(job, f'Quality target: no {flag} candidate could be scored')
+                    continue
+                job.tuning[flag] = pick(ladder, scores, target)
+                tried = ', '.join(f'{v}: {"-" if sc is None else f"{sc:.3g}"}' for v, sc in zip(ladder, scores))
+                self.listener.job_log(job, f'Quality target: {flag} {job.tuning[flag]} ({tried})')
+        finally:
+            await self.supervisor.run_blocking(shutil.rmtree, work_dir, True)
+
+    async def _stem_worker(self):
+        while True:
+            job = await self._stem_queue.get()
+            try:
+                if job.id in self._cancelled:
+                    job.state = STATE_CANCELLED
+                    job.message = 'Cancelled before stem separation'
+                else:
+                    job.message = 'Separating stems'
+                    await self._separate_stems(job)
+                    if job.state == STATE_RUNNING:
+                        job.state = STATE_DONE
+                        job.message = 'Done'
+            except Exception as e:
+                job.state = STATE_FAILED
+                job.message = f"❌ Stem separation failed for {job.input_file}: {e}"
+            finally:
+                with self._lock:
+                    self._procs.pop(job.id, None)
+                self._stem_queue.task_done()
+                self._job_done(job)
+
+    def _record_run(self, job, cmd, concurrency, wall_seconds):
+        # Feeds the planner's cost model and the history reports; probe results are cached
+        if not job.duration:
+            return
+        info = probe_media(self.ffmpeg_path, job.input_file)
+        output_format, preset, input_codec = cost_key(self.builder, job, info, cmd)
+        threads = int(cmd[cmd.index('-threads') + 1]) if '-threads' in cmd else 0
+        realtime = job.speed or (job.duration / wall_seconds if wall_seconds > 0 else None)
+        try:
+            self.history.record(input_codec, job.duration, output_format, preset, realtime, wall_seconds,
+                                threads=threads, concurrency=concurrency)
+        except sqlite3.Error as e:
+            self.listener.job_log(job, f'Could not record run history: {e}')
+
+    async def _separate_stems(self, job):
+        # Child processes, so they can be cancelled like ffmpeg
+        stems_dir = os.path.join(job.settings.output_folder, os.path.splitext(os.path.basename(job.output_file))[0])
+        chunks, parallel = chunk_plan(job.duration, self.stem_memory_limit // self.stem_workers)
+        self.listener.job_log(job, 'Separating stems with Spleeter...')
+        try:
+            if len(chunks) == 1:
+                returncode = await self._run_child(job, spleeter_cmd(job.settings.output_folder, job.output_file))
+            else:
+                self.listener.job_log(job, f'{len(chunks)} chunks, {parallel} at a time')
+                returncode = await self._separate_chunked(job, chunks, parallel, stems_dir)
+        except OSError as e:
+            self.listener.job_log(job, f'Spleeter failed: {e}')
+            return
+        if job.id in self._cancelled:
+            # The conversion itself finished; only the half-written stems go
+            job.state = STATE_CANCELLED
+            job.message = 'Cancelled during stem separation'
+            self._remove_partial(stems_dir, None)
+        elif returncode != 0:
+            self.listener.job_log(job, f'Spleeter failed with exit code {returncode}')
+        else:
+            self.listener.job_log(job, 'Stems saved.')
+
+    async def _run_child(self, job, cmd):
+        return await self.supervisor.run_process(
+            cmd, on_line=lambda line: self.listener.job_log(job, line), on_start=lambda proc: self._on_start(job, proc),
+            low_priority=self.background
+        )
+
+    async def _separate_chunked(self, job, chunks, parallel, stems_dir):
+        # Cut overlapping WAV chunks, separate up to `parallel` at once, then crossfade each stem back together
+        work_dir = os.path.join(job.settings.output_folder, f'.{os.path.basename(stems_dir)}.chunks')
+        os.makedirs(work_dir, exist_ok=True)
+        slots = asyncio.Semaphore(parallel)
+
+        async def separate(index, start, length):
+            chunk = os.path.join(work_dir, f'chunk{index:04d}.wav')
+            async with slots:
+                if job.id in self._cancelled:
+                    return -1
+                returncode = await self._run_child(job, extract_cmd(self.ffmpeg_path, job.output_file, start, length, chunk))
+                if returncode == 0 and job.id not in self._cancelled:
+                    returncode = await self._run_child(job, spleeter_cmd(work_dir, chunk))
+                if returncode == 0:
+                    self.listener.job_log(job, f'Chunk {index + 1}/{len(chunks)} separated')
+                return returncode
+
+        try:
+            # Let every chunk finish before the work dir goes, even if one couldn't start
+            results = await asyncio.gather(*(separate(i, start, length) for i, (start, length) in enumerate(chunks)),
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            failed = [code for code in results if code != 0]
+            if failed or job.id in self._cancelled:
+                return failed[0] if failed else -1
+            os.makedirs(stems_dir, exist_ok=True)
+            for stem in STEMS:
+                parts = [os.path.join(work_dir, f'chunk{i:04d}', f'{stem}.wav') for i in range(len(chunks))]
+                returncode = await self._run_child(job, crossfade_cmd(
+                    self.ffmpeg_path, parts, OVERLAP_SECONDS, os.path.join(stems_dir, f'{stem}.wav')
+                ))
+                if returncode != 0:
+                    return returncode
+            return 0
+        finally:
+            await self.supervisor.run_blocking(shutil.rmtree, work_dir, True)
@@ -0,0 +1,241 @@
+# modules/fakeff.py
+"""Stand-in ffmpeg for exercising the engine without real encodes.
+
+Run as a script (see write_launcher). It answers -version, -encoders,
+-filters and -hwaccels, prints the input banner with its Duration line,
+reports progress as time=/speed= stats lines (and -progress key=value
+blocks), takes as long as the scripted profile says, writes a dummy output
+file and exits with the profile's exit code. SIGTERM/SIGINT end it with 255
+like ffmpeg.
+
+The profile is a JSON file named by FFX_FAKE_PROFILE; missing keys take the
+DEFAULT_PROFILE values. `rules` override keys for commands that contain
+`match`, e.g. {"match": "broken", "exit_code": 1, "fail_at": 0.5}; the first
+matching rule wins.
+"""
+import json
+import os
+import signal
+import stat
+import sys
+import time
+import zlib
+
+PROFILE_ENV = 'FFX_FAKE_PROFILE'
+
+DEFAULT_PROFILE = {
+    # Media seconds of every input; [low, high] picks a fixed value per input path
+    'duration': 60.0,
+    # Media seconds per wall second
+    'speed': 100.0,
+    # Wall seconds between progress reports
+    'interval': 0.5,
+    # Wall seconds before the banner (process start-up cost)
+    'startup': 0.0,
+    'exit_code': 0,
+    # Fraction of the duration at which the run stops with an error (exit_code, or 1 if that is 0)
+    'fail_at': None,
+    # Fraction of the duration after which output stops and the process hangs until killed
+    'stall_at': None,
+    'output_bytes': 1024,
+    # Streams reported for every input
+    'streams': ['audio'],
+    # Extra stderr lines after the banner, e.g. silencedetect output for a rule matching 'silencedetect'
+    'log': [],
+    'rules': [],
+}
+
+ENCODERS = ['aac', 'flac', 'libmp3lame', 'libopus', 'libvorbis', 'pcm_s16le', 'libx264', 'libx265', 'libvpx-vp9']
+FILTERS = ['acompressor', 'afftdn', 'aformat', 'asplit', 'concat', 'equalizer', 'fps', 'format', 'loudnorm', 'pad',
+           'scale', 'setpts', 'setsar', 'silencedetect', 'split', 'ssim']
+AUDIO_STREAM = 'Audio: pcm_s16le, 44100 Hz, stereo, s16, 1411 kb/s'
+VIDEO_STREAM = 'Video: h264, yuv420p, 1920x1080, 25 fps'
+
+
+def load_profile(path=None):
+    profile = dict(DEFAULT_PROFILE)
+    path = path or os.environ.get(PROFILE_ENV)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            profile.update(json.load(f))
+    return profile
+
+
+def resolve(profile, argv):
+    """The profile with the first rule matching the command line applied."""
+    line = ' '.join(argv)
+    for rule in profile.get('rules') or []:
+        if rule.get('match', '') in line:
+            profile = dict(profile, **{k: v for k, v in rule.items() if k != 'match'})
+            break
+    return profile
+
+
+def media_duration(profile, path):
+    duration = profile['duration']
+    if isinstance(duration, (list, tuple)):
+        low, high = duration
+        return low + (high - low) * (zlib.crc32(path.encode('utf-8')) % 1000) / 999.0
+    return float(duration)
+
+
+def _timestamp(seconds):
+    h, rest = divmod(max(0.0, seconds), 3600)
+    m, s = divmod(rest, 60)
+    return f'{int(h):02d}:{int(m):02d}:{s:05.2f}'
+
+
+def _option(argv, flag):
+    return argv[argv.index(flag) + 1] if flag in argv[:-1] else None
+
+
+def _inputs(argv):
+    return [argv[i + 1] for i, arg in enumerate(argv[:-1]) if arg == '-i']
+
+
+def _output(argv):
+    # The last argument, unless it is an input or an option's value
+    if len(argv) < 2 or argv[-2] == '-i' or (argv[-1].startswith('-') and argv[-1] != '-'):
+        return None
+    return argv[-1]
+
+
+def _listing(title, names, kind):
+    lines = [f'{title}:', f' {kind}..... = {title[:-1]}', ' ------']
+    return '\n'.join(lines + [f' {kind}.....  {name:<20} Fake {name}' for name in names]) + '\n'
+
+
+def _banner(err, profile, inputs, quiet):
+    if quiet:
+        return
+    for index, path in enumerate(inputs):
+        err.write(f"Input #{index}, fake, from '{path}':\n"
+                  f"  Duration: {_timestamp(media_duration(profile, path))}, start: 0.000000, bitrate: 1411 kb/s\n")
+        for n, kind in enumerate(profile['streams']):
+            err.write(f"  Stream #{index}:{n}: {AUDIO_STREAM if kind == 'audio' else VIDEO_STREAM}\n")
+    err.flush()
+
+
+def _write_output(path, size):
+    if not path or path == '-' or path.startswith('pipe:'):
+        return
+    path = path.replace('%v', '0')
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * int(size))
+
+
+def _progress_writer(target):
+    if target is None:
+        return None
+    if target in ('pipe:1', '-'):
+        return sys.stdout
+    if target == 'pipe:2':
+        return sys.stderr
+    return open(target, 'w', encoding='utf-8')
+
+
+def run(argv, profile):
+    """Emulate one ffmpeg invocation; returns the exit code."""
+    out, err = sys.stdout, sys.stderr
+    if '-version' in argv:
+        out.write('ffmpeg version 7.0-fake Copyright (c) 2000-2024 the FFmpeg developers (stand-in)\n')
+        return 0
+    for flag, title, names, kind in (('-encoders', 'Encoders', ENCODERS, 'A'), ('-filters', 'Filters', FILTERS, 'T')):
+        if flag in argv:
+            out.write(_listing(title, names, kind))
+            return 0
+    if '-hwaccels' in argv:
+        out.write('Hardware acceleration methods:\n\n')
+        return 0
+
+    profile = resolve(profile, argv)
+    quiet = (_option(argv, '-v') or _option(argv, '-loglevel')) in ('error', 'quiet', 'fatal', 'panic')
+    inputs = _inputs(argv)
+    time.sleep(profile['startup'])
+    _banner(err, profile, inputs, quiet)
+    for line in profile['log']:
+        err.write(line + '\n')
+    output = _output(argv)
+    if not inputs or output is None:
+        err.write('At least one output file must be specified\n')
+        return 1
+
+    duration = media_duration(profile, inputs[0])
+    if _option(argv, '-t'):
+        duration = min(duration, float(_option(argv, '-t')))
+    speed = max(1e-6, float(profile['speed']))
+    fail_at = profile['fail_at']
+    stop = duration * fail_at if fail_at is not None else duration
+    stall = duration * profile['stall_at'] if profile['stall_at'] is not None else None
+    progress = _progress_writer(_option(argv, '-progress'))
+    stats = '-nostats' not in argv
+
+    started = time.monotonic()
+    position = 0.0
+    while True:
+        elapsed = time.monotonic() - started
+        position = min(stop, elapsed * speed)
+        if stall is not None and position >= stall:
+            while True:
+                time.sleep(3600)
+        done = position >= stop
+        if stats:
+            err.write(f'size={int(position * 176):8d}KiB time={_timestamp(position)} bitrate=1411.2kbits/s '
+                      f'speed={speed:.3g}x' + ('\n' if done else '\r'))
+            err.flush()
+        if progress:
+            progress.write(f'out_time_us={int(position * 1e6)}\nout_time={_timestamp(position)}\n'
+                           f'speed={speed:.3g}x\nprogress={"end" if done else "continue"}\n')
+            progress.flush()
+        if done:
+            break
+        time.sleep(min(profile['interval'], max(0.0, (stop - position) / speed)))
+
+    if fail_at is not None:
+        err.write(f'Error while encoding: fake failure at {_timestamp(position)}\n')
+        return profile['exit_code'] or 1
+    _write_output(output, profile['output_bytes'])
+    return profile['exit_code']
+
+
+def write_launcher(directory, profile_path=None, name='ffmpeg'):
+    """Write an executable `ffmpeg` (ffmpeg.cmd on Windows) into directory that runs this stand-in.
+
+    Point the GUI, CLI or engine at the returned path. No ffprobe is
+    written, so probes fall back to parsing `ffmpeg -i`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    script = os.path.abspath(__file__)
+    if os.name == 'nt':
+        path = os.path.join(directory, name + '.cmd')
+        env = f'set "{PROFILE_ENV}={os.path.abspath(profile_path)}"\r\n' if profile_path else ''
+        content = f'@echo off\r\n{env}"{sys.executable}" -S "{script}" %*\r\n'
+    else:
+        path = os.path.join(directory, name)
+        env = f"export {PROFILE_ENV}='{os.path.abspath(profile_path)}'\n" if profile_path else ''
+        content = f"#!/bin/sh\n{env}exec '{sys.executable}' -S '{script}' \"$@\"\n"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def main(argv=None):
+    def interrupted(signum, frame):
+        sys.stderr.write(f'Exiting normally, received signal {signum}.\n')
+        sys.stderr.flush()
+        os._exit(255)
+
+    signal.signal(signal.SIGTERM, interrupted)
+    signal.signal(signal.SIGINT, interrupted)
+    try:
+        return run(list(sys.argv[1:] if argv is None else argv), load_profile())
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f'{e}\n')
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
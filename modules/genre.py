@@ -0,0 +1,229 @@
+# modules/genre.py
+import json
+import os
+import subprocess
+import threading
+import warnings
+from modules.analysis import AnalysisPool, SharedBuffer
+from modules.utils import probe_media
+
+NUMPY_AVAILABLE = True
+try:
+    import numpy as np
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+GENRE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.ffxpro', 'genres.json')
+# Bump when features or prototypes change so stale cache entries are ignored
+ANALYSIS_VERSION = 1
+
+SAMPLE_RATE = 22050
+EXCERPT_SECONDS = 20
+FRAME = 2048
+BATCH_SIZE = 8
+
+# (low, high) Hz for the band energy features
+BANDS = ((0, 150), (150, 2000), (2000, 6000), (6000, SAMPLE_RATE / 2))
+FEATURES = ('sub', 'mid', 'presence', 'air', 'centroid', 'onset_rate', 'dynamic_range')
+
+# Hand-tuned feature prototypes for the genres _af_for_profile knows, and the scale of each feature
+PROTOTYPES = {
+    'rock': (0.12, 0.50, 0.28, 0.10, 2500, 3.5, 14),
+    'edm': (0.35, 0.35, 0.20, 0.10, 2200, 4.5, 8),
+    'chill': (0.20, 0.60, 0.15, 0.05, 1300, 2.0, 12),
+    'classical': (0.05, 0.70, 0.20, 0.05, 1500, 1.0, 25),
+}
+_SCALE = (0.1, 0.1, 0.1, 0.05, 1000, 1.5, 6)
+# Excerpts quieter than this (mean square of full-scale samples) are not classified
+_SILENCE = 1e-6
+
+_memory = {}
+_lock = threading.Lock()
+# Idle GenreAnalyzers per ffmpeg path; each has its own PCM buffer, so concurrent calls take one each
+_analyzers = {}
+
+
+def fingerprint(path):
+    # Same file, same answer: a re-encoded or replaced file has a new size/mtime
+    st = os.stat(path)
+    return f'{ANALYSIS_VERSION}|{os.path.realpath(path)}|{st.st_size}|{st.st_mtime}'
+
+
+def classify(features):
+    """Nearest genre prototype for a FEATURES tuple."""
+    best, best_distance = None, None
+    for genre, proto in PROTOTYPES.items():
+        distance = sum(((f - p) / s) ** 2 for f, p, s in zip(features, proto, _SCALE))
+        if best_distance is None or distance < best_distance:
+            best, best_distance = genre, distance
+    return best
+
+
+def batch_features(pcm, n, lengths):
+    """FEATURES tuples (None for silent or undecoded rows) for the first n rows of an int16 PCM batch.
+
+    Runs in an AnalysisPool worker with pcm mapped from shared memory.
+    """
+    window = np.hanning(FRAME).astype(np.float32)
+    freqs = np.fft.rfftfreq(FRAME, 1.0 / SAMPLE_RATE)
+    frames = pcm.shape[1] // FRAME
+    x = pcm[:n, :frames * FRAME].astype(np.float32) / 32768.0
+    spec = np.abs(np.fft.rfft(x.reshape(n, frames, FRAME) * window, axis=2)) ** 2
+    valid = np.arange(frames)[None, :] < (lengths // FRAME)[:, None]
+    spec *= valid[:, :, None]
+
+    total = spec.sum(axis=1)
+    energy = total.sum(axis=1) + 1e-12
+    bands = np.stack([total[:, (freqs >= low) & (freqs < high)].sum(axis=1) for low, high in BANDS], axis=1)
+    bands /= energy[:, None]
+    centroid = (total * freqs).sum(axis=1) / energy
+
+    frame_power = np.where(valid, spec.sum(axis=2), np.nan)
+    level = 10 * np.log10(frame_power + 1e-12)
+    # Onsets: peaks in the positive log-spectral flux above mean + one deviation
+    flux = np.maximum(np.diff(np.log1p(spec * 1e4), axis=1), 0).sum(axis=2)
+    flux = np.where(valid[:, 1:], flux, np.nan)
+    with warnings.catch_warnings():
+        # Rows of files that didn't decode are all NaN; they are dropped below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        dynamic_range = np.nanpercentile(level, 95, axis=1) - np.nanpercentile(level, 10, axis=1)
+        threshold = np.nanmean(flux, axis=1) + np.nanstd(flux, axis=1)
+    peaks = (flux[:, 1:-1] > flux[:, :-2]) & (flux[:, 1:-1] >= flux[:, 2:]) & (flux[:, 1:-1] > threshold[:, None])
+    onset_rate = peaks.sum(axis=1) / np.maximum(lengths / SAMPLE_RATE, 1e-3)
+
+    loudness = (x ** 2).sum(axis=1) / np.maximum(lengths, 1)
+    return [None if lengths[i] < FRAME * 4 or loudness[i] < _SILENCE
+            else tuple(float(v) for v in (*bands[i], centroid[i], onset_rate[i], dynamic_range[i]))
+            for i in range(n)]
+
+
+class GenreAnalyzer:
+    """Decodes short mono excerpts and computes spectral features for a batch of files at once.
+
+    PCM goes straight from ffmpeg's stdout into one preallocated int16
+    shared-memory buffer (a row per file), and the features for the whole
+    batch come from a single FFT over that buffer in an AnalysisPool worker.
+    Not thread-safe; use one per thread or go through detect_genres().
+    """
+
+    def __init__(self, ffmpeg_path, batch_size=BATCH_SIZE, seconds=EXCERPT_SECONDS, pool=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.batch_size = batch_size
+        self.seconds = seconds
+        self.pool = pool or AnalysisPool.default()
+        self._buffer = SharedBuffer((batch_size, seconds * SAMPLE_RATE), np.int16)
+
+    def _excerpt_cmd(self, path):
+        # Skip intros: start about a third of the way in when the file is long enough
+        duration = float(probe_media(self.ffmpeg_path, path).get('format', {}).get('duration') or 0)
+        start = max(0.0, min(duration * 0.3, duration - self.seconds))
+        return [self.ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-ss', f'{start:.3f}', '-t', str(self.seconds),
+                '-i', path, '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-']
+
+    def _decode(self, paths):
+        # All decoders start together; each one's output is read into its own row
+        procs = []
+        for path in paths:
+            try:
+                procs.append(subprocess.Popen(self._excerpt_cmd(path), stdout=subprocess.PIPE,
+                                              stderr=subprocess.DEVNULL))
+            except OSError:
+                procs.append(None)
+        pcm = self._buffer.array
+        lengths = np.zeros(len(paths), dtype=np.int64)
+        for i, proc in enumerate(procs):
+            if proc is None:
+                continue
+            got = 0
+            with memoryview(pcm[i]) as view, view.cast('B') as row:
+                while got < len(row):
+                    n = proc.stdout.readinto(row[got:])
+                    if not n:
+                        break
+                    got += n
+            proc.stdout.close()
+            proc.wait()
+            lengths[i] = got // 2
+            pcm[i, lengths[i]:] = 0
+        return lengths
+
+    def analyze(self, paths):
+        """[(genre or None, features dict or None)] for up to batch_size paths."""
+        paths = list(paths)[:self.batch_size]
+        n = len(paths)
+        if not n:
+            return []
+        lengths = self._decode(paths)
+        features = self.pool.run_shared(batch_features, self._buffer, n, lengths)
+        return [(None, None) if f is None else (classify(f), dict(zip(FEATURES, f))) for f in features]
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def detect_genres(ffmpeg_path, paths, cache_path=GENRE_CACHE_PATH):
+    """{path: genre or None} from the audio itself, using the memory and disk caches.
+
+    Needs NumPy; without it every path maps to None. The lock only guards
+    the caches: decoding and the FFTs run outside it, so separate calls
+    classify their files at the same time.
+    """
+    result = {}
+    if not NUMPY_AVAILABLE or not ffmpeg_path:
+        return {p: None for p in paths}
+    keys = {}
+    for path in paths:
+        try:
+            keys[path] = fingerprint(path)
+        except OSError:
+            result[path] = None
+    with _lock:
+        todo = [p for p, key in keys.items() if key not in _memory]
+        if todo:
+            cache = _read_cache(cache_path)
+            for path in todo:
+                if keys[path] in cache:
+                    _memory[keys[path]] = cache[keys[path]]
+            todo = [p for p in todo if keys[p] not in _memory]
+        result.update((p, _memory[key]['genre']) for p, key in keys.items() if key in _memory)
+        if not todo:
+            return result
+        idle = _analyzers.setdefault(ffmpeg_path, [])
+        analyzer = idle.pop() if idle else None
+    found = {}
+    try:
+        if analyzer is None:
+            analyzer = GenreAnalyzer(ffmpeg_path)
+        for i in range(0, len(todo), analyzer.batch_size):
+            batch = todo[i:i + analyzer.batch_size]
+            for path, (genre, features) in zip(batch, analyzer.analyze(batch)):
+                result[path] = genre
+                found[keys[path]] = {'genre': genre, 'features': features}
+    finally:
+        with _lock:
+            if analyzer is not None:
+                _analyzers[ffmpeg_path].append(analyzer)
+            # Silent or undecodable excerpts are remembered for this run too, so a build never decodes them
+            # again; only real classifications go to disk, where a passing failure would stick
+            _memory.update(found)
+            stored = {key: entry for key, entry in found.items() if entry['features'] is not None}
+            if stored:
+                cache = _read_cache(cache_path)
+                cache.update(stored)
+                try:
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+                        json.dump(cache, f)
+                    os.replace(cache_path + '.tmp', cache_path)
+                except OSError:
+                    pass
+    return result
+
+
+def detect_genre(ffmpeg_path, path):
+    return detect_genres(ffmpeg_path, [path]).get(path)
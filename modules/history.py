@@ -0,0 +1,132 @@
+# modules/history.py
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.ffxpro', 'history.sqlite3')
+
+# Raw runs older than this are folded into per-bucket totals by compact()
+KEEP_RAW_DAYS = 30
+# compact() runs automatically after this many recorded runs
+COMPACT_EVERY = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    finished REAL, host TEXT, input_codec TEXT, duration REAL, output_format TEXT, preset TEXT,
+    threads INTEGER, concurrency INTEGER, realtime REAL, wall_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_finished ON runs (finished);
+CREATE TABLE IF NOT EXISTS rollup (
+    host TEXT, input_codec TEXT, output_format TEXT, preset TEXT, threads INTEGER, concurrency INTEGER,
+    runs INTEGER, media_seconds REAL, encode_seconds REAL,
+    PRIMARY KEY (host, input_codec, output_format, preset, threads, concurrency)
+);
+'''
+
+# Raw runs and compacted totals, in one shape: encode_seconds is media time / realtime factor
+_BUCKETS = '''
+SELECT host, input_codec, output_format, preset, threads, concurrency,
+       1 AS runs, duration AS media_seconds, duration / realtime AS encode_seconds
+FROM runs
+UNION ALL
+SELECT host, input_codec, output_format, preset, threads, concurrency, runs, media_seconds, encode_seconds
+FROM rollup
+'''
+
+
+def host_name():
+    return socket.gethostname()
+
+
+class HistoryStore:
+    """Completed conversions, kept in a local SQLite database.
+
+    Every successful job appends one row to `runs`. compact() folds rows
+    older than KEEP_RAW_DAYS into `rollup` (one row per host/codec/format/
+    preset/threads/concurrency), so the file stays small however long the
+    history gets while the averages keep every run.
+    """
+
+    _default = None
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._since_compact = 0
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def record(self, input_codec, duration, output_format, preset, realtime, wall_seconds,
+               threads=0, concurrency=1, host=None):
+        """Append one finished run; realtime is media seconds per wall second."""
+        if not duration or not realtime or realtime <= 0:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), host or host_name(), input_codec, duration, output_format, preset,
+                 threads, concurrency, realtime, wall_seconds)
+            )
+            self._since_compact += 1
+        if self._since_compact >= COMPACT_EVERY:
+            self.compact()
+
+    def compact(self, keep_days=KEEP_RAW_DAYS):
+        """Fold raw runs older than keep_days into rollup; returns how many were folded."""
+        cutoff = time.time() - keep_days * 86400
+        with self._lock, self._db:
+            self._db.execute('''
+                INSERT INTO rollup
+                SELECT host, input_codec, output_format, preset, threads, concurrency,
+                       COUNT(*), SUM(duration), SUM(duration / realtime)
+                FROM runs WHERE finished < ?
+                GROUP BY host, input_codec, output_format, preset, threads, concurrency
+                ON CONFLICT (host, input_codec, output_format, preset, threads, concurrency) DO UPDATE SET
+                    runs = runs + excluded.runs,
+                    media_seconds = media_seconds + excluded.media_seconds,
+                    encode_seconds = encode_seconds + excluded.encode_seconds
+            ''', (cutoff,))
+            folded = self._db.execute('DELETE FROM runs WHERE finished < ?', (cutoff,)).rowcount
+            self._since_compact = 0
+        return folded
+
+    def realtime_factors(self, host=None):
+        """{(output format, preset, input codec): (runs, realtime factor)} for host."""
+        with self._lock:
+            rows = self._db.execute(f'''
+                SELECT output_format, preset, input_codec, SUM(runs), SUM(media_seconds) / SUM(encode_seconds)
+                FROM ({_BUCKETS}) WHERE host = ?
+                GROUP BY output_format, preset, input_codec
+            ''', (host or host_name(),)).fetchall()
+        return {(fmt, preset, codec): (runs, factor) for fmt, preset, codec, runs, factor in rows}
+
+    def report(self, host=None, by='preset'):
+        """Averages per output format and preset (by='preset'), input codec or concurrency.
+
+        Returns dicts sorted by host then throughput, fastest first.
+        """
+        column = {'preset': 'preset', 'codec': 'input_codec', 'concurrency': 'concurrency'}[by]
+        where, params = ('WHERE host = ?', (host,)) if host else ('', ())
+        with self._lock:
+            rows = self._db.execute(f'''
+                SELECT host, output_format, {column}, SUM(runs), SUM(media_seconds), SUM(media_seconds) / SUM(encode_seconds)
+                FROM ({_BUCKETS}) {where}
+                GROUP BY host, output_format, {column}
+                ORDER BY host, 6 DESC
+            ''', params).fetchall()
+        return [{'host': h, 'format': fmt, by: value, 'runs': runs, 'media_seconds': media, 'realtime': factor}
+                for h, fmt, value, runs, media, factor in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
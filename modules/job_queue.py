@@ -0,0 +1,210 @@
+# modules/job_queue.py
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+POLICY_FIFO = 'FIFO'
+POLICY_SJF = 'Shortest First'
+POLICY_PRIORITY = 'Priority'
+POLICY_DEADLINE = 'Deadline'
+POLICIES = [POLICY_FIFO, POLICY_SJF, POLICY_PRIORITY, POLICY_DEADLINE]
+
+SOURCE_MANUAL = 'manual'
+SOURCE_WATCH = 'watch'
+SOURCE_API = 'api'
+
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+FINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+# Default priority per job source; higher runs first under POLICY_PRIORITY.
+# Manually added files belong to someone waiting at the screen.
+SOURCE_PRIORITY = {SOURCE_MANUAL: 10, SOURCE_API: 5, SOURCE_WATCH: 0}
+
+_INF = float('inf')
+
+
+class Job:
+    def __init__(self, input_file, index, settings=None, source=SOURCE_MANUAL, priority=None, deadline=None, duration=None,
+                 inputs=None, start=None, end=None, accurate_cut=False, split=None, track=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.input_file = input_file
+        # Merge jobs join several inputs, in order, into one output; input_file is the first of them
+        self.inputs = list(inputs) if inputs else None
+        # Trim: only start..end seconds of the input (either may be None); accurate_cut re-encodes
+        # video that would otherwise be copied from the keyframe before start
+        self.start = start
+        self.end = end
+        self.accurate_cut = accurate_cut
+        # Split jobs (silence.split_options()) only find the gaps; each track then runs as a trimmed job
+        self.split = split
+        # Tracks of a split keep the parent's index, so they queue in its place; track (from 1) names their output
+        self.track = track
+        self.settings = settings
+        self.index = index
+        self.source = source
+        self.priority = SOURCE_PRIORITY.get(source, 0) if priority is None else priority
+        self.deadline = deadline
+        self.duration = duration
+        self.submitted = time.time()
+        # Manual reordering wins over the policy: bump() raises it, sink() lowers it
+        self.boost = 0
+        self._version = 0
+        # Runtime status, filled in by the engine
+        self.state = STATE_QUEUED
+        self.progress = 0
+        self.position = 0.0
+        self.speed = None
+        self.estimated_size = None
+        self.message = ''
+        self.output_file = None
+        # Quality 'Target' search result: {flag: value} laid over the output args
+        self.tuning = None
+
+    def reset(self):
+        """Clear the runtime status left by an earlier batch, so the job runs again."""
+        self.state = STATE_QUEUED
+        self.progress = 0
+        self.position = 0.0
+        self.speed = None
+        self.message = ''
+        self.output_file = None
+        # Both depend on this batch's format and quality
+        self.estimated_size = None
+        self.tuning = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'input': self.input_file,
+            'inputs': self.inputs,
+            'start': self.start,
+            'end': self.end,
+            'split': self.split,
+            'track': self.track,
+            'source': self.source,
+            'priority': self.priority,
+            'deadline': self.deadline,
+            'duration': self.duration,
+            'state': self.state,
+            'progress': self.progress,
+            'message': self.message,
+            'output': self.output_file,
+            'estimated_size': self.estimated_size,
+            'tuning': self.tuning,
+            'settings': self.settings.to_dict() if self.settings else None,
+        }
+
+
+class JobQueue:
+    """Thread-safe pending-job queue ordered by a selectable policy.
+
+    Jobs live in a heap keyed by (boost, policy key). Changing a job's
+    ordering pushes a fresh entry and bumps its version; stale entries are
+    skipped on pop, so reordering a running batch is O(log n).
+    """
+
+    def __init__(self, policy=POLICY_FIFO):
+        self._policy = policy
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._boost_hi = 0
+        self._boost_lo = 0
+        self._lock = threading.Condition()
+
+    def _key(self, job):
+        if self._policy == POLICY_SJF:
+            key = (job.duration if job.duration is not None else _INF, job.index)
+        elif self._policy == POLICY_PRIORITY:
+            key = (-job.priority, job.index)
+        elif self._policy == POLICY_DEADLINE:
+            # Earliest deadline first; ties (and no-deadline jobs) fall back to SJF
+            key = (job.deadline if job.deadline is not None else _INF,
+                   job.duration if job.duration is not None else _INF, job.index)
+        else:
+            key = (job.index,)
+        return (-job.boost,) + key
+
+    def _push(self, job):
+        job._version += 1
+        heapq.heappush(self._heap, (self._key(job), next(self._seq), job._version, job))
+
+    @property
+    def policy(self):
+        return self._policy
+
+    def set_policy(self, policy):
+        with self._lock:
+            self._policy = policy
+            self._heap = []
+            for job in self._pending.values():
+                self._push(job)
+
+    def add(self, job):
+        with self._lock:
+            self._pending[id(job)] = job
+            self._push(job)
+            self._lock.notify()
+        return job
+
+    def update(self, job):
+        """Re-sort job after its duration, priority or deadline changed."""
+        with self._lock:
+            if id(job) in self._pending:
+                self._push(job)
+
+    def bump(self, job):
+        """Move job ahead of everything currently pending."""
+        with self._lock:
+            if id(job) in self._pending:
+                self._boost_hi += 1
+                job.boost = self._boost_hi
+                self._push(job)
+
+    def sink(self, job):
+        """Move job behind everything currently pending."""
+        with self._lock:
+            if id(job) in self._pending:
+                self._boost_lo -= 1
+                job.boost = self._boost_lo
+                self._push(job)
+
+    def remove(self, job):
+        with self._lock:
+            return self._pending.pop(id(job), None) is not None
+
+    def pop_next(self, timeout=0):
+        """Return the next job by policy, or None if nothing arrives in timeout."""
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            while True:
+                while self._heap:
+                    _, _, version, job = heapq.heappop(self._heap)
+                    if version == job._version and self._pending.pop(id(job), None) is not None:
+                        return job
+                if deadline is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+
+    def pending(self):
+        """Snapshot of pending jobs in the order they would run."""
+        with self._lock:
+            return sorted(self._pending.values(), key=self._key)
+
+    def pending_unordered(self):
+        """Cheap snapshot of pending jobs when the order doesn't matter."""
+        with self._lock:
+            return list(self._pending.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
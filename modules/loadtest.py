@@ -0,0 +1,171 @@
+# modules/loadtest.py
+import asyncio
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from modules.command_builder import ConversionSettings
+from modules.engine import ConversionEngine, EngineListener
+from modules.fakeff import write_launcher
+from modules.history import HistoryStore
+from modules.job_queue import STATE_FAILED, Job
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Fast jobs so scheduling, not encoding, dominates: 20-40 media seconds at 400x with frequent progress lines
+LOAD_PROFILE = {'duration': [20, 40], 'speed': 400.0, 'interval': 0.02}
+# Jobs cycle through this many input files (probes are cached per file, as in a real batch of repeats)
+INPUT_FILES = 20
+LOOP_PROBE_INTERVAL = 0.05
+# Failure messages kept for the report
+FAILURE_SAMPLES = 5
+
+
+class _Recorder(EngineListener):
+    """Counts engine callbacks and times each job; runs on the loop thread only."""
+
+    def __init__(self, engine_ref, cancel_every=0):
+        self.engine_ref = engine_ref
+        self.cancel_every = cancel_every
+        self.counts = collections.Counter()
+        self.states = collections.Counter()
+        self.snapshot = None
+        self.busy = 0.0
+        self.failures = []
+        self._started = {}
+        self._last_line = {}
+
+    def job_started(self, job):
+        self.counts['job_started'] += 1
+        self._started[job.id] = time.monotonic()
+        if self.cancel_every and self.counts['job_started'] % self.cancel_every == 0:
+            self.engine_ref().cancel(job.id)
+
+    def job_log(self, job, line):
+        self.counts['job_log'] += 1
+        if job is not None:
+            self._last_line[job.id] = line
+
+    def progress(self, snapshot):
+        self.counts['progress'] += 1
+        self.snapshot = snapshot
+
+    def job_finished(self, job):
+        self.counts['job_finished'] += 1
+        self.states[job.state] += 1
+        last_line = self._last_line.pop(job.id, '')
+        if job.state == STATE_FAILED and len(self.failures) < FAILURE_SAMPLES:
+            self.failures.append(f'{job.message} ({last_line})' if last_line else job.message)
+        started = self._started.pop(job.id, None)
+        if started is not None:
+            self.busy += time.monotonic() - started
+
+
+def _peak_rss():
+    # ru_maxrss is KiB on Linux, bytes on macOS; unavailable on Windows
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_load_test(jobs=10000, workers=16, profile=None, fail_rate=0.0, cancel_every=0, trace_memory=False,
+                  keep=False, on_progress=None):
+    """Drive a ConversionEngine through `jobs` synthetic jobs against the stand-in ffmpeg.
+
+    Everything lives in a temporary directory (removed unless keep=True)
+    and the run history goes to an in-memory database. fail_rate makes that
+    share of the input files fail half-way; cancel_every cancels every n-th
+    job right after it starts. on_progress(snapshot) is called about once a
+    second. Returns a dict of metrics.
+    """
+    work_dir = tempfile.mkdtemp(prefix='ffx-load-')
+    try:
+        script = dict(LOAD_PROFILE, **(profile or {}))
+        failing = round(INPUT_FILES * fail_rate)
+        script['rules'] = [{'match': 'fail_', 'fail_at': 0.5, 'exit_code': 1}] + list(script.get('rules', []))
+        profile_path = os.path.join(work_dir, 'profile.json')
+        with open(profile_path, 'w', encoding='utf-8') as f:
+            json.dump(script, f)
+        ffmpeg_path = write_launcher(os.path.join(work_dir, 'bin'), profile_path)
+        inputs = []
+        os.makedirs(os.path.join(work_dir, 'in'))
+        for n in range(INPUT_FILES):
+            path = os.path.join(work_dir, 'in', f"{'fail' if n < failing else 'input'}_{n:02d}.wav")
+            open(path, 'wb').close()
+            inputs.append(path)
+        settings = ConversionSettings(os.path.join(work_dir, 'out'), 'mp3', custom_name='load')
+        os.makedirs(settings.output_folder)
+
+        engine = None
+        recorder = _Recorder(lambda: engine, cancel_every)
+        engine = ConversionEngine(ffmpeg_path, workers=workers, listener=recorder, history=HistoryStore(':memory:'))
+        if trace_memory:
+            tracemalloc.start()
+
+        cpu = time.process_time()
+        started = time.monotonic()
+        for i in range(jobs):
+            engine.submit(Job(inputs[i % INPUT_FILES], i, settings=settings))
+        submitted = time.monotonic()
+
+        lags = []
+        probing = [True]
+
+        async def probe_loop():
+            # How late the supervisor's loop wakes up: time it spends on callbacks instead of reading children
+            loop = asyncio.get_event_loop()
+            while probing[0]:
+                before = loop.time()
+                await asyncio.sleep(LOOP_PROBE_INTERVAL)
+                lags.append(loop.time() - before - LOOP_PROBE_INTERVAL)
+
+        engine.start(drain=True)
+        prober = engine.supervisor.submit(probe_loop())
+        while not engine.wait(1.0):
+            if on_progress and recorder.snapshot:
+                on_progress(recorder.snapshot)
+        wall = time.monotonic() - started
+        cpu = time.process_time() - cpu
+        probing[0] = False
+        prober.result()
+        traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        retained = len(engine.list_jobs())
+        engine.supervisor.stop()
+
+        run_seconds = wall - (submitted - started)
+        return {
+            'jobs': jobs,
+            'workers': workers,
+            'states': dict(recorder.states),
+            'failures': recorder.failures,
+            'submit_seconds': submitted - started,
+            'wall_seconds': wall,
+            'jobs_per_second': jobs / wall if wall else None,
+            'mean_job_seconds': recorder.busy / max(1, recorder.counts['job_started']),
+            # Share of worker-seconds a job held its slot; the rest is dispatch, probing and admission
+            'slot_utilisation': recorder.busy / (run_seconds * workers) if run_seconds else None,
+            'idle_ms_per_job': max(0.0, run_seconds * workers - recorder.busy) / jobs * 1000 if jobs else None,
+            'orchestrator_cpu_seconds': cpu,
+            'cpu_ms_per_job': cpu / jobs * 1000 if jobs else None,
+            'callbacks': dict(recorder.counts),
+            'callbacks_per_second': sum(recorder.counts.values()) / wall if wall else None,
+            'loop_lag_ms': {'mean': sum(lags) / len(lags) * 1000 if lags else None,
+                            'max': max(lags) * 1000 if lags else None},
+            'peak_rss_bytes': _peak_rss(),
+            'traced_peak_bytes': traced,
+            'retained_jobs': retained,
+            'work_dir': work_dir if keep else None,
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,49 @@
+# modules/merge.py
+import os
+
+# Stream parameters that must match for the concat demuxer to join files without re-encoding
+_AUDIO_KEYS = ('codec_name', 'sample_rate', 'channels', 'sample_fmt')
+_VIDEO_KEYS = ('codec_name', 'width', 'height', 'pix_fmt', 'profile', 'r_frame_rate')
+
+
+def stream_signature(info):
+    """Per-stream parameters of a probed file, in stream order (cover art excluded)."""
+    sig = []
+    for s in info.get('streams', []):
+        kind = s.get('codec_type')
+        if kind == 'audio':
+            sig.append(('audio',) + tuple(s.get(k) for k in _AUDIO_KEYS))
+        elif kind == 'video' and not s.get('disposition', {}).get('attached_pic'):
+            sig.append(('video',) + tuple(s.get(k) for k in _VIDEO_KEYS))
+    return tuple(sig)
+
+
+def copy_mismatch(inputs, infos, output_format):
+    """Why the inputs can't be stream-copied into output_format, or None if they can."""
+    if not all(infos):
+        return 'not every input could be probed'
+    first = stream_signature(infos[0])
+    if not first:
+        return 'no audio or video streams'
+    for path, info in zip(inputs[1:], infos[1:]):
+        if stream_signature(info) != first:
+            return f'{os.path.basename(path)} has different stream parameters'
+    ext = '.' + output_format.lower()
+    if any(os.path.splitext(p)[1].lower() != ext for p in inputs):
+        return f'inputs are not all {ext} files'
+    return None
+
+
+def concat_list_path(output_file):
+    # Hidden file next to the output, so it lands on a volume the job can write to
+    folder, name = os.path.split(output_file)
+    return os.path.join(folder, f'.{name}.ffconcat')
+
+
+def write_concat_list(path, inputs):
+    """Write an ffconcat list for the concat demuxer."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('ffconcat version 1.0\n')
+        for p in inputs:
+            escaped = os.path.abspath(p).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
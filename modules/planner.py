@@ -0,0 +1,207 @@
+# modules/planner.py
+import heapq
+import os
+from modules.diskspace import estimate_output_size
+from modules.history import HistoryStore, host_name
+from modules.quality import QUALITY_TARGET, search_space
+from modules.silence import split_job
+from modules.utils import probe_job_duration, probe_media
+from modules.video import SPEED_TIERS, describe, guess_realtime, source_video_codec
+
+# Uncalibrated guesses: media seconds encoded per wall second, by output format
+DEFAULT_REALTIME = {'mp3': 60.0, 'aac': 80.0, 'm4a': 80.0, 'flac': 150.0, 'wav': 300.0, 'ogg': 50.0}
+DEFAULT_VIDEO_REALTIME = 100.0
+# Filters that dominate encode time, and by how much they slow it down
+SLOW_FILTERS = {'afftdn': 4.0, 'loudnorm': 2.0}
+
+DECISION_SKIP = 'skip'
+DECISION_COPY = 'copy'
+DECISION_REENCODE = 're-encode'
+
+
+def input_codec(info):
+    for s in info.get('streams', []):
+        if s.get('codec_type') == 'audio':
+            return s.get('codec_name', 'unknown')
+    return 'none'
+
+
+def preset_label(settings, cmd=None):
+    """Quality plus enhancement ('High + Rock EQ'), or the delivery preset's name.
+
+    Video encodes add their profile and speed tier ('High / H.264 fast').
+    """
+    if settings.delivery_preset:
+        label = settings.delivery_preset
+    elif settings.enhancement_mode in ('', 'None'):
+        label = settings.quality
+    else:
+        label = f'{settings.quality} + {settings.enhancement_mode}'
+    video = describe(cmd) if cmd else None
+    return f'{label} / {video}' if video else label
+
+
+def cost_key(builder, job, info, cmd):
+    """(output format, preset, input codec): the cost model's calibration bucket."""
+    return builder.output_format(job.settings).lower(), preset_label(job.settings, cmd), input_codec(info)
+
+
+class CostModel:
+    """Realtime factors per (format, preset, input codec) on this host.
+
+    Calibrated buckets come from the run history (see HistoryStore);
+    buckets with no runs fall back to per-format defaults scaled down for
+    slow filters.
+    """
+
+    def __init__(self, history=None, host=None):
+        self.history = history or HistoryStore.default()
+        self.host = host or host_name()
+        self._factors = None
+
+    def refresh(self):
+        self._factors = None
+
+    def realtime_factor(self, key, cmd):
+        """Return (factor, calibrated) for a bucket and its built command."""
+        if self._factors is None:
+            self._factors = self.history.realtime_factors(self.host)
+        if key in self._factors:
+            return self._factors[key][1], True
+        factor = guess_realtime(cmd) or DEFAULT_REALTIME.get(key[0], DEFAULT_VIDEO_REALTIME)
+        filters = cmd[cmd.index('-af') + 1] if '-af' in cmd else ''
+        for name, slowdown in SLOW_FILTERS.items():
+            if name in filters:
+                factor /= slowdown
+        return factor, False
+
+
+class PlanEntry:
+    def __init__(self, job, decision, reason='', cmd=None, output_file=None, size=None, seconds=None, calibrated=False):
+        self.job = job
+        self.decision = decision
+        self.reason = reason
+        self.cmd = cmd
+        self.output_file = output_file
+        self.size = size
+        self.seconds = seconds
+        self.calibrated = calibrated
+
+    def to_dict(self):
+        return {
+            'input': self.job.input_file, 'output': self.output_file, 'decision': self.decision,
+            'reason': self.reason, 'command': self.cmd, 'duration': self.job.duration,
+            'estimated_size': self.size, 'estimated_seconds': self.seconds, 'calibrated': self.calibrated,
+        }
+
+
+def _decide(cmd, info):
+    """Classify a command as stream copy or re-encode, with a one-line reason."""
+    if 'streams' not in info:
+        # No ffprobe (only the duration is known) or no probe at all: the engine still converts the file
+        copies = '-c' in cmd and cmd[cmd.index('-c') + 1] == 'copy'
+        return (DECISION_COPY if copies else DECISION_REENCODE), 'streams unknown (no ffprobe)'
+    streams = {s.get('codec_type') for s in info['streams']}
+    if 'audio' not in streams and 'video' not in streams:
+        return DECISION_SKIP, 'no audio or video stream'
+    if '-vn' in cmd and 'audio' not in streams:
+        return DECISION_SKIP, 'no audio stream for an audio-only output'
+    parts = []
+    if 'video' in streams and '-vn' not in cmd:
+        vcodec = cmd[cmd.index('-c:v') + 1] if '-c:v' in cmd else 'copy' if '-c' in cmd else 'default'
+        parts.append('video copy' if vcodec == 'copy' else f'video {source_video_codec(info)} -> {vcodec}')
+    acodec = cmd[cmd.index('-c:a') + 1] if '-c:a' in cmd else 'copy' if '-c' in cmd else 'default'
+    if 'audio' in streams:
+        parts.append('audio copy' if acodec == 'copy' else f'audio {acodec}')
+    encodes = any(not p.endswith(' copy') for p in parts)
+    return (DECISION_REENCODE if encodes else DECISION_COPY), ', '.join(parts)
+
+
+class Planner:
+    """Dry run: what the engine would do with a list of jobs, and how long it would take."""
+
+    def __init__(self, builder, cost_model=None):
+        self.builder = builder
+        self.cost_model = cost_model or CostModel()
+
+    def plan_job(self, job):
+        missing = [p for p in job.inputs or [job.input_file] if not os.path.isfile(p)]
+        if missing:
+            return PlanEntry(job, DECISION_SKIP, f'input not found: {missing[0]}')
+        info = probe_media(self.builder.ffmpeg_path, job.input_file)
+        if job.duration is None:
+            job.duration = probe_job_duration(self.builder.ffmpeg_path, job)
+        try:
+            cmd, output_file = self.builder.build(job)
+        except ValueError as e:
+            return PlanEntry(job, DECISION_SKIP, str(e))
+        decision, reason = _decide(cmd, info)
+        if job.inputs:
+            how = 'concat demuxer' if decision == DECISION_COPY else 'concat filter graph'
+            reason = f'merge {len(job.inputs)} inputs via {how}: {reason}'
+        elif self.builder.is_ladder(job.settings) and decision != DECISION_SKIP:
+            renditions = max(sum(a.startswith('-maxrate:v:') for a in cmd), sum(a.startswith('-b:a:') for a in cmd))
+            reason = f'{job.settings.output_format.upper()} ladder, {renditions} renditions from one decode: {reason}'
+        if decision == DECISION_SKIP:
+            return PlanEntry(job, decision, reason, cmd, output_file)
+        if (job.settings.quality == QUALITY_TARGET and not job.settings.delivery_preset and not job.inputs
+                and search_space(cmd)):
+            reason += f' ({QUALITY_TARGET.lower()} quality: bitrate/CRF searched at run time, estimated at High)'
+        size = estimate_output_size(self.builder, job, info)
+        factor, calibrated = self.cost_model.realtime_factor(cost_key(self.builder, job, info, cmd), cmd)
+        seconds = job.duration / factor if job.duration and factor else None
+        return PlanEntry(job, decision, reason, cmd, output_file, size, seconds, calibrated)
+
+    def plan_split(self, job):
+        # The silencedetect pass runs here (once; it is cached) so the plan lists the real tracks
+        if not os.path.isfile(job.input_file):
+            return [PlanEntry(job, DECISION_SKIP, f'input not found: {job.input_file}')]
+        if job.duration is None:
+            job.duration = probe_job_duration(self.builder.ffmpeg_path, job)
+        try:
+            tracks = split_job(self.builder.ffmpeg_path, job)
+        except OSError as e:
+            return [PlanEntry(job, DECISION_SKIP, str(e))]
+        entries = [self.plan_job(track) for track in tracks]
+        for e in entries:
+            e.reason = f'track {e.job.track}/{len(tracks)}: {e.reason}'
+        return entries
+
+    def plan(self, jobs, workers=1):
+        """Return (entries, summary) for jobs in run order; split jobs show up as their tracks."""
+        entries = []
+        for job in jobs:
+            entries += self.plan_split(job) if job.split is not None else [self.plan_job(job)]
+        # Greedy list scheduling onto `workers` slots, in queue order
+        slots = [0.0] * max(1, workers)
+        for e in entries:
+            if e.seconds:
+                heapq.heappush(slots, heapq.heappop(slots) + e.seconds)
+        summary = {
+            'jobs': len(entries),
+            'skipped': sum(1 for e in entries if e.decision == DECISION_SKIP),
+            'copy': sum(1 for e in entries if e.decision == DECISION_COPY),
+            're-encode': sum(1 for e in entries if e.decision == DECISION_REENCODE),
+            'estimated_size': sum(e.size or 0 for e in entries),
+            'estimated_job_seconds': sum(e.seconds or 0 for e in entries),
+            'estimated_wall_seconds': max(slots),
+            'workers': len(slots),
+            'uncalibrated': sum(1 for e in entries if e.decision != DECISION_SKIP and not e.calibrated),
+        }
+        return entries, summary
+
+    def pick_speed(self, jobs, workers, seconds):
+        """Meet-deadline mode: set the video speed tier for jobs' settings.
+
+        Picks the slowest tier (smallest output) whose plan still finishes
+        within seconds, or the fastest tier if none does. Returns
+        (tier, summary); audio-only batches are unaffected by the choice.
+        """
+        settings = list({id(job.settings): job.settings for job in jobs}.values())
+        for tier in SPEED_TIERS:
+            for s in settings:
+                s.video_speed = tier
+            _, summary = self.plan(jobs, workers)
+            if summary['estimated_wall_seconds'] <= seconds:
+                break
+        return tier, summary
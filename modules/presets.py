@@ -0,0 +1,176 @@
+# modules/presets.py
+import json
+import os
+from modules.capabilities import get_capabilities
+from modules.utils import AUDIO_EXTS
+
+TOML_AVAILABLE = True
+try:
+    import tomllib
+except ImportError:
+    TOML_AVAILABLE = False
+
+# Bundled presets ship next to the app; user presets live in the home folder
+BUNDLED_PRESET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'presets')
+USER_PRESET_DIR = os.path.join(os.path.expanduser('~'), '.ffxpro', 'presets')
+
+_FIELDS = {
+    'name': str, 'description': str, 'format': str, 'codec': str, 'bitrate': str, 'vbr': (int, float),
+    'sample_rate': int, 'channels': int, 'filters': list, 'container_options': list, 'video': str,
+}
+_VIDEO_MODES = ('copy', 'none')
+
+
+class PresetError(ValueError):
+    pass
+
+
+class DeliveryPreset:
+    """A validated preset file entry, compiled once into ffmpeg output args."""
+
+    def __init__(self, spec, source=None):
+        self.source = source
+        self.name = spec['name']
+        self.description = spec.get('description', '')
+        self.format = spec['format'].lower().lstrip('.')
+        self.codec = spec['codec']
+        self.bitrate = spec.get('bitrate')
+        self.vbr = spec.get('vbr')
+        self.sample_rate = spec.get('sample_rate')
+        self.channels = spec.get('channels')
+        self.filters = list(spec.get('filters', []))
+        self.container_options = [str(o) for o in spec.get('container_options', [])]
+        self.video = spec.get('video', 'copy')
+        if '.' + self.format in AUDIO_EXTS:
+            self.video = 'none'
+        self.template = tuple(self._compile())
+
+    def _compile(self):
+        args = ['-vn'] if self.video == 'none' else ['-c:v', 'copy']
+        args += ['-c:a', self.codec]
+        if self.bitrate:
+            args += ['-b:a', self.bitrate]
+        elif self.vbr is not None:
+            args += ['-q:a', str(self.vbr)]
+        if self.sample_rate:
+            args += ['-ar', str(self.sample_rate)]
+        if self.channels:
+            args += ['-ac', str(self.channels)]
+        if self.filters:
+            args += ['-af', ','.join(self.filters)]
+        return args + self.container_options
+
+    def filter_names(self):
+        return [f.split('=', 1)[0].strip() for f in self.filters]
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'description': self.description, 'format': self.format, 'codec': self.codec,
+            'bitrate': self.bitrate, 'vbr': self.vbr, 'sample_rate': self.sample_rate, 'channels': self.channels,
+            'filters': self.filters, 'container_options': self.container_options, 'video': self.video,
+            'source': self.source, 'args': list(self.template),
+        }
+
+
+def _check_spec(spec):
+    if not isinstance(spec, dict):
+        raise PresetError('preset must be an object')
+    for key in ('name', 'format', 'codec'):
+        if not spec.get(key):
+            raise PresetError(f"missing '{key}'")
+    for key, value in spec.items():
+        if key not in _FIELDS:
+            raise PresetError(f"unknown field '{key}'")
+        if not isinstance(value, _FIELDS[key]) or isinstance(value, bool):
+            raise PresetError(f"'{key}' has the wrong type")
+    if spec.get('bitrate') and spec.get('vbr') is not None:
+        raise PresetError("use either 'bitrate' or 'vbr', not both")
+    if spec.get('video', 'copy') not in _VIDEO_MODES:
+        raise PresetError(f"'video' must be one of {', '.join(_VIDEO_MODES)}")
+
+
+def _read_specs(path):
+    if path.endswith('.toml'):
+        if not TOML_AVAILABLE:
+            raise PresetError('TOML presets need Python 3.11+ (tomllib)')
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    # A file holds one preset or {"presets": [...]}
+    if isinstance(data, dict) and 'presets' in data:
+        return data['presets']
+    return [data]
+
+
+class PresetLibrary:
+    """Delivery presets loaded from JSON/TOML files, keyed by name.
+
+    Files are validated and compiled when loaded, so applying a preset to a
+    job is just copying its argument template. Entries that fail validation
+    are kept in `errors` and never offered.
+    """
+
+    _default = None
+
+    def __init__(self, folders=None):
+        self.folders = folders if folders is not None else [BUNDLED_PRESET_DIR, USER_PRESET_DIR]
+        self.presets = {}
+        self.errors = []
+        self.validated = False
+        self.load()
+
+    @classmethod
+    def default(cls, ffmpeg_path=None):
+        """Process-wide library, validated against ffmpeg_path the first time one is given."""
+        if cls._default is None:
+            cls._default = cls()
+        if ffmpeg_path and not cls._default.validated:
+            cls._default.validate(ffmpeg_path)
+        return cls._default
+
+    def load(self):
+        self.presets = {}
+        self.errors = []
+        for folder in self.folders:
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if not name.endswith(('.json', '.toml')):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    specs = _read_specs(path)
+                except (OSError, ValueError) as e:
+                    self.errors.append((path, None, str(e)))
+                    continue
+                for spec in specs:
+                    try:
+                        _check_spec(spec)
+                        preset = DeliveryPreset(spec, source=path)
+                    except PresetError as e:
+                        self.errors.append((path, spec.get('name') if isinstance(spec, dict) else None, str(e)))
+                        continue
+                    # Later folders (user presets) override bundled ones of the same name
+                    self.presets[preset.name] = preset
+
+    def validate(self, ffmpeg_path):
+        """Drop presets whose codec or filters this ffmpeg build lacks (see capabilities.py)."""
+        self.validate_with(get_capabilities(ffmpeg_path))
+
+    def validate_with(self, caps):
+        if caps is None:
+            return
+        self.validated = True
+        for name, preset in list(self.presets.items()):
+            missing = caps.missing([preset.codec], preset.filter_names() if caps.filters else [])
+            if missing:
+                self.errors.append((preset.source, name, 'unsupported by ffmpeg: ' + ', '.join(missing)))
+                del self.presets[name]
+
+    def get(self, name):
+        return self.presets.get(name)
+
+    def names(self):
+        return sorted(self.presets)
@@ -0,0 +1,94 @@
+# modules/preview.py
+import hashlib
+import os
+import subprocess
+import threading
+
+PREVIEW_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ffxpro', 'previews')
+PREVIEW_SECONDS = 20
+# Oldest-used renders are deleted once the cache grows past this
+PREVIEW_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def preview_cmd(ffmpeg_path, path, offset, seconds, af, output):
+    # -ss before -i seeks the input, so only the excerpt is decoded however long the file is
+    cmd = [ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-y', '-ss', f'{offset:.3f}', '-t', f'{seconds:.3f}',
+           '-i', path, '-vn']
+    if af:
+        cmd += ['-af', af]
+    return cmd + ['-ac', '2', '-c:a', 'pcm_s16le', '-f', 'wav', output]
+
+
+class PreviewCache:
+    """Short WAV renders of an excerpt, with and without a filter chain, for A/B listening.
+
+    Renders are keyed by input (path, size, mtime), offset, length and
+    filter chain, so picking a preset already heard costs nothing. Files
+    are touched on every hit and the least recently used go first once the
+    cache passes max_bytes.
+    """
+
+    def __init__(self, ffmpeg_path, cache_dir=PREVIEW_CACHE_DIR, max_bytes=PREVIEW_CACHE_BYTES):
+        self.ffmpeg_path = ffmpeg_path
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _target(self, path, offset, seconds, af):
+        st = os.stat(path)
+        key = f'{os.path.realpath(path)}|{st.st_size}|{st.st_mtime}|{offset:.3f}|{seconds:.3f}|{af or ""}'
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.wav')
+
+    def render(self, path, offset=0.0, seconds=PREVIEW_SECONDS, af=None):
+        """Path of the rendered excerpt (the original when af is None). Raises OSError if ffmpeg fails."""
+        target = self._target(path, offset, seconds, af)
+        with self._lock:
+            if os.path.exists(target):
+                os.utime(target)
+                return target
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial = f'{target}.{threading.get_ident()}.tmp'
+        try:
+            result = subprocess.run(preview_cmd(self.ffmpeg_path, path, offset, seconds, af, partial),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, timeout=120)
+        except subprocess.TimeoutExpired as e:
+            result = subprocess.CompletedProcess(e.cmd, -1, stderr=f'timed out after {e.timeout:g} s')
+        if result.returncode != 0 or not os.path.exists(partial):
+            if os.path.exists(partial):
+                os.remove(partial)
+            error = (result.stderr or '').strip().splitlines()
+            raise OSError(f"ffmpeg could not render the preview: {error[-1] if error else f'exit code {result.returncode}'}")
+        os.replace(partial, target)
+        self._evict(keep=target)
+        return target
+
+    def render_pair(self, path, offset=0.0, seconds=PREVIEW_SECONDS, af=None):
+        """(original, processed) excerpts of the same span."""
+        return self.render(path, offset, seconds), self.render(path, offset, seconds, af)
+
+    def _evict(self, keep):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.wav'):
+                    full = os.path.join(self.cache_dir, name)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, full))
+            total = sum(size for _, size, _ in entries)
+            for _, size, full in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if full == keep:
+                    continue
+                try:
+                    os.remove(full)
+                    total -= size
+                except OSError:
+                    pass
+
+
+def play_cmd(ffplay_path, path):
+    return [ffplay_path, '-nodisp', '-autoexit', '-loglevel', 'quiet', path]
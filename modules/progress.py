@@ -0,0 +1,79 @@
+# modules/progress.py
+import time
+
+
+class ProgressTracker:
+    """Duration-weighted progress and ETA for the current batch.
+
+    Every job weighs its media duration (jobs not probed yet weigh the
+    average of the known ones), so a 3-hour file counts for more than a
+    3-minute one. The ETA divides the remaining media seconds by the media
+    seconds per wall second observed so far, which already reflects how many
+    jobs run in parallel. A batch ends when the engine goes idle.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = None
+        self.finished_count = 0
+        self.finished_secs = 0.0
+        self.finished_known = 0
+        self.finished_known_secs = 0.0
+        self._last = None
+
+    def job_started(self, job):
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def job_finished(self, job):
+        if self.started is None:
+            # Cancelled before it ever ran; still part of the batch count
+            self.started = time.monotonic()
+        self.finished_count += 1
+        if job.duration:
+            self.finished_known += 1
+            self.finished_known_secs += job.duration
+        self.finished_secs += job.duration or 0.0
+
+    def snapshot(self, running, pending, force=False):
+        """Return the batch state, or None if nothing changed since last call."""
+        known = self.finished_known
+        known_secs = self.finished_known_secs
+        unknown = self.finished_count - known
+        for job in running + pending:
+            if job.duration:
+                known += 1
+                known_secs += job.duration
+            else:
+                unknown += 1
+        default_weight = known_secs / known if known else 1.0
+
+        total = known_secs + unknown * default_weight
+        processed = self.finished_secs + (self.finished_count - self.finished_known) * default_weight
+        jobs = {}
+        for job in running:
+            weight = job.duration or default_weight
+            processed += min(weight, job.position * weight / job.duration if job.duration else 0.0)
+            jobs[job.id] = {'input': job.input_file, 'state': job.state, 'progress': job.progress}
+
+        percent = 100.0 * processed / total if total else 0.0
+        elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+        rate = processed / elapsed if elapsed > 1 else 0.0
+        eta = (total - processed) / rate if rate > 0 else None
+
+        key = (round(percent, 1), self.finished_count, len(running), len(pending),
+               tuple(sorted((i, j['progress']) for i, j in jobs.items())))
+        if key == self._last and not force:
+            return None
+        if not force:
+            self._last = key
+        return {
+            'jobs': jobs,
+            'batch_progress': percent,
+            'eta': eta,
+            'speed': rate,
+            'done': self.finished_count,
+            'total': self.finished_count + len(running) + len(pending),
+        }
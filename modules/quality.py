@@ -0,0 +1,193 @@
+# modules/quality.py
+import re
+import subprocess
+
+NUMPY_AVAILABLE = True
+try:
+    import numpy as np
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Quality setting that searches for the smallest passing encode instead of a fixed bitrate
+QUALITY_TARGET = 'Target'
+
+EXCERPT_SECONDS = 20
+# Band-segmental spectral SNR (dB) an audio candidate must reach
+AUDIO_TARGET = 20.0
+# SSIM a video candidate must reach against the source
+VIDEO_TARGET = 0.97
+
+# Candidates per encoder, smallest output first
+AUDIO_LADDER = {
+    'libmp3lame': ('96k', '128k', '160k', '192k', '256k', '320k'),
+    'aac': ('96k', '128k', '160k', '192k', '256k', '320k'),
+    'libopus': ('64k', '96k', '128k', '160k'),
+}
+CRF_LADDER = {
+    'libx264': ('30', '28', '26', '24', '22', '20', '18'),
+    'libx265': ('34', '32', '30', '28', '26', '24', '22'),
+    'libvpx-vp9': ('42', '39', '36', '33', '30', '27', '24'),
+}
+# Container for a candidate, by encoder
+CANDIDATE_EXT = {'libmp3lame': 'mp3', 'aac': 'm4a', 'libopus': 'opus',
+                 'libx264': 'mkv', 'libx265': 'mkv', 'libvpx-vp9': 'webm'}
+
+SAMPLE_RATE = 44100
+FRAME = 2048
+# About third-octave bands from 50 Hz to 20 kHz
+_BAND_EDGES = tuple(50 * 400 ** (i / 24) for i in range(25))
+MAX_LAG = 4096
+SSIM_PATTERN = re.compile(r'SSIM .*All:(\d+(?:\.\d+)?)')
+
+
+def _value(cmd, flag):
+    return cmd[cmd.index(flag) + 1] if flag in cmd else None
+
+
+def search_space(cmd):
+    """{'-b:a': (encoder, ladder), '-crf': (encoder, ladder)} for what cmd encodes with a searchable setting."""
+    space = {}
+    if '-filter_complex' in cmd:
+        # Ladders and merge graphs encode several streams with one setting; they keep their defaults
+        return space
+    audio = _value(cmd, '-c:a')
+    if audio in AUDIO_LADDER and '-b:a' in cmd and NUMPY_AVAILABLE:
+        space['-b:a'] = (audio, AUDIO_LADDER[audio])
+    video = _value(cmd, '-c:v')
+    if video in CRF_LADDER and '-crf' in cmd:
+        space['-crf'] = (video, CRF_LADDER[video])
+    return space
+
+
+def apply_tuning(args, tuning):
+    """args with the values of the flags in tuning replaced."""
+    args = list(args)
+    for flag, value in (tuning or {}).items():
+        if flag in args:
+            args[args.index(flag) + 1] = value
+    return args
+
+
+def excerpt_span(duration, start=None, end=None, seconds=EXCERPT_SECONDS):
+    """(offset, length) of the excerpt to test, about a third into the (trimmed) span."""
+    first = start or 0.0
+    last = end if end is not None else duration
+    if last is None:
+        return first, seconds
+    length = min(seconds, max(0.0, last - first))
+    return first + max(0.0, min((last - first) * 0.3, last - first - length)), length
+
+
+def reference_cmd(ffmpeg_path, path, offset, length, af, output):
+    # The filtered excerpt as PCM: what every audio candidate encodes and is compared against
+    cmd = [ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-y', '-ss', f'{offset:.3f}', '-t', f'{length:.3f}',
+           '-i', path, '-vn']
+    if af:
+        cmd += ['-af', af]
+    return cmd + ['-c:a', 'pcm_s16le', output]
+
+
+def audio_candidate_cmd(ffmpeg_path, reference, encoder, bitrate, output):
+    return [ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-y', '-i', reference,
+            '-c:a', encoder, '-b:a', bitrate, output]
+
+
+def video_candidate_cmd(ffmpeg_path, path, offset, length, video_args, crf, output):
+    """Encode the excerpt's video with the job's own video args at one CRF."""
+    return ([ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-y', '-ss', f'{offset:.3f}', '-t', f'{length:.3f}',
+             '-i', path, '-an', '-sn', '-dn'] + apply_tuning(video_args, {'-crf': crf}) + [output])
+
+
+def ssim_cmd(ffmpeg_path, candidate, path, offset, length):
+    # Both sides restart at zero so frames pair up; the score is printed at the end of the run
+    return [ffmpeg_path, '-hide_banner', '-nostdin', '-i', candidate, '-ss', f'{offset:.3f}', '-t', f'{length:.3f}',
+            '-i', path, '-lavfi', '[0:v]setpts=PTS-STARTPTS[c];[1:v]setpts=PTS-STARTPTS[r];[c][r]ssim', '-f', 'null', '-']
+
+
+def parse_ssim(lines):
+    for line in lines:
+        m = SSIM_PATTERN.search(line)
+        if m:
+            return float(m.group(1))
+    return None
+
+
+def video_args(cmd):
+    """The -c:v ... options of cmd (up to the audio codec, filters or output)."""
+    i = cmd.index('-c:v')
+    j = i
+    while j < len(cmd) - 1 and cmd[j] not in ('-c:a', '-b:a', '-af', '-vn', '-an'):
+        j += 1
+    return cmd[i:j]
+
+
+def _decode(ffmpeg_path, path):
+    raw = subprocess.run([ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-i', path, '-ac', '2',
+                          '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return np.frombuffer(raw[:len(raw) - len(raw) % 4], dtype='<i2').reshape(-1, 2).astype(np.float32) / 32768.0
+
+
+def _lag(ref, test):
+    # Encoder delay not undone by the decoder shows up as a shift; find it on the first seconds
+    a = ref[:SAMPLE_RATE * 5].mean(axis=1)
+    b = test[:SAMPLE_RATE * 5 + MAX_LAG].mean(axis=1)
+    n = 1 << int(np.ceil(np.log2(len(a) + len(b) + 1)))
+    cc = np.fft.irfft(np.fft.rfft(b, n) * np.conj(np.fft.rfft(a, n)), n)
+    lags = np.concatenate([cc[:MAX_LAG + 1], cc[-MAX_LAG:]])
+    i = int(np.argmax(lags))
+    return i if i <= MAX_LAG else i - len(lags)
+
+
+def _magnitudes(x):
+    frames = len(x) // (FRAME // 2) - 1
+    index = np.arange(FRAME)[None, :] + np.arange(max(0, frames))[:, None] * (FRAME // 2)
+    return np.abs(np.fft.rfft(x[index] * np.hanning(FRAME).astype(np.float32), axis=-1))
+
+
+def spectral_snr(ref, test):
+    """Band-segmental spectral SNR (dB) of test against ref, two (n, 2) float arrays.
+
+    Mean over frames and bands of each band's SNR on magnitude spectra,
+    clipped to -10..40 dB. Bands too quiet to matter in a frame are skipped;
+    None if nothing was loud enough to judge. A truncated test scores -10.
+    """
+    if len(ref) < FRAME * 4:
+        return None
+    if len(test) < len(ref) * 0.9:
+        return -10.0
+    lag = _lag(ref, test)
+    if lag > 0:
+        test = test[lag:]
+    elif lag < 0:
+        ref = ref[-lag:]
+    n = min(len(ref), len(test))
+    ref_mag = np.concatenate([_magnitudes(ref[:n, 0]), _magnitudes(ref[:n, 1])])
+    test_mag = np.concatenate([_magnitudes(test[:n, 0]), _magnitudes(test[:n, 1])])
+    freqs = np.fft.rfftfreq(FRAME, 1.0 / SAMPLE_RATE)
+    floor = 1e-6 * (ref_mag ** 2).sum(axis=1).max()
+    scores = []
+    for low, high in zip(_BAND_EDGES[:-1], _BAND_EDGES[1:]):
+        band = (freqs >= low) & (freqs < high)
+        energy = (ref_mag[:, band] ** 2).sum(axis=1)
+        error = ((ref_mag[:, band] - test_mag[:, band]) ** 2).sum(axis=1)
+        audible = energy > max(floor, 1e-12)
+        scores.append(np.clip(10 * np.log10(energy[audible] / (error[audible] + 1e-12)), -10, 40))
+    scores = np.concatenate(scores)
+    return float(scores.mean()) if len(scores) else None
+
+
+def score_audio(ffmpeg_path, reference, candidate):
+    """spectral_snr of an encoded candidate against the reference WAV. Runs in an AnalysisPool worker."""
+    return spectral_snr(_decode(ffmpeg_path, reference), _decode(ffmpeg_path, candidate))
+
+
+def pick(ladder, scores, target):
+    """First (smallest) ladder value whose score reaches target; the last one when none does.
+
+    A None score (silent excerpt, nothing to judge) passes.
+    """
+    for value, score in zip(ladder, scores):
+        if score is None or score >= target:
+            return value
+    return ladder[-1]
@@ -0,0 +1,152 @@
+# modules/silence.py
+import copy
+import json
+import os
+import re
+import subprocess
+import threading
+from modules.job_queue import Job
+
+SILENCE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.ffxpro', 'silences.json')
+
+# Defaults for splitting long captures: quieter than NOISE_DB for at least
+# MIN_SILENCE seconds is a gap; pieces shorter than MIN_TRACK are joined to the next
+NOISE_DB = -40.0
+MIN_SILENCE = 2.0
+MIN_TRACK = 30.0
+
+SILENCE_START = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+SILENCE_END = re.compile(r'silence_end: (-?\d+(?:\.\d+)?)')
+
+_memory = {}
+_lock = threading.Lock()
+
+
+def split_options(noise_db=NOISE_DB, min_silence=MIN_SILENCE, min_track=MIN_TRACK):
+    """The Job.split value: silencedetect threshold and minimum gap/track lengths."""
+    return {'noise_db': float(noise_db), 'min_silence': float(min_silence), 'min_track': float(min_track)}
+
+
+def silencedetect_cmd(ffmpeg_path, path, noise_db=NOISE_DB, min_silence=MIN_SILENCE):
+    # Decode-only pass: mono audio into silencedetect, nothing written
+    return [ffmpeg_path, '-hide_banner', '-nostdin', '-i', path, '-vn', '-sn', '-dn',
+            '-af', f'aformat=channel_layouts=mono,silencedetect=noise={noise_db:g}dB:d={min_silence:g}',
+            '-f', 'null', '-']
+
+
+def parse_silences(lines, duration=None):
+    """[(start, end)] gaps from silencedetect output; a gap running to the end of the file ends at duration (or None)."""
+    silences, start = [], None
+    for line in lines:
+        m = SILENCE_START.search(line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = SILENCE_END.search(line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    if start is not None:
+        silences.append((start, duration))
+    return silences
+
+
+def _cache_key(path, options):
+    st = os.stat(path)
+    return (f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime}|"
+            f"{options['noise_db']:g}|{options['min_silence']:g}")
+
+
+def cached_silences(path, options, cache_path=SILENCE_CACHE_PATH):
+    """Gaps found by an earlier pass over the same file with the same threshold, or None."""
+    key = _cache_key(path, options)
+    with _lock:
+        if key not in _memory:
+            try:
+                with open(cache_path, encoding='utf-8') as f:
+                    _memory.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        found = _memory.get(key)
+    return None if found is None else [tuple(gap) for gap in found]
+
+
+def store_silences(path, options, silences, cache_path=SILENCE_CACHE_PATH):
+    key = _cache_key(path, options)
+    with _lock:
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache[key] = _memory[key] = [list(gap) for gap in silences]
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError:
+            pass
+
+
+def detect_silences(ffmpeg_path, path, options, duration=None):
+    """Gaps in path, from the cache or a silencedetect pass. Raises OSError if ffmpeg fails."""
+    silences = cached_silences(path, options)
+    if silences is not None:
+        return silences
+    result = subprocess.run(silencedetect_cmd(ffmpeg_path, path, options['noise_db'], options['min_silence']),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        raise OSError(f"silence detection failed: {error[-1] if error else f'exit code {result.returncode}'}")
+    silences = parse_silences(result.stderr.splitlines(), duration)
+    store_silences(path, options, silences)
+    return silences
+
+
+def track_spans(silences, duration=None, min_track=MIN_TRACK):
+    """[(start, end)] of the sound between gaps; end None means the end of the file (for gaps too).
+
+    Leading and trailing silence is dropped. A piece shorter than min_track
+    (a quiet bar inside a song, a needle drop) is joined with the next one,
+    gap included; a short last piece is joined with the one before it.
+    """
+    spans, pos = [], 0.0
+    for start, end in sorted(silences):
+        if start > pos:
+            spans.append([pos, start])
+        pos = max(pos, float('inf') if end is None else end)
+    if pos < (float('inf') if duration is None else duration):
+        spans.append([pos, None])
+
+    def length(span):
+        end = span[1] if span[1] is not None else duration
+        return float('inf') if end is None else end - span[0]
+
+    merged = []
+    for span in spans:
+        if merged and length(merged[-1]) < min_track:
+            merged[-1][1] = span[1]
+        else:
+            merged.append(span)
+    if len(merged) > 1 and length(merged[-1]) < min_track:
+        merged[-2][1] = merged.pop()[1]
+    return [(start, end) for start, end in merged]
+
+
+def track_jobs(job, spans):
+    """One trimmed Job per span, numbered by the custom-name rule: <input name>_track_<n>, or with a custom
+    name <custom name>_<input number>_<n>, so tracks of different inputs and the batch's other jobs don't collide."""
+    settings = copy.copy(job.settings)
+    settings.custom_name = (f'{settings.custom_name}_{job.index + 1}' if settings.custom_name
+                            else f'{os.path.splitext(os.path.basename(job.input_file))[0]}_track')
+    return [Job(job.input_file, job.index, settings=settings, source=job.source, priority=job.priority,
+                deadline=job.deadline, start=start or None, end=end, accurate_cut=job.accurate_cut,
+                duration=end - start if end is not None else None, track=n)
+            for n, (start, end) in enumerate(spans, 1)]
+
+
+def split_job(ffmpeg_path, job):
+    """Track jobs for a split job, running (or reusing) the silencedetect pass."""
+    return track_jobs(job, track_spans(detect_silences(ffmpeg_path, job.input_file, job.split, job.duration),
+                                       job.duration, job.split['min_track']))
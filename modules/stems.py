@@ -0,0 +1,67 @@
+# modules/stems.py
+import math
+import os
+import sys
+
+STEMS = ('vocals', 'accompaniment')
+
+# Long tracks are separated in chunks of this length, overlapping by OVERLAP_SECONDS
+CHUNK_SECONDS = 300
+OVERLAP_SECONDS = 4
+MIN_CHUNK_SECONDS = 30
+
+# Rough peak RSS of one Spleeter 2stems process on CPU: model and runtime, plus per second of audio
+SPLEETER_BASE_BYTES = 700 * 1024 * 1024
+SPLEETER_BYTES_PER_SECOND = 2 * 1024 * 1024
+DEFAULT_MEMORY_LIMIT = 4 * 1024 * 1024 * 1024
+
+
+def spleeter_cmd(output_folder, path):
+    # Writes <output_folder>/<name without extension>/{vocals,accompaniment}.wav
+    return [sys.executable, '-m', 'spleeter', 'separate', '-p', 'spleeter:2stems', '-o', output_folder, path]
+
+
+def process_memory(seconds):
+    return SPLEETER_BASE_BYTES + SPLEETER_BYTES_PER_SECOND * seconds
+
+
+def chunk_plan(duration, memory_limit=DEFAULT_MEMORY_LIMIT, chunk_seconds=CHUNK_SECONDS, overlap=OVERLAP_SECONDS,
+               cpus=None):
+    """([(start, length), ...], parallel) for separating duration seconds of audio.
+
+    Chunks are shortened until one Spleeter process fits memory_limit, and
+    parallel is how many of them fit side by side (at most one per core).
+    Returns a single whole-track chunk when the track is short enough.
+    """
+    if memory_limit:
+        fits = (memory_limit - SPLEETER_BASE_BYTES) // SPLEETER_BYTES_PER_SECOND - overlap
+        chunk_seconds = max(MIN_CHUNK_SECONDS, min(chunk_seconds, fits))
+    if not duration or duration <= chunk_seconds + overlap:
+        return [(0.0, duration)], 1
+    count = math.ceil((duration - overlap) / chunk_seconds)
+    chunks = [(i * chunk_seconds, min(chunk_seconds + overlap, duration - i * chunk_seconds)) for i in range(count)]
+    parallel = min(count, cpus or os.cpu_count() or 1)
+    if memory_limit:
+        parallel = min(parallel, max(1, memory_limit // process_memory(chunk_seconds + overlap)))
+    return chunks, parallel
+
+
+def extract_cmd(ffmpeg_path, source, start, length, path):
+    # Spleeter reads WAV fastest; decoding once here also makes the cut sample-accurate
+    return [ffmpeg_path, '-hide_banner', '-y', '-ss', f'{start:.3f}', '-t', f'{length:.3f}', '-i', source,
+            '-vn', '-ac', '2', '-ar', '44100', '-c:a', 'pcm_s16le', path]
+
+
+def crossfade_cmd(ffmpeg_path, parts, overlap, path):
+    """Join chunk stems in order, crossfading each overlap back into one track."""
+    cmd = [ffmpeg_path, '-hide_banner', '-y']
+    for part in parts:
+        cmd += ['-i', part]
+    if len(parts) == 1:
+        return cmd + ['-c:a', 'pcm_s16le', path]
+    graph, last = [], '0:a'
+    for i in range(1, len(parts)):
+        label = f'x{i}'
+        graph.append(f'[{last}][{i}:a]acrossfade=d={overlap}:c1=tri:c2=tri[{label}]')
+        last = label
+    return cmd + ['-filter_complex', ';'.join(graph), '-map', f'[{last}]', '-c:a', 'pcm_s16le', path]
@@ -0,0 +1,142 @@
+# modules/supervisor.py
+import asyncio
+import os
+import re
+import signal
+import subprocess
+import threading
+from modules.background import priority_prefix
+
+_LINE_SPLIT = re.compile(rb'[\r\n]')
+
+# Seconds a child gets to exit after SIGTERM before it is killed
+KILL_GRACE = 5
+
+
+def _signal_tree(proc, kill=False):
+    # Children run in their own process group, so helpers they spawn go too
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == 'nt':
+            if kill:
+                subprocess.run(['taskkill', '/T', '/F', '/PID', str(proc.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except (OSError, ProcessLookupError):
+        pass
+
+
+class ProcessTimeout(Exception):
+    pass
+
+
+class ProcessSupervisor:
+    """One asyncio event loop, on one background thread, for every child.
+
+    ffmpeg writes its progress lines terminated by '\\r', so output is read
+    in chunks and split on either line ending. Callbacks run on the loop
+    thread and must not block; push blocking work to run_blocking().
+    """
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='ffx-supervisor', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, coro):
+        """Schedule coro on the loop from any thread; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, fn, *args):
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def run_blocking(self, fn, *args):
+        """Awaitable that runs a blocking call on the default executor."""
+        return self.loop.run_in_executor(None, fn, *args)
+
+    async def run_process(self, cmd, on_line=None, on_start=None, timeout=None, stall_timeout=None,
+                          low_priority=False):
+        """Run cmd, feeding each output line to on_line; return the exit code.
+
+        timeout bounds the whole run, stall_timeout the gap between output
+        chunks. Either one expiring kills the child and raises ProcessTimeout.
+        low_priority starts the child at background CPU (and, on Linux, I/O) priority.
+        """
+        if os.name == 'nt':
+            flags = subprocess.CREATE_NEW_PROCESS_GROUP
+            group = {'creationflags': flags | subprocess.BELOW_NORMAL_PRIORITY_CLASS if low_priority else flags}
+        else:
+            group = {'start_new_session': True}
+            if low_priority:
+                cmd = priority_prefix() + list(cmd)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, stdin=asyncio.subprocess.DEVNULL,
+            **group
+        )
+        if on_start:
+            on_start(proc)
+        started = self.loop.time()
+        buf = b''
+        try:
+            while True:
+                wait = stall_timeout
+                if timeout:
+                    remaining = timeout - (self.loop.time() - started)
+                    if remaining <= 0:
+                        raise ProcessTimeout(f'Timed out after {timeout:.0f}s')
+                    wait = min(wait, remaining) if wait else remaining
+                try:
+                    chunk = await asyncio.wait_for(proc.stdout.read(65536), wait)
+                except asyncio.TimeoutError:
+                    if timeout and self.loop.time() - started >= timeout:
+                        raise ProcessTimeout(f'Timed out after {timeout:.0f}s')
+                    raise ProcessTimeout(f'No output for {stall_timeout:.0f}s')
+                if not chunk:
+                    break
+                *lines, buf = _LINE_SPLIT.split(buf + chunk)
+                if on_line:
+                    for line in lines:
+                        if line:
+                            on_line(line.decode('utf-8', 'replace'))
+            if buf and on_line:
+                on_line(buf.decode('utf-8', 'replace'))
+            return await proc.wait()
+        except BaseException:
+            if proc.returncode is None:
+                _signal_tree(proc, kill=True)
+                await proc.wait()
+            raise
+
+    async def terminate(self, proc, grace=KILL_GRACE):
+        """SIGTERM the child's process group, SIGKILL it after grace, then reap."""
+        _signal_tree(proc)
+        try:
+            await asyncio.wait_for(proc.wait(), grace)
+        except asyncio.TimeoutError:
+            _signal_tree(proc, kill=True)
+            await proc.wait()
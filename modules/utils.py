@@ -1,9 +1,20 @@
+import collections
 import os
+import re
+import json
 import shutil
+import subprocess
+import threading
 
 AUDIO_EXTS = {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'}
 VIDEO_EXTS = {'.mp4', '.mkv', '.avi', '.mov', '.webm'}
 
+_DURATION_RE = re.compile(r'Duration:\s*(\d+):(\d+):(\d+\.\d+)')
+# Probe results of the most recently used files; long-running daemons and cluster workers see unbounded inputs
+PROBE_CACHE_SIZE = 2048
+_probe_cache = collections.OrderedDict()
+_probe_lock = threading.Lock()
+
 
 def which_ffmpeg(packaged_path=None):
     """Return the path to ffmpeg if found in PATH or packaged folder."""
@@ -11,7 +22,123 @@ def which_ffmpeg(packaged_path=None):
     if exe:
         return exe
     if packaged_path:
-        ffmpeg_local = os.path.join(packaged_path, 'ffmpeg', 'bin', 'ffmpeg.exe')
-        if os.path.exists(ffmpeg_local):
-            return ffmpeg_local
+        for name in ('ffmpeg.exe', 'ffmpeg'):
+            ffmpeg_local = os.path.join(packaged_path, 'ffmpeg', 'bin', name)
+            if os.path.isfile(ffmpeg_local):
+                return ffmpeg_local
     return None
+
+
+def _sibling_tool(tool, ffmpeg_path):
+    if ffmpeg_path:
+        folder = os.path.dirname(ffmpeg_path)
+        for name in (tool, tool + '.exe'):
+            candidate = os.path.join(folder, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return shutil.which(tool)
+
+
+def which_ffprobe(ffmpeg_path=None):
+    """Return the ffprobe sitting next to ffmpeg, or the one in PATH."""
+    return _sibling_tool('ffprobe', ffmpeg_path)
+
+
+def which_ffplay(ffmpeg_path=None):
+    """Return the ffplay sitting next to ffmpeg, or the one in PATH."""
+    return _sibling_tool('ffplay', ffmpeg_path)
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS (or '--:--' when unknown)."""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def parse_time(text):
+    """Seconds from '90', '1:30' or '01:02:03.5'. Raises ValueError."""
+    parts = str(text).strip().split(':')
+    if not 1 <= len(parts) <= 3 or not all(parts):
+        raise ValueError(f'not a time: {text!r}')
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f'negative time: {text!r}')
+    return seconds
+
+
+def parse_timestamp(h, mm, ss):
+    """Convert the groups of an HH:MM:SS.xx match into seconds."""
+    return int(h) * 3600 + int(mm) * 60 + float(ss)
+
+
+def probe_media(ffmpeg_path, path):
+    """Return ffprobe's format/streams info for path (cached by size+mtime).
+
+    Falls back to parsing ``ffmpeg -i`` output when ffprobe is missing, in
+    which case only the duration is filled in. Returns {} on failure.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    key = (path, st.st_size, st.st_mtime)
+    with _probe_lock:
+        if key in _probe_cache:
+            _probe_cache.move_to_end(key)
+            return _probe_cache[key]
+
+    info = {}
+    ffprobe = which_ffprobe(ffmpeg_path)
+    try:
+        if ffprobe:
+            out = subprocess.run(
+                [ffprobe, '-v', 'error', '-show_format', '-show_streams', '-of', 'json', path],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, timeout=30
+            ).stdout
+            info = json.loads(out or '{}')
+        elif ffmpeg_path:
+            out = subprocess.run(
+                [ffmpeg_path, '-hide_banner', '-i', path],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=30
+            ).stdout
+            m = _DURATION_RE.search(out or '')
+            if m:
+                info = {'format': {'duration': str(parse_timestamp(*m.groups()))}}
+    except (OSError, ValueError, subprocess.SubprocessError):
+        info = {}
+
+    with _probe_lock:
+        _probe_cache[key] = info
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return info
+
+
+def probe_duration(ffmpeg_path, path):
+    """Return the media duration of path in seconds, or None if unknown."""
+    try:
+        return float(probe_media(ffmpeg_path, path).get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_job_duration(ffmpeg_path, job):
+    """Duration of a job's output: the sum of all inputs for merge jobs, the trimmed span
+    for trim jobs, None if unknown."""
+    total = 0.0
+    for path in job.inputs or [job.input_file]:
+        duration = probe_duration(ffmpeg_path, path)
+        if duration is None:
+            total = None
+            break
+        total += duration
+    if job.start is None and job.end is None:
+        return total
+    if total is None:
+        return job.end - (job.start or 0.0) if job.end is not None else None
+    end = total if job.end is None else min(job.end, total)
+    return max(0.0, end - (job.start or 0.0))
@@ -0,0 +1,97 @@
+# modules/video.py
+
+VIDEO_MODES = ['Auto', 'Copy', 'H.264', 'H.265', 'VP9']
+
+# Encode profiles: encoder and constant-quality CRF
+VIDEO_PROFILES = {
+    'H.264': ('libx264', 23),
+    'H.265': ('libx265', 28),
+    'VP9': ('libvpx-vp9', 33),
+}
+
+# Speed tiers, slowest (smallest output) first
+SPEED_TIERS = ['small', 'balanced', 'fast', 'fastest']
+_X26X_TIERS = {'small': 'slow', 'balanced': 'medium', 'fast': 'veryfast', 'fastest': 'ultrafast'}
+_TIER_ARGS = {
+    'libx264': {t: ['-preset', p] for t, p in _X26X_TIERS.items()},
+    'libx265': {t: ['-preset', p] for t, p in _X26X_TIERS.items()},
+    'libvpx-vp9': {
+        'small': ['-deadline', 'good', '-cpu-used', '1'],
+        'balanced': ['-deadline', 'good', '-cpu-used', '3'],
+        'fast': ['-deadline', 'realtime', '-cpu-used', '6'],
+        'fastest': ['-deadline', 'realtime', '-cpu-used', '8'],
+    },
+}
+
+# Video codecs (ffprobe names) each container takes as a stream copy; None accepts anything
+CONTAINER_VIDEO_CODECS = {
+    'mp4': {'h264', 'hevc', 'mpeg4', 'av1'},
+    'mov': {'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg'},
+    'avi': {'h264', 'mpeg4', 'mjpeg', 'msmpeg4v2', 'msmpeg4v3'},
+    'webm': {'vp8', 'vp9', 'av1'},
+    'mkv': None,
+}
+# Profile used when a source has to be transcoded to fit its container
+DEFAULT_PROFILE = {'webm': 'VP9'}
+
+# Uncalibrated guesses for 1080p on the 'balanced' tier (media seconds per wall second)
+ENCODE_REALTIME = {'libx264': 3.0, 'libx265': 0.8, 'libvpx-vp9': 0.6}
+TIER_SPEEDUP = {'small': 0.5, 'balanced': 1.0, 'fast': 2.5, 'fastest': 5.0}
+
+
+def source_video_codec(info):
+    """Codec of the first real video stream (cover art doesn't count), or None."""
+    for s in info.get('streams', []):
+        if s.get('codec_type') == 'video' and not s.get('disposition', {}).get('attached_pic'):
+            return s.get('codec_name')
+    return None
+
+
+def can_copy(output_format, codec):
+    allowed = CONTAINER_VIDEO_CODECS.get(output_format, None)
+    return codec is None or allowed is None or codec in allowed
+
+
+def video_args(output_format, mode, speed, source_codec=None):
+    """Video output args for a container: a stream copy, or an encode profile at a speed tier.
+
+    'Auto' copies when the probed source codec fits the container and
+    transcodes with the container's default profile otherwise.
+    """
+    fmt = output_format.lower()
+    if mode == 'Copy' or (mode not in VIDEO_PROFILES and can_copy(fmt, source_codec)):
+        return ['-c:v', 'copy']
+    profile = mode if mode in VIDEO_PROFILES else DEFAULT_PROFILE.get(fmt, 'H.264')
+    codec, crf = VIDEO_PROFILES[profile]
+    if not can_copy(fmt, {'libx264': 'h264', 'libx265': 'hevc', 'libvpx-vp9': 'vp9'}[codec]):
+        raise ValueError(f'{profile} video cannot be written to .{fmt}')
+    args = ['-c:v', codec, '-crf', str(crf)]
+    if codec == 'libvpx-vp9':
+        # Constant quality mode for VP9 needs the bitrate cap lifted
+        args += ['-b:v', '0', '-row-mt', '1']
+    else:
+        args += ['-pix_fmt', 'yuv420p']
+    if codec == 'libx265' and fmt in ('mp4', 'mov'):
+        args += ['-tag:v', 'hvc1']
+    return args + _TIER_ARGS[codec][speed if speed in TIER_SPEEDUP else 'balanced']
+
+
+def describe(cmd):
+    """'H.264 fast' for a command that encodes video, None for copy or audio-only."""
+    codec = cmd[cmd.index('-c:v') + 1] if '-c:v' in cmd else None
+    for profile, (encoder, _) in VIDEO_PROFILES.items():
+        if encoder == codec:
+            for tier, args in _TIER_ARGS[encoder].items():
+                if any(cmd[i:i + len(args)] == args for i in range(len(cmd))):
+                    return f'{profile} {tier}'
+            return profile
+    return None
+
+
+def guess_realtime(cmd):
+    """Uncalibrated realtime factor for a video encode, or None if cmd doesn't encode video."""
+    label = describe(cmd)
+    if label is None:
+        return None
+    profile, _, tier = label.partition(' ')
+    return ENCODE_REALTIME[VIDEO_PROFILES[profile][0]] * TIER_SPEEDUP.get(tier or 'balanced', 1.0)
@@ -0,0 +1,193 @@
+# modules/waveform.py
+import hashlib
+import os
+import queue
+import struct
+import subprocess
+import threading
+
+NUMPY_AVAILABLE = True
+try:
+    import numpy as np
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+PEAK_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ffxpro', 'peaks')
+
+# Peaks come from mono 8 kHz PCM; level 0 has one min/max pair per BASE samples,
+# every further level FACTOR times fewer
+SAMPLE_RATE = 8000
+BASE = 64
+FACTOR = 4
+LEVELS = 6
+# Decode this many level-0 peaks' worth of samples per read
+READ_PEAKS = 1024
+
+_MAGIC = b'FFXPEAK1'
+_HEADER = struct.Struct('<8sIIIIQ')
+_COUNT = struct.Struct('<Q')
+
+
+def peak_file_path(path, cache_dir=PEAK_CACHE_DIR):
+    # Keyed by path, size and mtime: an edited file gets a fresh peak file
+    st = os.stat(path)
+    key = f'{os.path.realpath(path)}|{st.st_size}|{st.st_mtime}'
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.peaks')
+
+
+def _spawn_low_priority(cmd):
+    # Peak decoding is background work; ffmpeg conversions and the GUI come first
+    if os.name == 'nt':
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                creationflags=subprocess.BELOW_NORMAL_PRIORITY_CLASS)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        os.setpriority(os.PRIO_PROCESS, proc.pid, 10)
+    except OSError:
+        pass
+    return proc
+
+
+class PeakFile:
+    """Multi-resolution min/max peaks of one file, memory-mapped from the peak cache.
+
+    Only the pages behind the requested range are read, so drawing a view of
+    a long file costs the same as a short one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        data = np.memmap(path, dtype=np.int8, mode='r')
+        magic, self.sample_rate, self.base, self.factor, levels, self.samples = _HEADER.unpack(
+            bytes(data[:_HEADER.size]))
+        if magic != _MAGIC:
+            raise ValueError(f'not a peak file: {path}')
+        offset = _HEADER.size + levels * _COUNT.size
+        self.levels = []
+        for i in range(levels):
+            count, = _COUNT.unpack(bytes(data[_HEADER.size + i * _COUNT.size:_HEADER.size + (i + 1) * _COUNT.size]))
+            self.levels.append(data[offset:offset + count * 2].reshape(count, 2))
+            offset += count * 2
+
+    @property
+    def duration(self):
+        return self.samples / self.sample_rate
+
+    def seconds_per_peak(self, level):
+        return self.base * self.factor ** level / self.sample_rate
+
+    def range(self, start, end, columns):
+        """(mins, maxs) in -1..1 for start..end seconds, at most `columns` values each."""
+        level = 0
+        while level + 1 < len(self.levels) and (end - start) / self.seconds_per_peak(level + 1) >= columns:
+            level += 1
+        step = self.seconds_per_peak(level)
+        peaks = self.levels[level]
+        data = np.asarray(peaks[max(0, int(start / step)):min(len(peaks), int(np.ceil(end / step)))])
+        if len(data) > columns:
+            edges = np.linspace(0, len(data), columns, endpoint=False).astype(np.intp)
+            data = np.stack([np.minimum.reduceat(data[:, 0], edges), np.maximum.reduceat(data[:, 1], edges)], axis=1)
+        return data[:, 0] / 128.0, data[:, 1] / 128.0
+
+
+def build_peaks(ffmpeg_path, path, cache_dir=PEAK_CACHE_DIR):
+    """Decode path once at low priority and write its peak file. Returns the file name, or None."""
+    target = peak_file_path(path, cache_dir)
+    cmd = [ffmpeg_path, '-hide_banner', '-nostdin', '-v', 'error', '-i', path, '-vn', '-ac', '1',
+           '-ar', str(SAMPLE_RATE), '-f', 's16le', '-']
+    proc = _spawn_low_priority(cmd)
+    chunks, samples, carry = [], 0, np.empty(0, dtype=np.int16)
+    with proc.stdout:
+        while True:
+            raw = proc.stdout.read(BASE * READ_PEAKS * 2)
+            if not raw:
+                break
+            block = np.concatenate([carry, np.frombuffer(raw[:len(raw) - len(raw) % 2], dtype='<i2')])
+            samples += len(block) - len(carry)
+            usable = len(block) - len(block) % BASE
+            frames = block[:usable].reshape(-1, BASE)
+            chunks.append(np.stack([frames.min(axis=1), frames.max(axis=1)], axis=1))
+            carry = block[usable:]
+    proc.wait()
+    if len(carry):
+        chunks.append(np.array([[carry.min(), carry.max()]], dtype=np.int16))
+    if not chunks:
+        return None
+
+    # Keep the top byte: peaks only need to be drawn, not played back
+    levels = [(np.concatenate(chunks) >> 8).astype(np.int8)]
+    while len(levels) < LEVELS and len(levels[-1]) >= FACTOR:
+        prev = levels[-1]
+        pad = -len(prev) % FACTOR
+        if pad:
+            prev = np.concatenate([prev, np.repeat(prev[-1:], pad, axis=0)])
+        grouped = prev.reshape(-1, FACTOR, 2)
+        levels.append(np.stack([grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)], axis=1))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(target + '.tmp', 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, SAMPLE_RATE, BASE, FACTOR, len(levels), samples))
+        for level in levels:
+            f.write(_COUNT.pack(len(level)))
+        for level in levels:
+            f.write(level.tobytes())
+    os.replace(target + '.tmp', target)
+    return target
+
+
+def load_peaks(ffmpeg_path, path, cache_dir=PEAK_CACHE_DIR, build=True):
+    """PeakFile for path from the cache, decoding it first if needed (and build=True)."""
+    if not NUMPY_AVAILABLE:
+        return None
+    try:
+        target = peak_file_path(path, cache_dir)
+        if not os.path.exists(target):
+            if not (build and ffmpeg_path):
+                return None
+            target = build_peaks(ffmpeg_path, path, cache_dir)
+        return PeakFile(target) if target else None
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+class PeakGenerator:
+    """Builds peak files one at a time on a background thread.
+
+    callback(path, PeakFile or None) runs on that thread. Requests for
+    files that are already cached return almost at once.
+    """
+
+    def __init__(self, ffmpeg_path, callback, cache_dir=PEAK_CACHE_DIR):
+        self.ffmpeg_path = ffmpeg_path
+        self.callback = callback
+        self.cache_dir = cache_dir
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self, path):
+        if not NUMPY_AVAILABLE:
+            return
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ffx-peaks', daemon=True)
+                self._thread.start()
+        self._queue.put(path)
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            peaks = load_peaks(self.ffmpeg_path, path, self.cache_dir)
+            with self._lock:
+                self._pending.discard(path)
+            self.callback(path, peaks)
@@ -0,0 +1,94 @@
+# modules/waveform_view.py
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPainter, QPixmap
+from PyQt5.QtWidgets import QWidget
+
+WAVE_COLOR = QColor('#3fa7d6')
+# Narrowest view the wheel zooms into (seconds)
+MIN_SPAN = 0.05
+
+
+def paint_peaks(painter, rect, mins, maxs, color=WAVE_COLOR):
+    """One vertical line per column from min to max, spread over rect."""
+    if not len(mins):
+        return
+    painter.setPen(color)
+    mid = rect.top() + rect.height() / 2
+    half = rect.height() / 2
+    step = rect.width() / len(mins)
+    for i in range(len(mins)):
+        x = int(rect.left() + i * step)
+        painter.drawLine(x, int(mid - maxs[i] * half), x, int(mid - mins[i] * half))
+
+
+def thumbnail(peaks, width=96, height=24, color=WAVE_COLOR):
+    """Whole-file waveform as a small pixmap for list icons."""
+    pixmap = QPixmap(width, height)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    mins, maxs = peaks.range(0, peaks.duration, width)
+    paint_peaks(painter, pixmap.rect(), mins, maxs, color)
+    painter.end()
+    return pixmap
+
+
+class WaveformView(QWidget):
+    """Waveform of the selected file. The wheel zooms around the cursor, dragging scrolls.
+
+    Every paint asks the PeakFile for just the visible range at the
+    widget's width, so zooming into a long file reads only a few pages.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(80)
+        self._peaks = None
+        self._start = 0.0
+        self._end = 0.0
+        self._drag_x = None
+
+    def set_peaks(self, peaks):
+        self._peaks = peaks
+        self._start, self._end = 0.0, peaks.duration if peaks else 0.0
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        if self._peaks is None or self._end <= self._start:
+            painter.setPen(self.palette().text().color())
+            painter.drawText(self.rect(), Qt.AlignCenter, 'No waveform')
+        else:
+            mins, maxs = self._peaks.range(self._start, self._end, max(1, self.width()))
+            paint_peaks(painter, self.rect(), mins, maxs)
+        painter.end()
+
+    def _time_at(self, x):
+        return self._start + (self._end - self._start) * x / max(1, self.width())
+
+    def _set_range(self, start, end):
+        duration = self._peaks.duration
+        span = min(max(end - start, MIN_SPAN), duration)
+        start = min(max(0.0, start), duration - span)
+        self._start, self._end = start, start + span
+        self.update()
+
+    def wheelEvent(self, event):
+        if self._peaks is None:
+            return
+        anchor = self._time_at(event.pos().x())
+        scale = 0.8 if event.angleDelta().y() > 0 else 1.25
+        self._set_range(anchor - (anchor - self._start) * scale, anchor + (self._end - anchor) * scale)
+
+    def mousePressEvent(self, event):
+        self._drag_x = event.pos().x()
+
+    def mouseMoveEvent(self, event):
+        if self._peaks is None or self._drag_x is None:
+            return
+        shift = (self._drag_x - event.pos().x()) * (self._end - self._start) / max(1, self.width())
+        self._drag_x = event.pos().x()
+        self._set_range(self._start + shift, self._end + shift)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_x = None
@@ -0,0 +1,85 @@
+# tests/conftest.py
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the capability, silence, genre and history caches out of the real home folder
+os.environ['HOME'] = os.environ['USERPROFILE'] = tempfile.mkdtemp(prefix='ffx-test-home-')
+
+from modules.command_builder import ConversionSettings  # noqa: E402
+from modules.engine import ConversionEngine, EngineListener  # noqa: E402
+from modules.fakeff import write_launcher  # noqa: E402
+from modules.history import HistoryStore  # noqa: E402
+
+
+class Recorder(EngineListener):
+    """Keeps the commands the engine ran and the jobs it started, in order."""
+
+    def __init__(self):
+        self.started = []
+        self.commands = []
+        self.finished = []
+
+    def job_started(self, job):
+        self.started.append(job)
+
+    def job_log(self, job, line):
+        if line.startswith('Running: '):
+            self.commands.append(line[len('Running: '):])
+
+    def job_finished(self, job):
+        self.finished.append(job)
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Returns make(profile=None) -> path of a stand-in ffmpeg scripted by that profile."""
+    def make(profile=None):
+        profile_path = tmp_path / 'profile.json'
+        profile_path.write_text(json.dumps(profile or {'duration': 10, 'speed': 200, 'interval': 0.05}))
+        return write_launcher(str(tmp_path / 'bin'), str(profile_path))
+    return make
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """Returns make(count, prefix='input') -> paths of empty input files."""
+    def make(count, prefix='input'):
+        folder = tmp_path / 'in'
+        folder.mkdir(exist_ok=True)
+        paths = []
+        for n in range(count):
+            path = folder / f'{prefix}_{n}.wav'
+            path.write_bytes(b'')
+            paths.append(str(path))
+        return paths
+    return make
+
+
+@pytest.fixture
+def settings(tmp_path):
+    def make(output_format='mp3', **kwargs):
+        folder = tmp_path / 'out'
+        folder.mkdir(exist_ok=True)
+        return ConversionSettings(str(folder), output_format, **kwargs)
+    return make
+
+
+def run_engine(ffmpeg_path, queue=None, jobs=(), workers=1, listener=None, before_start=None, **options):
+    """Run one drain-mode batch to the end; options go to ConversionEngine. Returns the engine."""
+    engine = ConversionEngine(ffmpeg_path, workers=workers, queue=queue, listener=listener,
+                              history=HistoryStore(':memory:'), disk_guard=False, **options)
+    for job in jobs:
+        engine.submit(job)
+    if before_start:
+        before_start(engine)
+    engine.start(drain=True)
+    try:
+        assert engine.wait(60), 'batch did not finish'
+    finally:
+        engine.supervisor.stop()
+    return engine
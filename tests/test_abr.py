@@ -0,0 +1,41 @@
+# tests/test_abr.py
+import os
+
+import modules.command_builder
+from conftest import Recorder, run_engine
+from modules.abr import AUDIO_LADDER
+from modules.command_builder import CommandBuilder
+from modules.job_queue import STATE_DONE, Job
+
+VIDEO_720P = [{'codec_type': 'video', 'codec_name': 'h264', 'height': 720}, {'codec_type': 'audio', 'codec_name': 'aac'}]
+
+
+def _probe(monkeypatch, streams):
+    monkeypatch.setattr(modules.command_builder, 'probe_media',
+                        lambda ffmpeg_path, path: {'format': {'duration': '10'}, 'streams': streams})
+
+
+def test_hls_ladder_comes_from_one_decode(fake_ffmpeg, inputs, settings, monkeypatch):
+    _probe(monkeypatch, VIDEO_720P)
+    job = Job(inputs(1)[0], 0, settings=settings('HLS', enhancement_mode='Normalize'))
+    recorder = Recorder()
+    run_engine(fake_ffmpeg({'duration': 10, 'speed': 200, 'interval': 0.05, 'streams': ['video', 'audio']}),
+               jobs=[job], listener=recorder)
+    assert job.state == STATE_DONE and os.path.isdir(job.output_file)
+    cmd, = recorder.commands
+    args = cmd.split(' ')
+    assert args.count('-i') == 1
+    graph = args[args.index('-filter_complex') + 1]
+    # The enhancement chain runs once, ahead of the split; no rung is taller than the 720p source
+    assert graph.count('loudnorm') == 1 and 'loudnorm,asplit=3' in graph
+    assert 'split=3' in graph and 'scale=-2:1080' not in graph
+    assert args[args.index('-var_stream_map') + 1:args.index('-var_stream_map') + 4] == ['v:0,a:0', 'v:1,a:1', 'v:2,a:2']
+
+
+def test_dash_ladder_of_an_audio_only_source(fake_ffmpeg, inputs, settings, monkeypatch):
+    _probe(monkeypatch, [{'codec_type': 'audio', 'codec_name': 'flac'}])
+    cmd, output_dir = CommandBuilder(fake_ffmpeg()).build(Job(inputs(1)[0], 0, settings=settings('DASH')))
+    assert f'asplit={len(AUDIO_LADDER)}' in cmd[cmd.index('-filter_complex') + 1]
+    assert [cmd[cmd.index(f'-b:a:{i}') + 1] for i in range(len(AUDIO_LADDER))] == list(AUDIO_LADDER)
+    assert '-map' in cmd and not any(a.startswith('[v') for a in cmd)
+    assert cmd[-1] == os.path.join(output_dir, 'manifest.mpd')
@@ -0,0 +1,84 @@
+# tests/test_background.py
+import os
+
+import pytest
+
+from conftest import Recorder, run_engine
+from modules.background import NICE, LoadGovernor, priority_prefix
+from modules.job_queue import STATE_DONE, Job
+
+BUSY = {'load': 0.1, 'memory': 0.5, 'stall': 0.0, 'idle': 5.0}
+AWAY = dict(BUSY, idle=3600.0)
+
+
+class Concurrency(Recorder):
+    """Keeps the most jobs running at once."""
+
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.peak = 0
+
+    def job_started(self, job):
+        super().job_started(job)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+
+    def job_finished(self, job):
+        super().job_finished(job)
+        self.running -= 1
+
+
+def test_governor_steps_with_load_and_drops_for_the_user():
+    governor = LoadGovernor(3)
+    assert [governor.update(AWAY)[0] for _ in range(4)] == [2, 3, 3, 3]
+    assert governor.update(dict(AWAY, load=1.5)) == (2, 'load 1.50 per CPU')
+    assert governor.update(dict(AWAY, memory=0.05))[0] == 1
+    governor.update(AWAY)
+    assert governor.update(BUSY) == (1, 'user active')
+    # Signals the platform can't report don't hold the pool back
+    assert governor.update({'load': None, 'memory': None, 'stall': None, 'idle': None})[0] == 2
+
+
+@pytest.mark.parametrize('sample, expected_peak', [(BUSY, 1), (AWAY, 3)])
+def test_background_engine_follows_the_governor(fake_ffmpeg, inputs, settings, sample, expected_peak):
+    jobs = [Job(path, i, settings=settings()) for i, path in enumerate(inputs(6))]
+
+    def fast_governor(engine):
+        engine.governor.interval = 0.02
+        engine.governor.sample = lambda: sample
+
+    recorder = Concurrency()
+    run_engine(fake_ffmpeg({'duration': 10, 'speed': 40, 'interval': 0.05}), jobs=jobs, workers=3, listener=recorder,
+               before_start=fast_governor, background=True)
+    assert all(job.state == STATE_DONE for job in jobs)
+    assert recorder.peak == expected_peak
+
+
+@pytest.mark.skipif(os.name == 'nt' or 'nice' not in priority_prefix(), reason='needs nice')
+def test_background_children_run_niced(fake_ffmpeg, inputs, settings):
+    niceness = []
+
+    class Sampler(Recorder):
+        def progress(self, snapshot):
+            for proc in pids:
+                try:
+                    niceness.append(os.getpriority(os.PRIO_PROCESS, proc.pid))
+                except ProcessLookupError:
+                    pass  # already exited
+
+    pids = []
+
+    def watch(engine):
+        on_start = engine._on_start
+
+        def record(job, proc):
+            pids.append(proc)
+            on_start(job, proc)
+        engine._on_start = record
+
+    job = Job(inputs(1)[0], 0, settings=settings())
+    run_engine(fake_ffmpeg({'duration': 10, 'speed': 10, 'interval': 0.05}), jobs=[job], listener=Sampler(),
+               before_start=watch, background=True)
+    assert job.state == STATE_DONE
+    assert niceness and max(niceness) >= min(19, os.getpriority(os.PRIO_PROCESS, 0) + NICE)
@@ -0,0 +1,58 @@
+# tests/test_capabilities.py
+import json
+import os
+
+import modules.capabilities
+from conftest import Recorder, run_engine
+from modules.capabilities import Capabilities, get_capabilities
+from modules.job_queue import STATE_DONE, STATE_FAILED, Job
+
+
+def test_probe_is_cached_on_disk_until_the_binary_changes(tmp_path, fake_ffmpeg, monkeypatch):
+    ffmpeg = fake_ffmpeg()
+    cache_path = str(tmp_path / 'capabilities.json')
+    probe = modules.capabilities.probe_capabilities
+    probed = []
+
+    def counting(path):
+        probed.append(path)
+        return probe(path)
+    monkeypatch.setattr(modules.capabilities, 'probe_capabilities', counting)
+
+    for _ in range(2):
+        # A fresh process: only the disk cache survives
+        monkeypatch.setattr(modules.capabilities, '_memory', {})
+        caps = get_capabilities(ffmpeg, cache_path=cache_path)
+        assert 'libmp3lame' in caps.encoders and 'afftdn' in caps.filters
+    assert len(probed) == 1
+    with open(cache_path, encoding='utf-8') as f:
+        assert len(json.load(f)) == 1
+
+    st = os.stat(os.path.realpath(ffmpeg))
+    os.utime(os.path.realpath(ffmpeg), (st.st_atime, st.st_mtime + 10))
+    monkeypatch.setattr(modules.capabilities, '_memory', {})
+    get_capabilities(ffmpeg, cache_path=cache_path)
+    assert len(probed) == 2
+
+
+def _with_encoders(*encoders):
+    def apply(engine):
+        engine.builder._capabilities = Capabilities('ffmpeg version test', encoders, ['aformat'])
+    return apply
+
+
+def test_missing_encoder_fails_the_job_without_spawning_ffmpeg(fake_ffmpeg, inputs, settings):
+    job = Job(inputs(1)[0], 0, settings=settings('mp3'))
+    recorder = Recorder()
+    run_engine(fake_ffmpeg(), jobs=[job], listener=recorder, before_start=_with_encoders('aac', 'flac'))
+    assert job.state == STATE_FAILED
+    assert 'no libmp3lame encoder' in job.message
+    assert recorder.commands == []
+
+
+def test_missing_encoder_falls_back_to_another_for_the_same_codec(fake_ffmpeg, inputs, settings):
+    job = Job(inputs(1)[0], 0, settings=settings('mp3'))
+    recorder = Recorder()
+    run_engine(fake_ffmpeg(), jobs=[job], listener=recorder, before_start=_with_encoders('libshine'))
+    assert job.state == STATE_DONE
+    assert ' -c:a libshine ' in recorder.commands[0]
@@ -0,0 +1,57 @@
+# tests/test_cluster.py
+import os
+
+import modules.cluster
+from modules.cluster import LEASE_DIR, QUEUE_DIR, ClusterQueue, ClusterWorker
+from modules.silence import split_options
+
+
+def test_lease_is_fresh_as_soon_as_it_is_claimed(tmp_path, settings, monkeypatch):
+    cluster = ClusterQueue(str(tmp_path / 'farm'), lease_timeout=60)
+    cluster.submit('/media/a.wav', settings())
+    name, = cluster.list_queue()
+    # Queued long before a worker got to it
+    queued = os.path.join(cluster.root, QUEUE_DIR, name)
+    os.utime(queued, (os.path.getmtime(queued) - 3600,) * 2)
+
+    # Another node's reaper runs between the rename into leases/ and the lease rewrite
+    read_json = modules.cluster._read_json
+    reaped = []
+
+    def read_then_reap(path):
+        reaped.append(ClusterQueue(cluster.root, lease_timeout=60).reap_expired())
+        return read_json(path)
+
+    monkeypatch.setattr(modules.cluster, '_read_json', read_then_reap)
+    assert cluster.claim('worker-1', [name])[0] == name
+    assert reaped == [0]
+    assert cluster.list_queue() == []
+    assert os.listdir(os.path.join(cluster.root, LEASE_DIR)) == [name]
+
+
+def test_trimmed_job_keeps_its_span_on_the_worker(tmp_path, settings, fake_ffmpeg, inputs):
+    cluster = ClusterQueue(str(tmp_path / 'farm'))
+    path, = inputs(1)
+    cluster.submit(path, settings(), start=2.0, end=6.0, accurate_cut=True)
+    worker = ClusterWorker(cluster, fake_ffmpeg())
+    worker._fill()
+    try:
+        (_, _, job), = worker._held.values()
+        assert (job.start, job.end, job.accurate_cut) == (2.0, 6.0, True)
+    finally:
+        worker.engine.supervisor.stop()
+
+
+def test_split_and_merge_jobs_reach_the_worker_unchanged(tmp_path, settings, fake_ffmpeg, inputs):
+    cluster = ClusterQueue(str(tmp_path / 'farm'))
+    first, second = inputs(2)
+    cluster.submit(first, settings(), index=0, split=split_options())
+    cluster.submit(first, settings(), index=1, inputs=[first, second])
+    worker = ClusterWorker(cluster, fake_ffmpeg(), workers=2)
+    worker._fill()
+    try:
+        split_job, merge_job = sorted((job for _, _, job in worker._held.values()), key=lambda job: job.index)
+        assert (split_job.split, split_job.inputs) == (split_options(), None)
+        assert (merge_job.split, merge_job.inputs) == (None, [first, second])
+    finally:
+        worker.engine.supervisor.stop()
@@ -0,0 +1,39 @@
+# tests/test_daemon.py
+import time
+
+import pytest
+
+from modules.command_builder import ConversionSettings
+from modules.daemon import ConversionDaemon
+
+
+@pytest.fixture
+def daemon(fake_ffmpeg, tmp_path):
+    # Never started: submit() only queues
+    daemon = ConversionDaemon(fake_ffmpeg(), ConversionSettings(str(tmp_path), 'mp3'), port=0)
+    yield daemon
+    daemon.server.server_close()
+
+
+@pytest.mark.parametrize('field, value', [('priority', 'high'), ('priority', True), ('deadline', [1]),
+                                          ('deadline', 'tomorrow')])
+def test_bad_priority_or_deadline_leaves_no_job(daemon, inputs, field, value):
+    path, = inputs(1)
+    with pytest.raises(ValueError):
+        daemon.submit({'input': path, field: value})
+    assert daemon.engine.list_jobs() == []
+    assert len(daemon.engine.queue) == 0
+
+
+def test_list_with_a_bad_spec_queues_nothing(daemon, inputs):
+    first, second = inputs(2)
+    with pytest.raises(ValueError):
+        daemon.submit_all([{'input': first}, {'input': second, 'priority': 'urgent'}])
+    assert daemon.engine.list_jobs() == []
+
+
+def test_deadline_text_is_a_time_from_now(daemon, inputs):
+    path, = inputs(1)
+    job = daemon.submit({'input': path, 'deadline': '1:00:00', 'priority': 3})
+    assert job.priority == 3
+    assert abs(job.deadline - (time.time() + 3600)) < 60
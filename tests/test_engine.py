@@ -0,0 +1,81 @@
+# tests/test_engine.py
+from conftest import Recorder, run_engine
+from modules.command_builder import CommandBuilder
+from modules.diskspace import preflight
+from modules.job_queue import STATE_CANCELLED, STATE_DONE, STATE_FAILED, Job, JobQueue
+
+
+def test_cancel_queued_job_of_prefilled_queue(fake_ffmpeg, inputs, settings):
+    # The GUI hands the engine a filled queue and never calls submit()
+    queue = JobQueue()
+    jobs = [queue.add(Job(path, i, settings=settings())) for i, path in enumerate(inputs(3))]
+    recorder = Recorder()
+    run_engine(fake_ffmpeg(), queue=queue, listener=recorder,
+               before_start=lambda engine: engine.cancel(jobs[1].id))
+    assert [job.state for job in jobs] == [STATE_DONE, STATE_CANCELLED, STATE_DONE]
+    assert jobs[1] not in recorder.started
+
+
+def test_cancel_all_stops_the_whole_batch(fake_ffmpeg, inputs, settings):
+    queue = JobQueue()
+    jobs = [queue.add(Job(path, i, settings=settings())) for i, path in enumerate(inputs(4))]
+    engine_ref = []
+
+    class StopOnFirst(Recorder):
+        def job_started(self, job):
+            super().job_started(job)
+            engine_ref[0].cancel_all()
+
+    recorder = StopOnFirst()
+    run_engine(fake_ffmpeg({'duration': 10, 'speed': 2, 'interval': 0.05}), queue=queue, listener=recorder,
+               before_start=engine_ref.append)
+    assert [job.state for job in jobs] == [STATE_CANCELLED] * 4
+    assert recorder.started == [jobs[0]]
+
+
+def test_reused_job_can_be_cancelled_in_the_next_batch(fake_ffmpeg, inputs, settings):
+    ffmpeg = fake_ffmpeg()
+    first, second = (Job(path, i, settings=settings()) for i, path in enumerate(inputs(2)))
+    run_engine(ffmpeg, jobs=[first, second])
+    assert second.state == STATE_DONE
+
+    queue = JobQueue()
+    for job in (first, second):
+        job.reset()
+        queue.add(job)
+    recorder = Recorder()
+    run_engine(ffmpeg, queue=queue, listener=recorder,
+               before_start=lambda engine: engine.cancel(second.id))
+    assert (first.state, second.state) == (STATE_DONE, STATE_CANCELLED)
+    assert recorder.started == [first]
+
+
+def test_reset_drops_the_previous_batch_size_estimate(fake_ffmpeg, inputs, settings):
+    builder = CommandBuilder(fake_ffmpeg())
+    path, = inputs(1)
+    job = Job(path, 0, settings=settings('mp3', quality='Low'))
+    preflight(builder, [job])
+    compressed = job.estimated_size
+    job.settings = settings('wav')
+    job.reset()
+    preflight(builder, [job])
+    assert compressed and job.estimated_size > 5 * compressed
+
+
+def test_unexpected_error_fails_the_job_and_the_batch_still_ends(fake_ffmpeg, inputs, settings):
+    jobs = [Job(path, i, settings=settings()) for i, path in enumerate(inputs(3))]
+    recorder = Recorder()
+
+    def break_builder(engine):
+        build = engine.builder.build
+
+        def failing(job):
+            if job is jobs[1]:
+                raise RuntimeError('builder exploded')
+            return build(job)
+        engine.builder.build = failing
+
+    run_engine(fake_ffmpeg(), jobs=jobs, listener=recorder, before_start=break_builder)
+    assert [job.state for job in jobs] == [STATE_DONE, STATE_FAILED, STATE_DONE]
+    assert 'builder exploded' in jobs[1].message
+    assert sorted(recorder.finished, key=lambda job: job.index) == jobs
@@ -0,0 +1,49 @@
+# tests/test_genre.py
+import threading
+import time
+
+import pytest
+
+import modules.genre as genre
+
+
+class SlowAnalyzer:
+    """Stands in for GenreAnalyzer: every file is silent, and each batch takes `delay` seconds."""
+    delay = 0.5
+    batches = []
+
+    def __init__(self, ffmpeg_path):
+        self.batch_size = genre.BATCH_SIZE
+
+    def analyze(self, paths):
+        SlowAnalyzer.batches.append(list(paths))
+        time.sleep(self.delay)
+        return [(None, None) for _ in paths]
+
+
+@pytest.fixture
+def analyzer(monkeypatch, tmp_path):
+    monkeypatch.setattr(genre, 'NUMPY_AVAILABLE', True)
+    monkeypatch.setattr(genre, 'GenreAnalyzer', SlowAnalyzer)
+    monkeypatch.setattr(genre, '_analyzers', {})
+    SlowAnalyzer.batches = []
+    return str(tmp_path / 'genres.json')
+
+
+def test_silent_files_are_not_decoded_again(analyzer, inputs):
+    path, = inputs(1)
+    assert genre.detect_genres('ffmpeg', [path], analyzer) == {path: None}
+    assert genre.detect_genres('ffmpeg', [path], analyzer) == {path: None}
+    assert SlowAnalyzer.batches == [[path]]
+
+
+def test_separate_calls_analyze_at_the_same_time(analyzer, inputs):
+    paths = inputs(3, prefix='song')
+    threads = [threading.Thread(target=genre.detect_genres, args=('ffmpeg', [path], analyzer)) for path in paths]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(SlowAnalyzer.batches) == 3
+    assert time.monotonic() - started < 3 * SlowAnalyzer.delay
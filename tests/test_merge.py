@@ -0,0 +1,26 @@
+# tests/test_merge.py
+import modules.command_builder
+from modules.command_builder import CommandBuilder
+from modules.job_queue import Job
+
+COVER = {'codec_type': 'video', 'codec_name': 'mjpeg', 'width': 600, 'height': 600, 'disposition': {'attached_pic': 1}}
+VIDEO = {'codec_type': 'video', 'codec_name': 'h264', 'width': 1280, 'height': 720, 'r_frame_rate': '30/1'}
+AUDIO = {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channels': 2}
+
+
+def _merge(monkeypatch, fake_ffmpeg, inputs, settings, streams):
+    monkeypatch.setattr(modules.command_builder, 'probe_media',
+                        lambda ffmpeg_path, path: {'format': {'duration': '10'}, 'streams': streams})
+    paths = inputs(2)
+    cmd, _ = CommandBuilder(fake_ffmpeg()).build(Job(paths[0], 0, settings=settings('mp4'), inputs=paths))
+    return cmd[cmd.index('-filter_complex') + 1]
+
+
+def test_cover_art_alone_merges_the_audio(monkeypatch, fake_ffmpeg, inputs, settings):
+    graph = _merge(monkeypatch, fake_ffmpeg, inputs, settings, [COVER, AUDIO])
+    assert graph.endswith('concat=n=2:v=0:a=1[aout]')
+
+
+def test_cover_art_does_not_set_the_frame_size(monkeypatch, fake_ffmpeg, inputs, settings):
+    graph = _merge(monkeypatch, fake_ffmpeg, inputs, settings, [COVER, VIDEO, AUDIO])
+    assert 'scale=1280:720:' in graph and 'fps=30/1' in graph
@@ -0,0 +1,16 @@
+# tests/test_planner.py
+from modules.command_builder import CommandBuilder
+from modules.job_queue import Job
+from modules.planner import DECISION_REENCODE, DECISION_SKIP, Planner, _decide
+
+
+def test_plan_without_ffprobe_does_not_skip(fake_ffmpeg, inputs, settings):
+    # The stand-in ships no ffprobe, so probes only see the duration
+    path, = inputs(1)
+    entry = Planner(CommandBuilder(fake_ffmpeg())).plan_job(Job(path, 0, settings=settings()))
+    assert entry.decision == DECISION_REENCODE
+    assert entry.job.duration == 10
+
+
+def test_probe_without_streams_is_skipped():
+    assert _decide(['ffmpeg', '-i', 'in', '-c:a', 'aac', 'out.m4a'], {'format': {}, 'streams': []})[0] == DECISION_SKIP
@@ -0,0 +1,31 @@
+# tests/test_progress.py
+from conftest import Recorder, run_engine
+from modules.job_queue import Job
+
+
+class ProgressRecorder(Recorder):
+    def __init__(self):
+        super().__init__()
+        self.snapshots = []
+
+    def progress(self, snapshot):
+        self.snapshots.append(snapshot)
+
+
+def test_batch_progress_is_weighted_by_duration_and_coalesced(fake_ffmpeg, inputs, settings):
+    long, short = inputs(2)
+    profile = {'duration': 10, 'speed': 20, 'interval': 0.01, 'rules': [{'match': long, 'duration': 30}]}
+    jobs = [Job(long, 0, settings=settings(), duration=30.0), Job(short, 1, settings=settings(), duration=10.0)]
+    recorder = ProgressRecorder()
+    run_engine(fake_ffmpeg(profile), jobs=jobs, listener=recorder)
+
+    snapshots = recorder.snapshots
+    # About 200 time= lines over two seconds; progress goes out every 0.2 s at most
+    assert 3 <= len(snapshots) <= 20
+    percents = [snap['batch_progress'] for snap in snapshots]
+    assert percents == sorted(percents)
+    # The first file is three quarters of the batch's media
+    assert all(snap['batch_progress'] >= 74.9 for snap in snapshots if snap['done'] == 1)
+    assert any(snap['batch_progress'] < 75 for snap in snapshots if snap['done'] == 0)
+    etas = [snap['eta'] for snap in snapshots if snap['eta'] is not None]
+    assert etas and all(0 <= eta < 10 for eta in etas)
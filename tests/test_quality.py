@@ -0,0 +1,99 @@
+# tests/test_quality.py
+import asyncio
+
+import pytest
+
+import modules.engine
+import modules.quality
+from conftest import Recorder, run_engine
+from modules.command_builder import CommandBuilder
+from modules.job_queue import STATE_DONE, Job
+from modules.quality import CRF_LADDER, QUALITY_TARGET
+
+VIDEO_PROFILE = {'duration': 120, 'speed': 2000, 'interval': 0.05, 'streams': ['video', 'audio']}
+
+
+@pytest.fixture(autouse=True)
+def video_search_only(monkeypatch):
+    # The audio search scores candidates in the spawn-context analysis pool; the CRF search covers the engine side
+    monkeypatch.setattr(modules.quality, 'NUMPY_AVAILABLE', False)
+
+
+def _value(cmd, flag):
+    return cmd[cmd.index(flag) + 1]
+
+
+class ChildWatch:
+    """Wraps an engine's _run_child to keep the commands and the most children running at once."""
+
+    def __init__(self):
+        self.commands = []
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, engine):
+        run_child = engine._run_child
+
+        async def watched(job, cmd):
+            self.commands.append(cmd)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(0.02)
+                return await run_child(job, cmd)
+            finally:
+                self.running -= 1
+        engine._run_child = watched
+
+    def candidates(self):
+        return [cmd for cmd in self.commands if '-crf' in cmd]
+
+
+def test_tuning_only_applies_to_target_quality(fake_ffmpeg, inputs, settings):
+    builder = CommandBuilder(fake_ffmpeg())
+    path, = inputs(1)
+    job = Job(path, 0, settings=settings('mp3', quality=QUALITY_TARGET))
+    job.tuning = {'-b:a': '96k'}
+    assert _value(builder.build(job)[0], '-b:a') == '96k'
+    # A later batch at another quality, as the GUI does with its reused jobs
+    job.settings = settings('mp3', quality='High')
+    assert _value(builder.build(job)[0], '-b:a') != '96k'
+
+
+def test_reset_job_is_searched_again(fake_ffmpeg, inputs, settings):
+    ffmpeg = fake_ffmpeg(VIDEO_PROFILE)
+    path, = inputs(1)
+    job = Job(path, 0, settings=settings('mp4', quality=QUALITY_TARGET, video_codec='H.264'))
+    job.tuning = {'-crf': '30'}
+    job.reset()
+    watch = ChildWatch()
+    recorder = Recorder()
+    run_engine(ffmpeg, jobs=[job], listener=recorder, before_start=watch)
+    assert job.state == STATE_DONE
+    assert len(watch.candidates()) == len(CRF_LADDER['libx264'])
+    # The stand-in's encodes can't be scored, so the profile's CRF stays
+    assert job.tuning == {}
+    assert ' -crf 30 ' not in recorder.commands[-1]
+
+
+def test_target_candidates_stay_within_the_worker_limit(fake_ffmpeg, inputs, settings):
+    ffmpeg = fake_ffmpeg(dict(VIDEO_PROFILE, speed=400))
+    s = settings('mp4', quality=QUALITY_TARGET, video_codec='H.264')
+    jobs = [Job(path, i, settings=s) for i, path in enumerate(inputs(2))]
+    watch = ChildWatch()
+    run_engine(ffmpeg, jobs=jobs, workers=2, before_start=watch)
+    assert [job.state for job in jobs] == [STATE_DONE, STATE_DONE]
+    assert len(watch.candidates()) == 2 * len(CRF_LADDER['libx264'])
+    assert watch.peak == 2
+
+
+def test_scoring_error_drops_only_that_candidate(fake_ffmpeg, inputs, monkeypatch, settings):
+    def broken(lines):
+        raise RuntimeError('scoring pool broke')
+    monkeypatch.setattr(modules.engine, 'parse_ssim', broken)
+    path, = inputs(1)
+    job = Job(path, 0, settings=settings('mp4', quality=QUALITY_TARGET, video_codec='H.264'))
+    run_engine(fake_ffmpeg(VIDEO_PROFILE), jobs=[job])
+    # No candidate could be scored, so the job runs with its regular setting
+    assert job.state == STATE_DONE
+    assert job.tuning == {}
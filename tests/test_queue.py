@@ -0,0 +1,50 @@
+# tests/test_queue.py
+import os
+
+from conftest import Recorder, run_engine
+from modules.job_queue import POLICY_DEADLINE, POLICY_PRIORITY, POLICY_SJF, Job, JobQueue
+
+
+def _order(queue):
+    return [job.index for job in queue.pending()]
+
+
+def test_policies_order_pending_jobs():
+    queue = JobQueue()
+    for index, (duration, priority, deadline) in enumerate([(30, 0, None), (10, 5, 200), (20, 9, 100)]):
+        queue.add(Job(f'{index}.wav', index, duration=duration, priority=priority, deadline=deadline))
+    assert _order(queue) == [0, 1, 2]
+    queue.set_policy(POLICY_SJF)
+    assert _order(queue) == [1, 2, 0]
+    queue.set_policy(POLICY_PRIORITY)
+    assert _order(queue) == [2, 1, 0]
+    queue.set_policy(POLICY_DEADLINE)
+    assert _order(queue) == [2, 1, 0]
+
+
+def test_bump_and_sink_override_the_policy():
+    queue = JobQueue(POLICY_SJF)
+    jobs = [queue.add(Job(f'{i}.wav', i, duration=10 * (i + 1))) for i in range(3)]
+    queue.bump(jobs[2])
+    queue.sink(jobs[0])
+    assert _order(queue) == [2, 1, 0]
+
+
+def test_engine_runs_shortest_first_from_probed_durations(tmp_path, inputs, settings, fake_ffmpeg):
+    # The stand-in reports a per-path duration between 5 and 50 s; probes fill job.duration before ordering
+    ffmpeg = fake_ffmpeg({'duration': [5, 50], 'speed': 1000, 'interval': 0.05})
+    queue = JobQueue(POLICY_SJF)
+    for i, path in enumerate(inputs(4)):
+        queue.add(Job(path, i, settings=settings()))
+    recorder = Recorder()
+    run_engine(ffmpeg, queue=queue, listener=recorder)
+    durations = [job.duration for job in recorder.started]
+    assert len(durations) == 4 and durations == sorted(durations)
+
+
+def test_trimmed_jobs_are_named_clip(fake_ffmpeg, inputs, settings):
+    whole, clipped = inputs(2)
+    jobs = [Job(whole, 0, settings=settings()), Job(clipped, 1, settings=settings(), start=2.0, end=4.0)]
+    run_engine(fake_ffmpeg(), jobs=jobs)
+    assert [os.path.basename(job.output_file) for job in jobs] == ['input_0_converted.mp3', 'input_1_clip.mp3']
+    assert jobs[1].duration == 2.0
@@ -0,0 +1,46 @@
+# tests/test_split.py
+import os
+
+from conftest import Recorder, run_engine
+from modules.job_queue import STATE_DONE, Job
+from modules.silence import split_options
+
+# Gaps at 100-103 s and 200-204 s of a 300 s capture: three tracks
+SILENCEDETECT = ['[silencedetect @ 0x1] silence_start: 100', '[silencedetect @ 0x1] silence_end: 103 | silence_duration: 3',
+                 '[silencedetect @ 0x1] silence_start: 200', '[silencedetect @ 0x1] silence_end: 204 | silence_duration: 4']
+PROFILE = {'duration': 300, 'speed': 3000, 'interval': 0.05,
+           'rules': [{'match': 'silencedetect', 'log': SILENCEDETECT}]}
+
+
+def _outputs(engine):
+    return sorted(os.path.basename(job.output_file) for job in engine.list_jobs() if job.output_file)
+
+
+def test_split_inputs_with_custom_name_write_distinct_tracks(fake_ffmpeg, inputs, settings):
+    s = settings(custom_name='show')
+    first, second, plain = inputs(3)
+    jobs = [Job(first, 0, settings=s, split=split_options()), Job(second, 1, settings=s, split=split_options()),
+            Job(plain, 2, settings=s)]
+    engine = run_engine(fake_ffmpeg(PROFILE), jobs=jobs, workers=2)
+    assert all(job.state == STATE_DONE for job in engine.list_jobs())
+    assert _outputs(engine) == ['show_1_1.mp3', 'show_1_2.mp3', 'show_1_3.mp3',
+                                'show_2_1.mp3', 'show_2_2.mp3', 'show_2_3.mp3', 'show_3.mp3']
+
+
+def test_split_tracks_without_custom_name_use_the_input_name(fake_ffmpeg, inputs, settings):
+    path, = inputs(1, prefix='tape')
+    engine = run_engine(fake_ffmpeg(PROFILE), jobs=[Job(path, 0, settings=settings(), split=split_options())])
+    assert _outputs(engine) == ['tape_0_track_1.mp3', 'tape_0_track_2.mp3', 'tape_0_track_3.mp3']
+    tracks = sorted((job for job in engine.list_jobs() if job.split is None), key=lambda job: job.index)
+    spans = [(job.start, job.end) for job in tracks]
+    assert spans == [(None, 100.0), (103.0, 200.0), (204.0, None)]
+
+
+def test_tracks_queue_in_the_place_of_their_input(fake_ffmpeg, inputs, settings):
+    s = settings()
+    tape, *others = inputs(4)
+    jobs = [Job(tape, 0, settings=s, split=split_options())] + [Job(path, i, settings=s) for i, path in enumerate(others, 1)]
+    recorder = Recorder()
+    run_engine(fake_ffmpeg(PROFILE), jobs=jobs, listener=recorder)
+    order = [(job.input_file, job.track) for job in recorder.started]
+    assert order == [(tape, None), (tape, 1), (tape, 2), (tape, 3)] + [(path, None) for path in others]
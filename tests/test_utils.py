@@ -0,0 +1,12 @@
+# tests/test_utils.py
+import modules.utils as utils
+
+
+def test_probe_cache_keeps_only_the_most_recent_files(fake_ffmpeg, inputs, monkeypatch):
+    monkeypatch.setattr(utils, 'PROBE_CACHE_SIZE', 2)
+    monkeypatch.setattr(utils, '_probe_cache', type(utils._probe_cache)())
+    ffmpeg = fake_ffmpeg()
+    first, second, third = inputs(3)
+    for path in (first, second, first, third):
+        assert utils.probe_duration(ffmpeg, path) == 10
+    assert [key[0] for key in utils._probe_cache] == [first, third]
@@ -0,0 +1,47 @@
+# tests/test_video.py
+import pytest
+
+import modules.command_builder
+from conftest import Recorder, run_engine
+from modules.command_builder import CommandBuilder
+from modules.history import HistoryStore
+from modules.job_queue import STATE_DONE, Job
+from modules.planner import CostModel, Planner
+
+PROFILE = {'duration': 600, 'speed': 6000, 'interval': 0.05, 'streams': ['video', 'audio']}
+
+
+def _video_codec(cmd):
+    return cmd[cmd.index('-c:v') + 1]
+
+
+@pytest.mark.parametrize('output_format, source, expected', [
+    ('mp4', 'h264', 'copy'),
+    ('mp4', 'vp9', 'libx264'),
+    ('webm', 'vp9', 'copy'),
+    ('webm', 'h264', 'libvpx-vp9'),
+    ('mkv', 'vp9', 'copy'),
+])
+def test_auto_copies_only_what_the_container_takes(fake_ffmpeg, inputs, settings, monkeypatch, output_format, source,
+                                                   expected):
+    monkeypatch.setattr(modules.command_builder, 'probe_media', lambda ffmpeg_path, path: {
+        'format': {'duration': '600'}, 'streams': [{'codec_type': 'video', 'codec_name': source}]})
+    path, = inputs(1)
+    cmd, _ = CommandBuilder(fake_ffmpeg()).build(Job(path, 0, settings=settings(output_format)))
+    assert _video_codec(cmd) == expected
+
+
+def test_meet_deadline_picks_the_slowest_tier_that_fits(fake_ffmpeg, inputs, settings):
+    ffmpeg = fake_ffmpeg(PROFILE)
+    s = settings('mp4', video_codec='H.264')
+    jobs = [Job(path, i, settings=s) for i, path in enumerate(inputs(2))]
+    planner = Planner(CommandBuilder(ffmpeg), CostModel(HistoryStore(':memory:')))
+    # Two 10-minute files, uncalibrated x264 guesses: 'balanced' needs 400 s, 'fast' 160 s
+    tier, summary = planner.pick_speed(jobs, 1, 300)
+    assert (tier, round(summary['estimated_wall_seconds'])) == ('fast', 160)
+    assert s.video_speed == 'fast'
+
+    recorder = Recorder()
+    run_engine(ffmpeg, jobs=jobs, listener=recorder)
+    assert [job.state for job in jobs] == [STATE_DONE, STATE_DONE]
+    assert all(' -c:v libx264 ' in cmd and ' -preset veryfast ' in cmd for cmd in recorder.commands)